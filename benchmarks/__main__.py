@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Annotated, Optional
+
+import serde.json
+import typer
+from benchmarks.suite import BENCHMARKS, SCALES, find_regressions, run_benchmark
+
+app = typer.Typer(pretty_exceptions_short=True, pretty_exceptions_enable=False)
+
+
+@app.command(help="Run the benchmarks and compare them with the baseline")
+def run(
+    scale: Annotated[str, typer.Option(help=f"One of {list(SCALES)}")] = "small",
+    only: Annotated[
+        Optional[list[str]], typer.Option(help="Only run these benchmarks")
+    ] = None,
+    baseline: Path = Path(__file__).parent / "baseline.json",
+    threshold: Annotated[
+        float, typer.Option(help="Allowed regression ratio before failing")
+    ] = 0.25,
+    repeat: int = 3,
+    save: Annotated[
+        bool, typer.Option(help="Save the results as the new baseline")
+    ] = False,
+):
+    results = []
+    for benchmark in BENCHMARKS:
+        if only is not None and benchmark.name not in only:
+            continue
+        result = run_benchmark(benchmark, SCALES[scale], repeat=repeat)
+        print(
+            f"{result.name:<32} {result.throughput:>12.1f} items/s {result.peak_memory / 1024 / 1024:>10.2f} MiB"
+        )
+        results.append(result)
+
+    baselines = serde.json.deser(baseline) if baseline.exists() else {}
+    if save:
+        baselines[scale] = {
+            **baselines.get(scale, {}),
+            **{result.name: result.to_dict() for result in results},
+        }
+        serde.json.ser(baselines, baseline, indent=2)
+        return
+
+    if scale not in baselines:
+        print(f"No baseline for scale `{scale}`, run with --save to create one")
+        return
+    regressions = find_regressions(results, baselines[scale], threshold)
+    for regression in regressions:
+        print("REGRESSION:", regression)
+    if len(regressions) > 0:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,193 @@
+"""Synthetic data generators of the benchmarks.
+
+The generated data follows the shape of the real data: most dedup groups have a single site,
+a site has a handful of inventories (a few have dozens), and inventories of the same site
+share documents and dates.
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime, timezone
+
+from minmodkg.grade_tonnage_model import (
+    GradeTonnageModel,
+    ReserveCategory,
+    ResourceCategory,
+)
+from minmodkg.models.kg.base import NS_MR
+from minmodkg.models.kg.candidate_entity import CandidateEntity
+from minmodkg.models.kgrel.custom_types.location import Location
+from minmodkg.models.kgrel.mineral_site import MineralSite, MineralSiteAndInventory
+
+SOURCES = [
+    "https://mrdata.usgs.gov/mrds",
+    "https://api.cdr.land/v1/docs/documents",
+    "https://mrdata.usgs.gov/deposit",
+]
+CRS_NAMES = {NS_MR.uristr("Q701"): "EPSG:4326"}
+SOURCE_SCORES = {source: 0.5 for source in SOURCES}
+COMMODITIES = ["Q578", "Q579", "Q589", "Q569", "Q591", "Q565"]
+COUNTRIES = ["Q1038", "Q1167", "Q1030", "Q1012"]
+STATES = ["Q2663", "Q2678", "Q2712", "Q2750"]
+DEPOSIT_TYPES = ["Q470", "Q471", "Q475", "Q380", "Q401"]
+CATEGORIES = [[c.value] for c in ResourceCategory] + [
+    [c.value] for c in ReserveCategory
+]
+
+# number of sites of a dedup group and number of inventories of a site, and their weights
+SITES_PER_GROUP = ([1, 2, 3, 5, 8], [70, 15, 8, 5, 2])
+INVS_PER_SITE = ([0, 1, 3, 8, 20, 50], [20, 25, 25, 15, 10, 5])
+
+
+def candidate(rng: random.Random, id: str, name: str) -> dict:
+    return {
+        "normalized_uri": NS_MR.uristr(id),
+        "observed_name": name,
+        "confidence": round(rng.random(), 2),
+        "source": "synthetic",
+    }
+
+
+def raw_site(rng: random.Random, index: int) -> dict:
+    """Generate a mineral site in the format of the input files (the KG model)."""
+    source_id = rng.choice(SOURCES)
+    document = {
+        "title": f"Technical Report {index}.pdf",
+        "uri": f"https://api.cdr.land/v1/docs/documents/{index:064x}",
+    }
+    dates = [f"{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}" for _ in range(2)]
+    n_invs = rng.choices(*INVS_PER_SITE)[0]
+    return {
+        "source_id": source_id,
+        "record_id": f"{index:010d}",
+        "name": f"Site {index}",
+        "location_info": {
+            "location": f"POINT({rng.uniform(-180, 180):.6f} {rng.uniform(-90, 90):.6f})",
+            "crs": candidate(rng, "Q701", "EPSG:4326"),
+            "country": [candidate(rng, rng.choice(COUNTRIES), "country")],
+            "state_or_province": [candidate(rng, rng.choice(STATES), "state")],
+        },
+        "deposit_type_candidate": [
+            candidate(rng, id, "deposit type")
+            for id in rng.sample(DEPOSIT_TYPES, rng.randint(0, 3))
+        ],
+        "mineral_inventory": [
+            {
+                "commodity": candidate(rng, rng.choice(COMMODITIES), "commodity"),
+                "category": [
+                    candidate(rng, cat.rsplit("/", 1)[1], "category")
+                    for cat in rng.choice(CATEGORIES)
+                ],
+                "ore": {"value": round(rng.uniform(0.1, 500), 3)},
+                "grade": {"value": round(rng.uniform(0.01, 10), 3)},
+                "reference": {"document": document, "page_info": [{"page": i + 1}]},
+                "date": rng.choice(dates),
+            }
+            for i in range(n_invs)
+        ],
+        "reference": [{"document": document}],
+        "modified_at": datetime.fromtimestamp(
+            1_700_000_000 + index, tz=timezone.utc
+        ).isoformat(),
+        "created_by": "https://minmod.isi.edu/users/s/synthetic",
+    }
+
+
+def raw_sites(rng: random.Random, n: int, start: int = 0) -> list[dict]:
+    return [raw_site(rng, start + i) for i in range(n)]
+
+
+def sites(rng: random.Random, n: int, start: int = 0) -> list[MineralSiteAndInventory]:
+    """Generate mineral sites in the format of the relational database, each site is in
+    its own dedup group."""
+    lst_msi = MineralSiteAndInventory.from_raw_sites(
+        raw_sites(rng, n, start),
+        commodity_form_conversion={},
+        crs_names=CRS_NAMES,
+        source_score=SOURCE_SCORES,
+    )
+    for msi in lst_msi:
+        msi.ms.dedup_site_id = MineralSite.get_dedup_id([msi.ms.site_id])
+    return lst_msi
+
+
+def dedup_groups(
+    rng: random.Random, n: int, start: int = 0
+) -> list[list[MineralSiteAndInventory]]:
+    """Generate `n` groups of sites that are the same, each group has its dedup site id."""
+    sizes = rng.choices(*SITES_PER_GROUP, k=n)
+    lst_msi = sites(rng, sum(sizes), start)
+    groups = []
+    offset = 0
+    for size in sizes:
+        group = lst_msi[offset : offset + size]
+        dedup_site_id = MineralSite.get_dedup_id([msi.ms.site_id for msi in group])
+        for msi in group:
+            msi.ms.dedup_site_id = dedup_site_id
+        groups.append(group)
+        offset += size
+    return groups
+
+
+def grade_tonnage_inventories(
+    rng: random.Random, n: int
+) -> list[list[GradeTonnageModel.MineralInventory]]:
+    """Generate the inventories of a single commodity of `n` sites."""
+    output = []
+    for i in range(n):
+        n_invs = max(rng.choices(*INVS_PER_SITE)[0], 1)
+        dates = [
+            f"{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}" for _ in range(2)
+        ]
+        invs = []
+        for j in range(n_invs):
+            invs.append(
+                GradeTonnageModel.MineralInventory(
+                    # some inventories are reported as a sum of multiple categories
+                    id=f"{i}:{j // 2}",
+                    date=rng.choice(dates),
+                    zone=rng.choice([None, None, 1, 2]),
+                    category=rng.choice(CATEGORIES),
+                    material_form_conversion=rng.choice([None, None, 0.464]),
+                    ore_value=rng.uniform(0.1, 500),
+                    ore_unit=NS_MR.uristr("Q202"),
+                    grade_value=rng.uniform(0.01, 10),
+                    grade_unit=NS_MR.uristr("Q201"),
+                )
+            )
+        output.append(invs)
+    return output
+
+
+def locations(rng: random.Random, n: int) -> list[Location]:
+    output = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.8:
+            coordinates = (
+                f"POINT({rng.uniform(-180, 180):.6f} {rng.uniform(-90, 90):.6f})"
+            )
+        elif kind < 0.95:
+            lon, lat = rng.uniform(-179, 179), rng.uniform(-89, 89)
+            coordinates = "POLYGON(({}))".format(
+                ", ".join(
+                    f"{lon + dx:.6f} {lat + dy:.6f}"
+                    for dx, dy in [(0, 0), (0.5, 0), (0.5, 0.5), (0, 0.5), (0, 0)]
+                )
+            )
+        else:
+            coordinates = None
+        output.append(
+            Location(
+                country=[
+                    CandidateEntity.from_dict(
+                        candidate(rng, rng.choice(COUNTRIES), "country")
+                    )
+                ],
+                state_or_province=[],
+                crs=CandidateEntity.from_dict(candidate(rng, "Q701", "EPSG:4326")),
+                coordinates=coordinates,
+            )
+        )
+    return output
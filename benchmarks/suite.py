@@ -0,0 +1,160 @@
+"""Micro-benchmarks of the hot paths.
+
+Each benchmark generates its synthetic inputs in batches (outside of the measurement), runs
+the benchmarked function over every item of a batch, and reports:
+
+- throughput: number of items processed per second (the best of `repeat` runs)
+- peak_memory: peak traced memory (bytes) allocated while processing one batch
+"""
+
+from __future__ import annotations
+
+import gc
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from benchmarks import generators
+from minmodkg.grade_tonnage_model import GradeTonnageModel
+from minmodkg.models.kg.mineral_site import MineralSite as KGMineralSite
+from minmodkg.models.kgrel.custom_types.location import LocationView
+from minmodkg.models.kgrel.dedup_mineral_site import DedupMineralSite
+from minmodkg.models.kgrel.mineral_site import MineralSite
+from minmodkg.transformations import make_site_ids
+
+# number of items (sites, dedup groups, locations...) of a corpus
+SCALES = {
+    "small": 2_000,
+    "medium": 100_000,
+    "large": 1_000_000,
+}
+BATCH_SIZE = 2_000
+
+
+@dataclass
+class Benchmark:
+    name: str
+    # generate the inputs of a batch of `n` items, the `start` index keeps ids unique
+    setup: Callable[[random.Random, int, int], list]
+    # process one item of a batch
+    run: Callable[[Any], Any]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    n_items: int
+    throughput: float
+    peak_memory: int
+
+    def to_dict(self):
+        return {
+            "n_items": self.n_items,
+            "throughput": self.throughput,
+            "peak_memory": self.peak_memory,
+        }
+
+
+grade_tonnage_model = GradeTonnageModel()
+
+BENCHMARKS = [
+    Benchmark(
+        name="DedupMineralSite.from_sites",
+        setup=lambda rng, n, start: generators.dedup_groups(rng, n, start),
+        run=DedupMineralSite.from_sites,
+    ),
+    Benchmark(
+        name="GradeTonnageModel.__call__",
+        setup=lambda rng, n, start: generators.grade_tonnage_inventories(rng, n),
+        run=grade_tonnage_model,
+    ),
+    Benchmark(
+        name="RDFModel.to_triples",
+        setup=lambda rng, n, start: [
+            KGMineralSite.from_dict(r) for r in generators.raw_sites(rng, n, start)
+        ],
+        run=lambda site: site.to_triples(),
+    ),
+    Benchmark(
+        name="MineralSite.from_dict",
+        setup=lambda rng, n, start: [
+            msi.ms.to_dict() for msi in generators.sites(rng, n, start)
+        ],
+        run=MineralSite.from_dict,
+    ),
+    Benchmark(
+        name="MineralSite.to_dict",
+        setup=lambda rng, n, start: [msi.ms for msi in generators.sites(rng, n, start)],
+        run=lambda site: site.to_dict(),
+    ),
+    Benchmark(
+        name="make_site_ids",
+        setup=lambda rng, n, start: generators.raw_sites(rng, n, start),
+        run=make_site_ids,
+    ),
+    Benchmark(
+        name="LocationView.from_location",
+        setup=lambda rng, n, start: generators.locations(rng, n),
+        run=lambda location: LocationView.from_location(location, generators.CRS_NAMES),
+    ),
+]
+
+
+def run_benchmark(
+    benchmark: Benchmark, n_items: int, repeat: int = 3, seed: int = 42
+) -> BenchmarkResult:
+    best_elapsed = float("inf")
+    for _ in range(repeat):
+        rng = random.Random(seed)
+        elapsed = 0.0
+        for start in range(0, n_items, BATCH_SIZE):
+            batch = benchmark.setup(rng, min(BATCH_SIZE, n_items - start), start)
+            gc.collect()
+            timer = time.perf_counter()
+            for item in batch:
+                benchmark.run(item)
+            elapsed += time.perf_counter() - timer
+        best_elapsed = min(best_elapsed, elapsed)
+
+    # tracing memory slows down the execution, so it is measured separately on one batch
+    batch = benchmark.setup(random.Random(seed), min(BATCH_SIZE, n_items), 0)
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        base_memory = tracemalloc.get_traced_memory()[0]
+        output = [benchmark.run(item) for item in batch]
+        peak_memory = tracemalloc.get_traced_memory()[1] - base_memory
+    finally:
+        tracemalloc.stop()
+    del output
+
+    return BenchmarkResult(
+        name=benchmark.name,
+        n_items=n_items,
+        throughput=n_items / best_elapsed,
+        peak_memory=peak_memory,
+    )
+
+
+def find_regressions(
+    results: list[BenchmarkResult], baseline: dict, threshold: float
+) -> list[str]:
+    """Compare the results with the baseline, a tracked path regresses when its throughput
+    drops or its peak memory grows by more than `threshold` (a ratio)."""
+    regressions = []
+    for result in results:
+        if result.name not in baseline:
+            continue
+        expected = baseline[result.name]
+        if result.throughput < expected["throughput"] * (1 - threshold):
+            regressions.append(
+                f"{result.name}: throughput {result.throughput:.1f} items/s < baseline {expected['throughput']:.1f} items/s"
+            )
+        if result.peak_memory > expected["peak_memory"] * (1 + threshold):
+            regressions.append(
+                f"{result.name}: peak memory {result.peak_memory} bytes > baseline {expected['peak_memory']} bytes"
+            )
+    return regressions
@@ -12,7 +12,11 @@ import serde.json
 import typer
 from minmodkg.api.internal.admin import create_user_priv
 from minmodkg.api.models.public_user import PublicCreateUser
-from minmodkg.models.kgrel.base import create_db_and_tables, get_rel_session
+from minmodkg.models.kgrel.base import create_db_and_tables, engine, get_rel_session
+from minmodkg.models.kgrel.migrations import (
+    migrate_blob_to_jsonb,
+    rebuild_dedup_mineral_site_search,
+)
 from minmodkg.models.kgrel.user import User, get_username
 from minmodkg.transformations import make_site_id
 from slugify import slugify
@@ -132,6 +136,21 @@ def add_user(
     os.rename(input_file.parent / (input_file.name + ".new"), input_file)
 
 
+@app.command(help="Create the database tables (run before starting the API)")
+def create_db():
+    create_db_and_tables()
+
+
+@app.command(help="Migrate the mineral site blobs (BYTEA) to JSONB")
+def migrate_jsonb():
+    migrate_blob_to_jsonb(engine)
+
+
+@app.command(help="Rebuild the dedup mineral site search table")
+def rebuild_search():
+    rebuild_dedup_mineral_site_search(engine)
+
+
 @app.command()
 def clear_user():
     create_db_and_tables()
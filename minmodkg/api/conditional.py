@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import orjson
+import xxhash
+from fastapi import Request, Response, status
+
+
+class Validators(NamedTuple):
+    """Validators of a resource for conditional requests.
+
+    There is no `Last-Modified` validator: linking sites changes their dedup site without
+    changing `modified_at`, so only the ETag, which covers the dedup site, is reliable.
+    """
+
+    etag: str
+
+    @staticmethod
+    def create(modified_at: int, *version) -> Validators:
+        """Create the validators of a resource from its version. The ETag is weak because the
+        response also depends on the entities (e.g., names of commodities)."""
+        digest = xxhash.xxh3_64_hexdigest(orjson.dumps([modified_at, *version]))
+        return Validators(etag=f'W/"{digest}"')
+
+    def headers(self) -> dict[str, str]:
+        return {
+            "ETag": self.etag,
+            # clients may store the response, but must revalidate it before reusing it
+            "Cache-Control": "no-cache",
+        }
+
+    def is_not_modified(self, request: Request) -> bool:
+        """Check if the client already has this version of the resource"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is None:
+            return False
+        etags = {_strip_weak(etag) for etag in if_none_match.split(",")}
+        return "*" in etags or _strip_weak(self.etag) in etags
+
+    def not_modified(self) -> Response:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=self.headers()
+        )
+
+
+def is_conditional(request: Request) -> bool:
+    """Whether the request has a precondition that can be answered with 304"""
+    return "if-none-match" in request.headers
+
+
+def _strip_weak(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
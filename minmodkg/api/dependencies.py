@@ -7,8 +7,7 @@ import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import APIKeyCookie
 from minmodkg.config import JWT_ALGORITHM, SECRET_KEY
-from minmodkg.models.kg.base import MINMOD_KG, MINMOD_NS
-from minmodkg.models.kgrel.base import get_rel_session
+from minmodkg.models.kgrel.base import get_async_rel_session, get_rel_session
 from minmodkg.models.kgrel.entities.commodity import Commodity
 from minmodkg.models.kgrel.entities.country import Country
 from minmodkg.models.kgrel.entities.deposit_type import DepositType
@@ -58,20 +57,14 @@ CurrentUserDep = Annotated[User, Depends(get_current_user)]
 MineralSiteServiceDep = Annotated[MineralSiteService, Depends(get_mineral_site_service)]
 
 
-def get_snapshot_id():
-    query = f"SELECT ?snapshot_id WHERE {{ {MINMOD_NS.mr.alias}:kg {MINMOD_NS.dcterms.alias}:hasVersion ?snapshot_id }}"
-    qres = MINMOD_KG.query(query)
-    return qres[0]["snapshot_id"]
-
-
-def norm_commodity(commodity: str) -> InternalID:
+async def norm_commodity(commodity: str) -> InternalID:
     if commodity.startswith("http"):
         raise HTTPException(
             status_code=404,
             detail=f"Expect commodity to be either just an id (QXXX) or name. Get `{commodity}` instead",
         )
     if not is_minmod_id(commodity):
-        norm_commodity = get_commodity_by_name(commodity)
+        norm_commodity = await get_commodity_by_name(commodity)
         if norm_commodity is None:
             raise HTTPException(
                 status_code=404, detail=f"Commodity `{commodity}` not found"
@@ -81,14 +74,14 @@ def norm_commodity(commodity: str) -> InternalID:
     return norm_commodity
 
 
-def norm_country(country: str) -> InternalID:
+async def norm_country(country: str) -> InternalID:
     if country.startswith("http"):
         raise HTTPException(
             status_code=404,
             detail=f"Expect country to be either just an id (QXXX) or name. Get `{country}` instead",
         )
     if not is_minmod_id(country):
-        norm_country = get_country_by_name(country)
+        norm_country = await get_country_by_name(country)
         if norm_country is None:
             raise HTTPException(
                 status_code=404, detail=f"country `{country}` not found"
@@ -98,14 +91,14 @@ def norm_country(country: str) -> InternalID:
     return norm_country
 
 
-def norm_state_or_province(state_or_province: str) -> InternalID:
+async def norm_state_or_province(state_or_province: str) -> InternalID:
     if state_or_province.startswith("http"):
         raise HTTPException(
             status_code=404,
             detail=f"Expect state_or_province to be either just an id (QXXX) or name. Get `{state_or_province}` instead",
         )
     if not is_minmod_id(state_or_province):
-        norm_state_or_province = get_state_or_province_by_name(state_or_province)
+        norm_state_or_province = await get_state_or_province_by_name(state_or_province)
         if norm_state_or_province is None:
             raise HTTPException(
                 status_code=404,
@@ -116,14 +109,14 @@ def norm_state_or_province(state_or_province: str) -> InternalID:
     return norm_state_or_province
 
 
-def norm_deposit_type(deposit_type: str) -> InternalID:
+async def norm_deposit_type(deposit_type: str) -> InternalID:
     if deposit_type.startswith("http"):
         raise HTTPException(
             status_code=404,
             detail=f"Expect deposit_type to be either just an id (QXXX) or name. Get `{deposit_type}` instead",
         )
     if not is_minmod_id(deposit_type):
-        norm_deposit_type = get_deposit_type_by_name(deposit_type)
+        norm_deposit_type = await get_deposit_type_by_name(deposit_type)
         if norm_deposit_type is None:
             raise HTTPException(
                 status_code=404,
@@ -134,35 +127,57 @@ def norm_deposit_type(deposit_type: str) -> InternalID:
     return norm_deposit_type
 
 
+def norm_bbox(bbox: str) -> tuple[float, float, float, float]:
+    """Parse a bounding box `min_lon,min_lat,max_lon,max_lat` (EPSG:4326). A box crossing
+    the antimeridian has min_lon > max_lon."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(x) for x in bbox.split(","))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Expect bbox to be `min_lon,min_lat,max_lon,max_lat`. Get `{bbox}` instead",
+        )
+    if not (
+        -180 <= min_lon <= 180
+        and -180 <= max_lon <= 180
+        and -90 <= min_lat <= max_lat <= 90
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid bbox `{bbox}`",
+        )
+    return min_lon, min_lat, max_lon, max_lat
+
+
 def is_minmod_id(text: str) -> bool:
     return text.startswith("Q") and text[1:].isdigit()
 
 
-def get_commodity_by_name(
+async def get_commodity_by_name(
     name: str,
 ) -> Optional[InternalID]:
-    with get_rel_session() as session:
-        commodity_id = session.scalar(
+    async with get_async_rel_session() as session:
+        commodity_id = await session.scalar(
             select(Commodity.id).where(Commodity.lower_name == name.lower())
         )
         return commodity_id
 
 
-def get_country_by_name(
+async def get_country_by_name(
     name: str,
 ) -> Optional[InternalID]:
-    with get_rel_session() as session:
-        country_id = session.scalar(
+    async with get_async_rel_session() as session:
+        country_id = await session.scalar(
             select(Country.id).where(func.lower(Country.name) == name.lower())
         )
         return country_id
 
 
-def get_state_or_province_by_name(
+async def get_state_or_province_by_name(
     name: str,
 ) -> Optional[InternalID]:
-    with get_rel_session() as session:
-        state_or_province_id = session.scalar(
+    async with get_async_rel_session() as session:
+        state_or_province_id = await session.scalar(
             select(StateOrProvince.id).where(
                 func.lower(StateOrProvince.name) == name.lower()
             )
@@ -170,11 +185,11 @@ def get_state_or_province_by_name(
         return state_or_province_id
 
 
-def get_deposit_type_by_name(
+async def get_deposit_type_by_name(
     name: str,
 ) -> Optional[InternalID]:
-    with get_rel_session() as session:
-        deposit_type_id = session.scalar(
+    async with get_async_rel_session() as session:
+        deposit_type_id = await session.scalar(
             select(DepositType.id).where(func.lower(DepositType.name) == name.lower())
         )
         return deposit_type_id
@@ -1,35 +1,56 @@
 from __future__ import annotations
 
-import os
-from contextlib import asynccontextmanager
-
-from fastapi import FastAPI
+import httpx
+import sqlalchemy.exc
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from minmodkg.api.internal import admin
 from minmodkg.api.routers import (
     cdr,
     dedup_mineral_site,
     entities,
+    export,
     lod,
     login,
     mineral_site,
     stats,
 )
-from minmodkg.config import API_PREFIX, LOD_PREFIX
-from minmodkg.models.kgrel.base import create_db_and_tables
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    create_db_and_tables()
-    yield
-
+from minmodkg.config import (
+    API_PREFIX,
+    LOD_PREFIX,
+    MINMOD_COMPRESSION,
+    MINMOD_SERVER_TIMING,
+)
+from minmodkg.misc.compression import CompressionMiddleware
+from minmodkg.misc.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    MetricsMiddleware,
+    collect_db_pools,
+)
 
 app = FastAPI(
     openapi_url=f"{API_PREFIX}/openapi.json",
     docs_url=f"{API_PREFIX}/docs",
-    lifespan=lifespan,
 )
 
+app.add_middleware(MetricsMiddleware)
+REGISTRY.add_collector(collect_db_pools)
+
+if MINMOD_SERVER_TIMING is not None:
+    from minmodkg.misc.timing import ServerTimingMiddleware, instrument_sqlalchemy
+
+    instrument_sqlalchemy()
+    app.add_middleware(
+        ServerTimingMiddleware,
+        slow_request_seconds=MINMOD_SERVER_TIMING.get("slow_request_seconds"),
+    )
+
+# added last so that it is the outermost middleware and the other middlewares see the
+# uncompressed responses
+if MINMOD_COMPRESSION is not None:
+    app.add_middleware(CompressionMiddleware, **MINMOD_COMPRESSION)
+
 app.include_router(entities.router, prefix=API_PREFIX)
 app.include_router(stats.router, prefix=API_PREFIX)
 app.include_router(dedup_mineral_site.router, prefix=API_PREFIX)
@@ -38,4 +59,22 @@ app.include_router(lod.router, prefix=LOD_PREFIX)
 app.include_router(login.router, prefix=API_PREFIX)
 app.include_router(mineral_site.router, prefix=API_PREFIX)
 app.include_router(cdr.router, prefix=API_PREFIX)
+app.include_router(export.router, prefix=API_PREFIX)
 app.include_router(admin.router, prefix=f"{API_PREFIX}/admin")
+
+
+@app.exception_handler(sqlalchemy.exc.TimeoutError)
+@app.exception_handler(httpx.PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: Exception):
+    # all connections to the database or the triple store are busy for longer than the
+    # pool timeout, ask the client to retry later instead of queueing more requests
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The server is busy, please retry later"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.get(f"{API_PREFIX}/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from minmodkg.misc.timing import timed
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded to bytes by orjson in a single pass.
+
+    Handlers return this response directly (instead of returning the content) so that
+    FastAPI skips the response model validation and `jsonable_encoder`, which walk the
+    content again in pure Python. Therefore, the content must be made of JSON types only,
+    such as the output of `to_dict()` of the public models.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with timed("encode"):
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
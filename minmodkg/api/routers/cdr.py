@@ -11,9 +11,9 @@ from minmodkg.api.dependencies import (
 from minmodkg.api.models.public_mineral_site import (
     CandidateEntity,
     InputPublicMineralSite,
-    MineralInventory,
     OutputPublicMineralSite,
 )
+from minmodkg.api.responses import FastJSONResponse
 from minmodkg.misc.utils import format_nanoseconds
 from minmodkg.models.kg.base import NS_MR
 from minmodkg.models.kgrel.mineral_site import MineralSite
@@ -24,40 +24,60 @@ from minmodkg.services.mineral_site import (
 from minmodkg.transformations import make_site_id
 from minmodkg.typing import InternalID
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import column, func, literal_column, select
+from sqlalchemy.dialects.postgresql import JSONB
 
 router = APIRouter(tags=["cdr"])
 
 
-@router.get("/cdr/mining-report")
+@router.get("/cdr/mining-report", response_class=FastJSONResponse)
 def get_mining_reports(session: RelSessionDep):
     source_id = "https://api.cdr.land/v1/docs/documents"
 
+    # project the inventories in the database so that we only transfer & decode
+    # the commodity, reference and date of each inventory
+    inv = (
+        func.jsonb_array_elements(MineralSite.inventories)
+        .table_valued(column("value", JSONB))
+        .alias("inv")
+    )
+    inventories = (
+        select(
+            func.coalesce(
+                func.jsonb_agg(
+                    func.jsonb_build_object(
+                        "commodity",
+                        inv.c.value["commodity"],
+                        "reference",
+                        inv.c.value["reference"],
+                        "date",
+                        inv.c.value["date"],
+                    )
+                ),
+                literal_column("'[]'::jsonb"),
+            )
+        )
+        .select_from(inv)
+        .scalar_subquery()
+    )
+
     output = []
     for row in session.execute(
         select(
             MineralSite.site_id,
             MineralSite.name,
             MineralSite.record_id,
-            MineralSite.inventories,
+            inventories,
         ).where(MineralSite.source_id == source_id)
     ).all():
-        invs: list[MineralInventory] = row[3]
         output.append(
             {
                 "site_id": row[0],
                 "source_id": source_id,
                 "record_id": row[2],
                 "name": row[1],
-                "inventories": [
-                    {
-                        "commodity": inv.commodity.to_dict(),
-                        "reference": inv.reference.to_dict(),
-                        "date": inv.date,
-                    }
-                    for inv in invs
-                ],
+                "inventories": row[3],
             }
         )
 
-    return output
+    return FastJSONResponse(output)
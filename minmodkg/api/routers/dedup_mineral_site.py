@@ -9,75 +9,107 @@ from typing import Annotated, Literal, Optional
 
 import orjson
 import serde.csv
-from fastapi import APIRouter, Body, HTTPException, Query, Response, status
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from htbuilder import H
+from minmodkg.api.conditional import Validators, is_conditional
 from minmodkg.api.dependencies import (
     is_minmod_id,
+    norm_bbox,
     norm_commodity,
     norm_country,
     norm_deposit_type,
     norm_state_or_province,
 )
 from minmodkg.api.models.public_dedup_mineral_site import DedupMineralSitePublic
+from minmodkg.api.responses import FastJSONResponse
+from minmodkg.misc.timing import timed
 from minmodkg.models.kg.base import MINMOD_NS
+from minmodkg.models.kgrel.dedup_mineral_site import DedupMineralSiteAndInventory
 from minmodkg.models.kgrel.entities.commodity import Commodity
 from minmodkg.services.kgrel_entity import EntityService
-from minmodkg.services.mineral_site import MineralSiteService
+from minmodkg.services.mineral_site import DedupSiteVersion, MineralSiteService
 from minmodkg.typing import InternalID
 from slugify import slugify
 
 router = APIRouter(tags=["mineral_sites"])
 
 
-@router.get("/dedup-mineral-sites")
-def dedup_mineral_sites_v2(
+@router.get("/dedup-mineral-sites", response_class=FastJSONResponse)
+async def dedup_mineral_sites_v2(
     commodity: Optional[str] = None,
     deposit_type: Optional[InternalID] = None,
     country: Optional[InternalID] = None,
     state_or_province: Optional[InternalID] = None,
     has_grade_tonnage: Optional[bool] = None,
+    bbox: Annotated[
+        Optional[str],
+        Query(description="Bounding box: `min_lon,min_lat,max_lon,max_lat`"),
+    ] = None,
+    lat: Annotated[Optional[float], Query(ge=-90, le=90)] = None,
+    lon: Annotated[Optional[float], Query(ge=-180, le=180)] = None,
+    radius: Annotated[
+        Optional[float], Query(gt=0, description="Radius (km) around (lat, lon)")
+    ] = None,
     limit: Annotated[int, Query(ge=0)] = 0,
     offset: Annotated[int, Query(ge=0)] = 0,
     return_count: Annotated[bool, Query()] = False,
     format: Annotated[Literal["json", "csv"], Query()] = "json",
 ):
     if commodity is not None:
-        commodity = norm_commodity(commodity)
+        commodity = await norm_commodity(commodity)
     if deposit_type is not None:
-        deposit_type = norm_deposit_type(deposit_type)
+        deposit_type = await norm_deposit_type(deposit_type)
     if country is not None:
-        country = norm_country(country)
+        country = await norm_country(country)
     if state_or_province is not None:
-        state_or_province = norm_state_or_province(state_or_province)
+        state_or_province = await norm_state_or_province(state_or_province)
+    norm_bbox_ = norm_bbox(bbox) if bbox is not None else None
+    if (lat, lon, radius).count(None) not in (0, 3):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="lat, lon, and radius must be provided together",
+        )
+    within_radius = (lat, lon, radius) if radius is not None else None
 
-    res = MineralSiteService().find_dedup_mineral_sites(
+    res = await MineralSiteService().afind_dedup_mineral_sites(
         commodity=commodity,
         deposit_type=deposit_type,
         country=country,
         state_or_province=state_or_province,
         has_grade_tonnage=has_grade_tonnage,
+        bbox=norm_bbox_,
+        within_radius=within_radius,
         limit=limit,
         offset=offset,
         return_count=return_count,
     )
 
     if format == "json":
-        items = [
-            DedupMineralSitePublic.from_kgrel(dmsi, commodity).to_dict()
-            for dmsi in res["items"].values()
-        ]
 
-        if return_count:
-            return {
-                "items": items,
-                "total": res["total"],
-            }
-        return items
+        def render_json():
+            with timed("convert"):
+                items = [
+                    DedupMineralSitePublic.from_kgrel(dmsi, commodity).to_dict()
+                    for dmsi in res["items"].values()
+                ]
+
+            if return_count:
+                return FastJSONResponse(
+                    {
+                        "items": items,
+                        "total": res["total"],
+                    }
+                )
+            return FastJSONResponse(items)
 
-    items = [
-        DedupMineralSitePublic.from_kgrel(dmsi, commodity)
-        for dmsi in res["items"].values()
-    ]
+        # converting & encoding all sites is CPU-bound, so it runs in the thread pool to
+        # not block the other requests
+        return await run_in_threadpool(render_json)
+
+    items = await run_in_threadpool(
+        convert_dedup_sites, list(res["items"].values()), commodity
+    )
     if format != "csv":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -85,12 +117,16 @@ def dedup_mineral_sites_v2(
         )
 
     if commodity is not None:
-        filename = f"{slugify(get_commodity_map()[commodity].name)}_{datetime.now().strftime(r'%Y%m%d')}.csv"
+        commodity_map = await run_in_threadpool(get_commodity_map)
+        filename = f"{slugify(commodity_map[commodity].name)}_{datetime.now().strftime(r'%Y%m%d')}.csv"
     else:
         filename = f"all_{datetime.now().strftime(r'%Y%m%d')}.csv"
 
+    with timed("encode"):
+        # formatting may load the entities from the database on first use
+        content = await run_in_threadpool(format_csv, items, commodity)
     return Response(
-        content=format_csv(items, commodity),
+        content=content,
         media_type="text/csv",
         headers={
             "Content-Disposition": f"attachment; filename={filename}",
@@ -98,38 +134,73 @@ def dedup_mineral_sites_v2(
     )
 
 
-@router.post("/dedup-mineral-sites/find_by_ids")
-def api_get_dedup_mineral_sites(
+@router.post("/dedup-mineral-sites/find_by_ids", response_class=FastJSONResponse)
+async def api_get_dedup_mineral_sites(
     ids: Annotated[list[InternalID], Body(embed=True)],
     commodity: Annotated[InternalID, Body(embed=True)],
-) -> dict[InternalID, dict]:
-    res = MineralSiteService().find_dedup_mineral_sites(
+):
+    res = await MineralSiteService().afind_dedup_mineral_sites(
         commodity=commodity, dedup_site_ids=ids
     )
-    return {
-        dms_id: DedupMineralSitePublic.from_kgrel(dmsi, commodity).to_dict()
-        for dms_id, dmsi in res["items"].items()
-    }
+
+    def render_json():
+        with timed("convert"):
+            output = {
+                dms_id: DedupMineralSitePublic.from_kgrel(dmsi, commodity).to_dict()
+                for dms_id, dmsi in res["items"].items()
+            }
+        return FastJSONResponse(output)
+
+    return await run_in_threadpool(render_json)
 
 
 @router.get("/dedup-mineral-sites/{dedup_site_id}")
-def api_get_dedup_mineral_site(
+async def api_get_dedup_mineral_site(
     dedup_site_id: str,
+    request: Request,
+    response: Response,
     commodity: Optional[str] = None,
 ):
     if commodity is not None:
-        commodity = norm_commodity(commodity)
-    qres = MineralSiteService().find_dedup_mineral_sites(
+        commodity = await norm_commodity(commodity)
+    if is_conditional(request):
+        # check the version first so that we don't read the site if the client has it
+        version = await MineralSiteService().aget_dedup_site_version(dedup_site_id)
+        if version is not None:
+            validators = get_dedup_site_validators(version, commodity)
+            if validators.is_not_modified(request):
+                return validators.not_modified()
+
+    qres = await MineralSiteService().afind_dedup_mineral_sites(
         commodity=commodity, dedup_site_ids=[dedup_site_id]
     )
-    output = {
-        dms_id: DedupMineralSitePublic.from_kgrel(dmsi, commodity)
-        for dms_id, dmsi in qres["items"].items()
-    }
-
-    if len(output) == 0:
+    if dedup_site_id not in qres["items"]:
         raise HTTPException(status_code=404, detail=f"{dedup_site_id} not found")
-    return output[dedup_site_id].to_dict()
+
+    dmsi = qres["items"][dedup_site_id]
+    response.headers.update(
+        get_dedup_site_validators(
+            DedupSiteVersion.from_dedup_site(dmsi.dms), commodity
+        ).headers()
+    )
+    (dedup_site,) = await run_in_threadpool(convert_dedup_sites, [dmsi], commodity)
+    return dedup_site.to_dict()
+
+
+def convert_dedup_sites(
+    dmsis: list[DedupMineralSiteAndInventory], commodity: Optional[InternalID]
+) -> list[DedupMineralSitePublic]:
+    """Convert the dedup sites to their public version, it is CPU-bound so the async
+    handlers run it in the thread pool"""
+    with timed("convert"):
+        return [DedupMineralSitePublic.from_kgrel(dmsi, commodity) for dmsi in dmsis]
+
+
+def get_dedup_site_validators(
+    version: DedupSiteVersion, commodity: Optional[InternalID]
+) -> Validators:
+    # the response only has the inventories of the commodity
+    return Validators.create(version.modified_at, version.site_ids, commodity)
 
 
 def format_csv(
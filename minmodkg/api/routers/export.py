@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from minmodkg.config import MINMOD_PARQUET_DIR
+from minmodkg.etl.parquet import (
+    PARQUET_DATASETS,
+    PARQUET_PARTITION_KEY,
+    get_parquet_file,
+)
+from minmodkg.typing import InternalID
+
+router = APIRouter(tags=["export"])
+
+ParquetDataset = Literal[
+    "dedup_mineral_site", "mineral_site", "dedup_mineral_inventory"
+]
+
+
+@router.get("/export/parquet")
+def list_parquet_datasets() -> dict[str, list[InternalID]]:
+    """List the commodities that have a partition in each parquet dataset"""
+    parquet_dir = get_parquet_dir()
+    return {
+        dataset: sorted(
+            file.name.split("=", 1)[1]
+            for file in (parquet_dir / dataset).glob(f"{PARQUET_PARTITION_KEY}=*")
+        )
+        for dataset in PARQUET_DATASETS
+    }
+
+
+@router.get("/export/parquet/{dataset}/{commodity}")
+def get_parquet_partition(dataset: ParquetDataset, commodity: InternalID):
+    """Download the partition of a commodity of a parquet dataset"""
+    if re.match(r"^[a-zA-Z0-9_\-]+$", commodity) is None:
+        raise HTTPException(status_code=400, detail="Invalid commodity")
+    file = get_parquet_file(get_parquet_dir(), dataset, commodity)
+    if not file.exists():
+        raise HTTPException(status_code=404, detail=f"{commodity} not found")
+    return FileResponse(
+        file,
+        media_type="application/vnd.apache.parquet",
+        filename=f"{dataset}_{commodity}.parquet",
+    )
+
+
+def get_parquet_dir() -> Path:
+    if MINMOD_PARQUET_DIR is None:
+        raise HTTPException(status_code=404, detail="Parquet export is not enabled")
+    return Path(MINMOD_PARQUET_DIR)
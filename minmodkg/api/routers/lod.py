@@ -8,6 +8,7 @@ import htbuilder as H
 import rdflib
 import rdflib.term
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from minmodkg.api.models.public_dedup_mineral_site import DedupMineralSitePublic
 from minmodkg.models.kg.base import MINMOD_KG, MINMOD_NS
@@ -38,64 +39,75 @@ def get_hostname():
 
 
 @router.get("/resource/{resource_id}")
-def get_resource(
+async def get_resource(
     resource_id: str,
     format: Annotated[Literal["html", "json"], Query()] = "html",
     remove_hostname: Annotated[Literal["yes", "no"], Query()] = "no",
 ):
     uri = MINMOD_NS.mr.uri(resource_id)
 
-    if not MINMOD_KG.has(uri):
+    if not await MINMOD_KG.ahas(uri):
         if resource_id.startswith("site__"):
-            msi = MineralSiteService().find_by_id(resource_id)
+            msi = await MineralSiteService().afind_by_id(resource_id)
             if msi is not None:
-                return render_dict_html(
-                    msi.ms.name or "",
-                    uri,
-                    msi.to_dict(),
+                return await run_in_threadpool(
+                    render_dict_html, msi.ms.name or "", uri, msi.to_dict()
                 )
 
         raise HTTPException(status_code=404, detail="Resource not found")
 
     if format == "html":
-        return render_entity_html(
-            uri, remove_hostname=get_hostname() if remove_hostname == "yes" else None
+        return await run_in_threadpool(
+            render_entity_html,
+            uri,
+            remove_hostname=get_hostname() if remove_hostname == "yes" else None,
+            g=await aget_entity_data(uri),
         )
     if format == "json":
-        return render_entity_json(uri)
+        return await run_in_threadpool(
+            render_entity_json, uri, await aget_entity_data(uri)
+        )
     raise HTTPException(status_code=400, detail="Invalid format")
 
 
 @router.get("/ontology/{resource_id}")
-def get_ontology(
+async def get_ontology(
     resource_id: str,
     format: Annotated[Literal["html", "json"], Query()] = "html",
     remove_hostname: Annotated[Literal["yes", "no"], Query()] = "no",
 ):  # -> HTMLResponse | dict[Any, Any]:
     uri = MINMOD_NS.mo.uri(resource_id)
-    if not MINMOD_KG.has(uri):
+    if not await MINMOD_KG.ahas(uri):
         raise HTTPException(status_code=404, detail="Resource not found")
 
     if format == "html":
-        return render_entity_html(
-            uri, remove_hostname=get_hostname() if remove_hostname == "yes" else None
+        return await run_in_threadpool(
+            render_entity_html,
+            uri,
+            remove_hostname=get_hostname() if remove_hostname == "yes" else None,
+            g=await aget_entity_data(uri),
         )
     if format == "json":
-        return render_entity_json(uri)
+        return await run_in_threadpool(
+            render_entity_json, uri, await aget_entity_data(uri)
+        )
     raise HTTPException(status_code=400, detail="Invalid format")
 
 
 @router.get("/derived/{resource_id}")
-def get_derived(
+async def get_derived(
     resource_id: str,
     format: Annotated[Literal["html", "json"], Query()] = "html",
     remove_hostname: Annotated[Literal["yes", "no"], Query()] = "no",
 ):  # -> HTMLResponse | dict[Any, Any]:
     if resource_id.startswith("dedup_site__"):
-        dmsi = MineralSiteService().find_dedup_by_id(resource_id)
+        dmsi = await MineralSiteService().afind_dedup_by_id(resource_id)
         if dmsi is None:
             raise HTTPException(status_code=404, detail="Resource not found")
-        dedup_site = DedupMineralSitePublic.from_kgrel(dmsi, commodity=None)
+        # rendering is CPU-bound, so it runs in the thread pool to not block other requests
+        dedup_site = await run_in_threadpool(
+            DedupMineralSitePublic.from_kgrel, dmsi, commodity=None
+        )
         if format == "json":
             return dedup_site.to_dict()
         if format == "html":
@@ -158,7 +170,9 @@ def get_derived(
                 ),
             }
 
-            return render_dict_html(
+            # the entities are loaded from the database on first use
+            return await run_in_threadpool(
+                render_dict_html,
                 dedup_site.name,
                 MINMOD_NS.md.uri(resource_id),
                 dedup_site.to_dict(),
@@ -167,26 +181,38 @@ def get_derived(
             )
 
     uri = MINMOD_NS.md.uri(resource_id)
-    if not MINMOD_KG.has(uri):
+    if not await MINMOD_KG.ahas(uri):
         raise HTTPException(status_code=404, detail="Resource not found")
 
     if format == "html":
-        return render_entity_html(
+        return await run_in_threadpool(
+            render_entity_html,
             uri,
             remove_hostname=get_hostname() if remove_hostname == "yes" else None,
+            g=await aget_entity_data(uri),
         )
 
     if format == "json":
-        return render_entity_json(uri)
+        return await run_in_threadpool(
+            render_entity_json, uri, await aget_entity_data(uri)
+        )
     raise HTTPException(status_code=400, detail="Invalid format")
 
 
 def get_entity_data(subj: URIRef) -> Graph:
+    return MINMOD_KG.construct(get_entity_data_query(subj))
+
+
+async def aget_entity_data(subj: URIRef) -> Graph:
+    return await MINMOD_KG.aconstruct_graph(get_entity_data_query(subj))
+
+
+def get_entity_data_query(subj: URIRef) -> str:
     # https://stackoverflow.com/questions/37186530/how-do-i-construct-get-the-whole-sub-graph-from-a-given-resource-in-rdf-graph/37213209#37213209
     # adapt from this answer to fit our need
     # we do not blindly follow all paths (<>|!<>)* and filter out the URI nodes because it follows
     # the sameAs path, which leads to explosive results
-    return MINMOD_KG.construct(
+    return (
         """
     CONSTRUCT { 
         ?s ?p ?o . 
@@ -204,6 +230,16 @@ def get_entity_data(subj: URIRef) -> Graph:
     )
 
 
+def to_n3(node: URIRef | RDFLiteral, g: Graph) -> str:
+    """Get the N3 representation of a node. URIs of our namespaces are compacted directly as
+    it is much faster than the namespace manager of rdflib."""
+    if isinstance(node, URIRef):
+        reluri = MINMOD_NS.compact(node)
+        if reluri is not None:
+            return reluri
+    return node.n3(g.namespace_manager)
+
+
 def render_entity_json(subj: URIRef, g: Optional[Graph] = None):
     if g is None:
         g = get_entity_data(subj)
@@ -214,7 +250,7 @@ def render_entity_json(subj: URIRef, g: Optional[Graph] = None):
         if obj == RDF.type:
             return "@type"
         assert isinstance(obj, (URIRef, RDFLiteral))
-        return obj.n3(g.namespace_manager).rsplit(":", 1)[-1]
+        return to_n3(obj, g).rsplit(":", 1)[-1]
 
     def make_tree(obj: rdflib.term.Node, visited: set):
         if isinstance(obj, RDFLiteral):
@@ -266,7 +302,7 @@ def render_entity_html(
         if (subj, RDFS.label, None) in g:
             return next(g.objects(subj, RDFS.label))
         assert isinstance(subj, (URIRef, RDFLiteral))
-        return subj.n3(g.namespace_manager)
+        return to_n3(subj, g)
 
     def get_href(subj: rdflib.term.Node):
         if (
@@ -283,7 +319,7 @@ def render_entity_html(
 
         if isinstance(subj, URIRef):
             if p in DO_NOT_FOLLOW_PREDICATE:
-                subj_name = subj.n3(g.namespace_manager)
+                subj_name = to_n3(subj, g)
                 if (subj, RDFS.label, None) in g:
                     subj_name = next(g.objects(subj, RDFS.label))
                 return H.a(href=get_href(subj))(subj_name)
@@ -293,7 +329,7 @@ def render_entity_html(
                     obj in DO_NOT_FOLLOW_PREDICATE_OBJECT[p]
                     for obj in g.objects(subj, RDF.type)
                 ):
-                    subj_name = subj.n3(g.namespace_manager)
+                    subj_name = to_n3(subj, g)
                     if (subj, RDFS.label, None) in g:
                         subj_name = next(g.objects(subj, RDFS.label))
                     return H.a(href=get_href(subj))(subj_name)
@@ -304,7 +340,7 @@ def render_entity_html(
         visited.add(subj)
         children = []
         if isinstance(subj, URIRef):
-            subj_name = subj.n3(g.namespace_manager)
+            subj_name = to_n3(subj, g)
             if (subj, RDFS.label, None) in g:
                 subj_name = next(g.objects(subj, RDFS.label))
             children.append(H.tr(H.td(colspan=2)(H.a(href=get_href(subj))(subj_name))))
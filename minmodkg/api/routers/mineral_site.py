@@ -3,6 +3,8 @@ from __future__ import annotations
 from typing import Annotated, Literal, Optional
 
 from fastapi import APIRouter, Body, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from minmodkg.api.conditional import Validators, is_conditional
 from minmodkg.api.dependencies import (
     CurrentUserDep,
     MineralSiteServiceDep,
@@ -12,16 +14,19 @@ from minmodkg.api.models.public_mineral_site import (
     InputPublicMineralSite,
     OutputPublicMineralSite,
 )
+from minmodkg.api.responses import FastJSONResponse
+from minmodkg.misc.timing import timed
 from minmodkg.models.kg.base import NS_MR
-from minmodkg.models.kgrel.mineral_site import MineralSite
+from minmodkg.models.kgrel.mineral_site import MineralSite, MineralSiteAndInventory
 from minmodkg.services.kgrel_entity import EntityService
 from minmodkg.services.mineral_site import (
     ExpiredSnapshotIdError,
+    SiteNotFoundError,
+    SiteVersion,
     UnsupportOperationError,
 )
 from minmodkg.transformations import make_site_id
 from minmodkg.typing import InternalID
-from minmodkg.validators import validate_mineral_site
 from pydantic import BaseModel
 from sqlalchemy import select
 
@@ -48,42 +53,82 @@ def get_site_uri(
     )
 
 
-@router.post("/mineral-sites/find_by_ids")
-def get_sites(
+@router.post("/mineral-sites/find_by_ids", response_class=FastJSONResponse)
+async def get_sites(
     ids: Annotated[list[InternalID], Body(embed=True, alias="ids")],
     mineral_site_service: MineralSiteServiceDep,
+    request: Request,
 ):
-    return {
-        k: OutputPublicMineralSite.from_kgrel(v).to_dict()
-        for k, v in mineral_site_service.find_by_ids(ids).items()
-    }
+    if is_conditional(request):
+        versions = await mineral_site_service.aget_site_versions(ids)
+        validators = get_sites_validators(versions)
+        if validators is not None and validators.is_not_modified(request):
+            return validators.not_modified()
+
+    sites = await mineral_site_service.afind_by_ids(ids)
+    validators = get_sites_validators(
+        {
+            site_id: SiteVersion(msi.ms.modified_at, msi.ms.dedup_site_id)
+            for site_id, msi in sites.items()
+        }
+    )
+
+    def render_json():
+        with timed("convert"):
+            output = {
+                k: OutputPublicMineralSite.from_kgrel(v).to_dict()
+                for k, v in sites.items()
+            }
+        return FastJSONResponse(
+            output,
+            headers=validators.headers() if validators is not None else None,
+        )
+
+    # converting & encoding the sites is CPU-bound, so it runs in the thread pool to not
+    # block the other requests
+    return await run_in_threadpool(render_json)
 
 
 @router.head("/mineral-sites/{site_id}")
-def has_site(
+async def has_site(
     site_id: InternalID,
     mineral_site_service: MineralSiteServiceDep,
 ):
-    site_db_id = mineral_site_service.get_site_db_id(site_id)
+    site_db_id = await mineral_site_service.aget_site_db_id(site_id)
     if site_db_id is None:
         return Response(status_code=status.HTTP_404_NOT_FOUND)
     return Response(status_code=status.HTTP_200_OK)
 
 
 @router.get("/mineral-sites/{site_id}")
-def get_site(
+async def get_site(
     site_id: InternalID,
     mineral_site_service: MineralSiteServiceDep,
+    request: Request,
+    response: Response,
     format: Literal["json"] = "json",
 ):
-    mineral_site = mineral_site_service.find_by_id(site_id)
+    if is_conditional(request):
+        # check the version first so that we don't read the site if the client has it
+        versions = await mineral_site_service.aget_site_versions([site_id])
+        if site_id in versions:
+            validators = get_site_validators(versions[site_id])
+            if validators.is_not_modified(request):
+                return validators.not_modified()
+
+    mineral_site = await mineral_site_service.afind_by_id(site_id)
     if mineral_site is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="The requested site does not exist.",
         )
     if format == "json":
-        return OutputPublicMineralSite.from_kgrel(mineral_site).to_dict()
+        response.headers.update(
+            get_site_validators(
+                SiteVersion(mineral_site.ms.modified_at, mineral_site.ms.dedup_site_id)
+            ).headers()
+        )
+        return await run_in_threadpool(convert_site, mineral_site)
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -91,6 +136,29 @@ def get_site(
         )
 
 
+def convert_site(site: MineralSiteAndInventory) -> dict:
+    """Convert a site to its public version, it is CPU-bound so the async handlers run it
+    in the thread pool"""
+    with timed("convert"):
+        return OutputPublicMineralSite.from_kgrel(site).to_dict()
+
+
+def get_site_validators(version: SiteVersion) -> Validators:
+    return Validators.create(version.modified_at, version.dedup_site_id)
+
+
+def get_sites_validators(
+    versions: dict[InternalID, SiteVersion]
+) -> Optional[Validators]:
+    """Get the validators of a list of sites, the order of the sites does not matter"""
+    if len(versions) == 0:
+        return None
+    return Validators.create(
+        max(version.modified_at for version in versions.values()),
+        sorted((site_id, *version) for site_id, version in versions.items()),
+    )
+
+
 @router.post("/same-as")
 def update_same_as(
     same_site_groups: list[UpdateDedupLink],
@@ -155,17 +223,13 @@ def update_site(
             detail="The site_id in the request body does not match the site_id in the URL.",
         )
 
-    site_db_id = mineral_site_service.get_site_db_id(site_id)
-    if site_db_id is None:
+    try:
+        mineral_site_service.update(upd_msi, site_snapshot_id=snapshot_id)
+    except SiteNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The site doesn't exist",
         )
-
-    try:
-        mineral_site_service.update(
-            upd_msi.set_id(site_db_id), site_snapshot_id=snapshot_id
-        )
     except ExpiredSnapshotIdError as e:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -192,6 +256,9 @@ def validate_site(mineral_site: Annotated[dict, Body()]):
 
 def _validate_site(ms: dict | InputPublicMineralSite):
     try:
+        # the validators depend on heavy libraries, so we only import them when needed
+        from minmodkg.validators import validate_mineral_site
+
         validate_mineral_site([ms], EntityService.get_instance())  # type: ignore
     except ValueError as e:
         cause_str = f". Caused by: {str(e.__cause__)}" if e.__cause__ else ""
@@ -9,8 +9,8 @@ cache_response = CacheResponse()
 
 
 @router.get("/documents/count")
-def document_count(response: Response):
-    return cache_response(
+async def document_count(response: Response):
+    return await cache_response.acall(
         key="document_count",
         expired=60 * 60,
         response=response,
@@ -19,8 +19,8 @@ def document_count(response: Response):
 
 
 @router.get("/mineral-inventories/count")
-def inventory_count(response: Response):
-    return cache_response(
+async def inventory_count(response: Response):
+    return await cache_response.acall(
         key="inventory_count",
         expired=3 * 60 * 60,
         response=response,
@@ -29,8 +29,8 @@ def inventory_count(response: Response):
 
 
 @router.get("/mineral-sites/count")
-def mineralsites_count(response: Response):
-    return cache_response(
+async def mineralsites_count(response: Response):
+    return await cache_response.acall(
         key="mineralsites_count",
         expired=60 * 60,
         response=response,
@@ -39,8 +39,8 @@ def mineralsites_count(response: Response):
 
 
 @router.get("/mineral-inventories/count-by-commodity")
-def inventory_by_commodity(response: Response):
-    return cache_response(
+async def inventory_by_commodity(response: Response):
+    return await cache_response.acall(
         key="inventory_by_commodity",
         expired=3 * 60 * 60,
         response=response,
@@ -49,8 +49,8 @@ def inventory_by_commodity(response: Response):
 
 
 @router.get("/mineral-sites/count-by-commodity")
-def mineralsites_by_commodity(response: Response):
-    return cache_response(
+async def mineralsites_by_commodity(response: Response):
+    return await cache_response.acall(
         key="mineralsites_by_commodity",
         expired=3 * 60 * 60,
         response=response,
@@ -59,8 +59,8 @@ def mineralsites_by_commodity(response: Response):
 
 
 @router.get("/documents/count-by-commodity")
-def documents_by_commodity(response: Response):
-    return cache_response(
+async def documents_by_commodity(response: Response):
+    return await cache_response.acall(
         key="documents_by_commodity",
         expired=3 * 60 * 60,
         response=response,
@@ -68,7 +68,7 @@ def documents_by_commodity(response: Response):
     )
 
 
-def get_document_count():
+async def get_document_count():
     assert MINMOD_KG.ns.mo.alias == "mo"
     query = """
         SELECT (COUNT(?doc) AS ?total)
@@ -76,11 +76,11 @@ def get_document_count():
             ?doc a mo:Document .
         }
     """
-    qres = MINMOD_KG.query(query)
+    qres = await MINMOD_KG.aquery(query)
     return qres[0]
 
 
-def get_inventory_count():
+async def get_inventory_count():
     assert MINMOD_KG.ns.mo.alias == "mo"
     query = """
         SELECT (COUNT(?mi) AS ?total)
@@ -88,11 +88,11 @@ def get_inventory_count():
             ?mi a mo:MineralInventory .
         }
     """
-    qres = MINMOD_KG.query(query)
+    qres = await MINMOD_KG.aquery(query)
     return qres[0]
 
 
-def get_mineralsites_count():
+async def get_mineralsites_count():
     assert MINMOD_KG.ns.mo.alias == "mo"
     query = """
        SELECT (COUNT(?ms) AS ?total)
@@ -100,11 +100,11 @@ def get_mineralsites_count():
             ?ms a mo:MineralSite .
         }
     """
-    qres = MINMOD_KG.query(query)
+    qres = await MINMOD_KG.aquery(query)
     return qres[0]
 
 
-def get_inventory_by_commodity():
+async def get_inventory_by_commodity():
     assert MINMOD_KG.ns.mo.alias == "mo"
     query = """
         SELECT  ?commodity_uri ?commodity_label ?total
@@ -120,11 +120,11 @@ def get_inventory_by_commodity():
             ?commodity_uri rdfs:label ?commodity_label .
         }
     """
-    qres = MINMOD_KG.query(query)
+    qres = await MINMOD_KG.aquery(query)
     return qres
 
 
-def get_mineralsites_by_commodity():
+async def get_mineralsites_by_commodity():
     assert MINMOD_KG.ns.mo.alias == "mo"
     query = """
         SELECT  ?commodity_uri ?commodity_label ?total
@@ -142,11 +142,11 @@ def get_mineralsites_by_commodity():
         }
         
     """
-    qres = MINMOD_KG.query(query)
+    qres = await MINMOD_KG.aquery(query)
     return qres
 
 
-def get_documents_by_commodity():
+async def get_documents_by_commodity():
     assert MINMOD_KG.ns.mo.alias == "mo"
     query = """
 
@@ -163,5 +163,5 @@ def get_documents_by_commodity():
             ?commodity_uri rdfs:label ?commodity_label .
         }
     """
-    qres = MINMOD_KG.query(query)
+    qres = await MINMOD_KG.aquery(query)
     return qres
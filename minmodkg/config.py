@@ -19,9 +19,48 @@ cfg = serde.yaml.deser(CFG_FILE)
 MINMOD_KG_CLSPATH = cfg["triplestore"]["classpath"]
 MINMOD_KG_CLSARGS = cfg["triplestore"]["args"]
 MINMOD_NS_CFG = cfg["namespace"]
+# options of the async HTTP client of the triple store
+MINMOD_KG_ASYNC_CLIENT = {
+    # seconds to wait for a response, None to wait forever
+    "timeout": None,
+    "max_connections": 100,
+    # seconds to wait for a free connection before failing (the API responds 503), so that
+    # the queries do not queue without limit when the triple store is overloaded
+    "pool_timeout": 10,
+    **cfg["triplestore"].get("async_client", {}),
+}
 
 # for minmod KG rel
 MINMOD_KGREL_DB = cfg["kgrel"]
+# connection string of the async engine, derived from MINMOD_KGREL_DB (asyncpg) if not set
+MINMOD_KGREL_ASYNC_DB = cfg.get("kgrel_async", None)
+# optional read replica serving the read-only queries (its async engine uses asyncpg)
+MINMOD_KGREL_REPLICA_DB = cfg.get("kgrel_replica", None)
+# connection pool of each engine (sync and async): a request waits at most `pool_timeout`
+# seconds for a connection before failing
+MINMOD_KGREL_POOL = {
+    "pool_size": 10,
+    "max_overflow": 10,
+    "pool_timeout": 10,
+    "pool_recycle": 1800,
+    **cfg.get("kgrel_pool", {}),
+}
+# optional directory of the parquet datasets (exported by the ETL) served by the API
+MINMOD_PARQUET_DIR = cfg.get("parquet_dir", None)
+# optional per-request timings reported in the Server-Timing header, None to disable;
+# requests taking at least `slow_request_seconds` are logged with their queries
+MINMOD_SERVER_TIMING = cfg.get("server_timing", None)
+# compression of the textual responses negotiated from Accept-Encoding (zstd or gzip), set
+# `compression` to null to disable it (e.g., when the proxy compresses the responses)
+MINMOD_COMPRESSION = cfg.get("compression", {})
+if MINMOD_COMPRESSION is not None:
+    MINMOD_COMPRESSION = {
+        # responses smaller than this (in bytes) are not worth compressing
+        "minimum_size": 1024,
+        "gzip_level": 6,
+        "zstd_level": 3,
+        **MINMOD_COMPRESSION,
+    }
 MINMOD_DEBUG = os.environ.get("MINMOD_DEBUG", "0") == "1"
 
 # for dedup algorithm
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+import serde.json
+
+from statickg.models.etl import ETLOutput
+from statickg.models.file_and_path import InputFile, ProcessStatus
+from statickg.models.repository import Repository
+from statickg.services.data_loader import (
+    DataLoaderService,
+    DataLoaderServiceInvokeArgs,
+    DBInfo,
+)
+
+# the changesets are stored in a hidden sub-directory so that they are not matched by the
+# patterns of the loaders' input files
+CHANGESET_DIR = ".changes"
+
+
+def get_changeset_file(file: Path) -> Path:
+    """Get the changeset file of an exported file"""
+    return file.parent / CHANGESET_DIR / (file.name + ".json")
+
+
+def get_file_key(file: Path) -> str:
+    """Get the key of a file, which is the same as the key used by the data loaders"""
+    return hashlib.sha256(file.read_bytes()).hexdigest()
+
+
+def write_changeset(file: Path, prev_key: Optional[str], changes: dict):
+    """Write the changes between the previous version of the file (identified by its key) and
+    the current version of the file. If there is no previous version, the changeset is removed
+    so that the loaders load the file from scratch."""
+    changeset_file = get_changeset_file(file)
+    if prev_key is None:
+        changeset_file.unlink(missing_ok=True)
+        return
+    changeset_file.parent.mkdir(parents=True, exist_ok=True)
+    serde.json.ser(
+        {"from": prev_key, "to": get_file_key(file), **changes}, changeset_file
+    )
+
+
+class ChangesetDataLoaderService(DataLoaderService):
+    """A data loader that applies the changesets of the modified input files directly to the
+    current database, so that it does not need to reload all files from scratch.
+
+    A changeset is applied when the database has loaded the exact version of the file that
+    the changeset is computed from, and the current version of the file is the version the
+    changeset leads to. Otherwise, the file is treated as modified as usual.
+    """
+
+    def forward(
+        self, repo: Repository, args: DataLoaderServiceInvokeArgs, tracker: ETLOutput
+    ):
+        self.apply_changesets(repo, args)
+        return super().forward(repo, args, tracker)
+
+    def apply_changesets(self, repo: Repository, args: DataLoaderServiceInvokeArgs):
+        dbinfo = self.get_current_dbinfo()
+        if not dbinfo.is_valid():
+            return
+
+        infiles = self.list_files(
+            repo,
+            args["input"],
+            unique_filepath=True,
+            optional=args.get("optional", False),
+            compute_missing_file_key=True,
+        )
+        pending: list[tuple[InputFile, dict]] = []
+        for infile in infiles:
+            infile_ident = infile.get_path_ident()
+            if infile_ident not in self.cache.db:
+                continue
+            status = self.cache.db[infile_ident]
+            if not status.is_success or status.key == dbinfo.get_file_key(infile.key):
+                continue
+
+            changeset_file = get_changeset_file(infile.path)
+            if not changeset_file.exists():
+                continue
+            changeset = serde.json.deser(changeset_file)
+            if (
+                status.key == dbinfo.get_file_key(changeset["from"])
+                and infile.key == changeset["to"]
+            ):
+                pending.append((infile, changeset))
+
+        if len(pending) == 0:
+            return
+
+        self.logger.info("Applying the changesets of {} files", len(pending))
+        self.start_service(dbinfo)
+        self.apply_changeset(dbinfo, [changeset for _, changeset in pending])
+        for infile, _ in pending:
+            self.cache.db[infile.get_path_ident()] = ProcessStatus(
+                dbinfo.get_file_key(infile.key), is_success=True
+            )
+
+    def apply_changeset(self, dbinfo: DBInfo, changesets: list[dict]):
+        """Apply the changesets to the running database"""
+        raise NotImplementedError()
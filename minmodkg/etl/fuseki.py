@@ -2,28 +2,58 @@ from __future__ import annotations
 
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Mapping, NotRequired
 
 import httpx
+from minmodkg.etl.changeset import ChangesetDataLoaderService
 from minmodkg.libraries.rdf.fuseki import FusekiDB
 from minmodkg.models.kg.base import MINMOD_NS
-from rdflib import Graph
+from rdflib import BNode, Graph
+from rdflib.term import Node
 from tqdm import tqdm
 
 from statickg.models.file_and_path import BaseType, InputFile
 from statickg.services.data_loader import (
-    DataLoaderService,
+    DataLoaderServiceConstructArgs,
     DataLoaderServiceInvokeArgs,
     DBInfo,
 )
+from statickg.services.interface import BaseService
 
 
-class FusekiLoaderService(DataLoaderService):
+class FusekiLoaderServiceConstructArgs(DataLoaderServiceConstructArgs):
+    # number of files uploaded at the same time
+    max_concurrent_uploads: NotRequired[int]
+    # maximum number of triples per update when replacing files
+    replace_batch_size: NotRequired[int]
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+CONTENT_TYPES = {
+    "turtle": "text/turtle; charset=utf-8",
+    "nt": "application/n-triples; charset=utf-8",
+}
+
+
+class FusekiLoaderService(ChangesetDataLoaderService):
 
     query_endpoint = "/minmod/sparql"
     update_endpoint = "/minmod/update"
     gsp_endpoint = "/minmod/data"
 
+    def __init__(
+        self,
+        name: str,
+        workdir: Path,
+        args: FusekiLoaderServiceConstructArgs,
+        services: Mapping[str, BaseService],
+    ):
+        super().__init__(name, workdir, args, services)
+        self.max_concurrent_uploads = args.get("max_concurrent_uploads", 4)
+        self.replace_batch_size = args.get("replace_batch_size", 10000)
+
     def get_db_service_id(self, db_store_dir: Path) -> str:
         return f"kg-{db_store_dir.name}"
 
@@ -51,23 +81,70 @@ class FusekiLoaderService(DataLoaderService):
         """Replace the content of the files in the database. We expect the the entities in the files are the same, only the content is different."""
         self.start_service(dbinfo)
 
-        g = Graph()
+        assert dbinfo.endpoint is not None
+        triplestore = FusekiDB(
+            MINMOD_NS,
+            f"{dbinfo.endpoint}{self.query_endpoint}",
+            f"{dbinfo.endpoint}{self.update_endpoint}",
+        )
+
+        # **ALGO**
+        # compare the triples of the subjects in each file with their current triples in the
+        # database, then only delete the removed triples and insert the new triples, in
+        # batches of at most `replace_batch_size` triples so that no update is too large.
         for file in files:
+            g = Graph()
             g.parse(file.path, format=self.detect_format(file.path))
-
+            if any(isinstance(term, BNode) for triple in g for term in triple):
+                raise ValueError(
+                    f"Replaceable files must not contain blank nodes: {file.path}"
+                )
+
+            subjects = list(g.subjects(unique=True))
+            current: set[tuple[Node, Node, Node]] = set()
+            for i in range(0, len(subjects), self.replace_batch_size):
+                current.update(
+                    triplestore.construct(
+                        "CONSTRUCT { ?s ?p ?o } WHERE { VALUES ?s { %s } ?s ?p ?o }"
+                        % " ".join(
+                            s.n3() for s in subjects[i : i + self.replace_batch_size]
+                        )
+                    )
+                )
+
+            new = set(g)
+            for op, triples in [
+                (triplestore.delete, list(current.difference(new))),
+                (triplestore.insert, list(new.difference(current))),
+            ]:
+                for i in range(0, len(triples), self.replace_batch_size):
+                    op(
+                        [
+                            (s.n3(), p.n3(), o.n3())
+                            for s, p, o in triples[i : i + self.replace_batch_size]
+                        ]
+                    )
+
+    def apply_changeset(self, dbinfo: DBInfo, changesets: list[dict]):
+        """Delete the removed triples and insert the new triples of the changesets"""
         assert dbinfo.endpoint is not None
         triplestore = FusekiDB(
             MINMOD_NS,
             f"{dbinfo.endpoint}{self.query_endpoint}",
             f"{dbinfo.endpoint}{self.update_endpoint}",
         )
-        triplestore._sparql_update(
-            "DELETE { ?s ?p ?o } INSERT { %s } WHERE { OPTIONAL { ?s ?p ?o VALUES ?s { %s } } }"
-            % (
-                " . ".join(f"{s.n3()} {p.n3()} {o.n3()}" for s, p, o in g),
-                " ".join(s.n3() for s in g.subjects(unique=True)),
-            )
-        )
+        for changeset in changesets:
+            for op, triples in [
+                (triplestore.delete, changeset["delete"]),
+                (triplestore.insert, changeset["insert"]),
+            ]:
+                for i in range(0, len(triples), self.replace_batch_size):
+                    op(
+                        [
+                            tuple(triple.split(" ", 2))
+                            for triple in triples[i : i + self.replace_batch_size]
+                        ]
+                    )
 
     def load_files(
         self, args: DataLoaderServiceInvokeArgs, dbinfo: DBInfo, files: list[InputFile]
@@ -75,10 +152,22 @@ class FusekiLoaderService(DataLoaderService):
         """Load files into the database"""
         assert len(files) > 0
         if dbinfo.endpoint is not None:
-            # the service is already running
+            # the service is already running, upload several files at the same time
             gsp_endpoint = f"{dbinfo.endpoint}{self.gsp_endpoint}"
-            for file in tqdm(files, desc="Upload files to Fuseki"):
-                self.upload_file(gsp_endpoint, file.path)
+            with (
+                httpx.Client(verify=False, timeout=None) as client,
+                ThreadPoolExecutor(max_workers=self.max_concurrent_uploads) as executor,
+            ):
+                futures = [
+                    executor.submit(self.upload_file, client, gsp_endpoint, file.path)
+                    for file in files
+                ]
+                for future in tqdm(
+                    as_completed(futures),
+                    total=len(futures),
+                    desc="Upload files to Fuseki",
+                ):
+                    future.result()
         else:
             # prepare an input file containing all files needed to be loaded
             assert all(file.basetype == BaseType.DATA_DIR for file in files)
@@ -98,15 +187,23 @@ class FusekiLoaderService(DataLoaderService):
                 shell=True,
             )
 
-    def upload_file(self, gsp_endpoint: str, file: Path):
-        resp = httpx.post(
-            gsp_endpoint,
-            content=file.read_text(),
-            headers={"Content-Type": f"text/{self.detect_format(file)}; charset=utf-8"},
-            verify=False,
-        )
+    def upload_file(self, client: httpx.Client, gsp_endpoint: str, file: Path):
+        """Upload a file through the Graph Store Protocol. The file is streamed as a
+        chunked request body, so it is never loaded into memory."""
+        with open(file, "rb") as f:
+            resp = client.post(
+                gsp_endpoint,
+                content=iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""),
+                headers={"Content-Type": CONTENT_TYPES[self.detect_format(file)]},
+            )
         assert resp.status_code == 200, (resp.status_code, resp.text)
 
     def detect_format(self, file: Path):
-        assert file.suffix == ".ttl", f"Only turtle files (.ttl) are supported: {file}"
+        """Detect the RDF format of a file. N-Triples (.nt) is preferred for large files as
+        it is cheaper to parse than Turtle."""
+        if file.suffix == ".nt":
+            return "nt"
+        assert (
+            file.suffix == ".ttl"
+        ), f"Only turtle (.ttl) and n-triples (.nt) files are supported: {file}"
         return "turtle"
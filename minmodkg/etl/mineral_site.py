@@ -3,21 +3,23 @@ from __future__ import annotations
 from collections import defaultdict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, Mapping, NamedTuple, NotRequired, TypedDict
+from typing import Iterable, Mapping, NamedTuple, NotRequired, Optional, TypedDict
 
 import orjson
 import serde.json
 import xxhash
 from libactor.cache import cache
-from minmodkg.misc.utils import group_by, makedict
+from minmodkg.etl.changeset import get_changeset_file, get_file_key, write_changeset
+from minmodkg.etl.parquet import export_parquet, has_pyarrow
+from minmodkg.misc.utils import group_by, group_by_key, makedict
 from minmodkg.models.kg.base import MINMOD_KG
 from minmodkg.models.kg.mineral_site import MineralSiteIdent
 from minmodkg.models.kgrel.dedup_mineral_site import DedupMineralSite
+from minmodkg.models.kgrel.event import get_content_hash
 from minmodkg.models.kgrel.mineral_site import MineralSite as RelMineralSite
 from minmodkg.models.kgrel.mineral_site import MineralSiteAndInventory
 from minmodkg.services.kgrel_entity import FileEntityService
 from minmodkg.typing import InternalID
-from slugify import slugify
 from timer import Timer
 from tqdm import tqdm
 
@@ -297,6 +299,8 @@ class MineralSiteETLService(BaseFileService[MineralSiteETLServiceConstructArgs])
             disable=self.verbose < 1,
         ):
             kg_outfiles.add(file)
+            if (changeset_file := get_changeset_file(file)).exists():
+                kg_outfiles.add(changeset_file)
         self.remove_unknown_files(kg_outfiles, kg_outdir)
 
     def prep_kgrel_input(
@@ -325,6 +329,7 @@ class MineralSiteETLService(BaseFileService[MineralSiteETLServiceConstructArgs])
                 assert msi.ms.site_id not in id2site
                 id2site[msi.ms.site_id] = msi
 
+        lst_dedup_sites = []
         output_dedup_sites = []
         output_dedup_inventories = []
         output_sites = []
@@ -340,6 +345,7 @@ class MineralSiteETLService(BaseFileService[MineralSiteETLServiceConstructArgs])
                 [id2site[rms.site_id] for dms in lst for rms in dms.ranked_sites],
                 is_site_ranked=True,
             )
+            lst_dedup_sites.append(dedup_site)
             output_dedup_sites.append(dedup_site.dms.to_dict())
             output_dedup_inventories.extend([inv.to_dict() for inv in dedup_site.invs])
 
@@ -354,15 +360,73 @@ class MineralSiteETLService(BaseFileService[MineralSiteETLServiceConstructArgs])
                 {"invs": [inv.to_dict() for inv in msi.invs], "site": msi.ms.site_id}
             )
 
-        serde.json.ser(
-            {
-                "DedupMineralSite": output_dedup_sites,
-                "MineralSite": output_sites,
-                "MineralInventoryView": output_inventories,
-                "DedupMineralInventoryView": output_dedup_inventories,
+        tables = {
+            "DedupMineralSite": output_dedup_sites,
+            "MineralSite": output_sites,
+            "MineralInventoryView": output_inventories,
+            "DedupMineralInventoryView": output_dedup_inventories,
+        }
+        outfile = kgrel_outdir / ("dedup_sites.json" + COMPRESSION)
+        if outfile.exists():
+            prev_key = get_file_key(outfile)
+            changes = self.diff_kgrel_tables(
+                serde.json.deser(outfile), orjson.loads(orjson.dumps(tables))
+            )
+        else:
+            prev_key = None
+            changes = {}
+        serde.json.ser(tables, outfile)
+        write_changeset(outfile, prev_key, changes)
+
+        # columnar copy of the data for analytics
+        if has_pyarrow():
+            export_parquet(
+                args["output"].get_path() / "parquet",
+                lst_dedup_sites,
+                list(id2site.values()),
+            )
+        else:
+            self.logger.warning(
+                "pyarrow is not installed, skip exporting the parquet datasets"
+            )
+
+    def diff_kgrel_tables(self, prev: dict, current: dict) -> dict:
+        """Find the dedup sites and sites that are deleted or upserted (including their
+        inventories) between the previous and the current KGRel input."""
+        prev_dms = {r["id"]: r for r in prev["DedupMineralSite"]}
+        prev_dms_invs = group_by_key(prev["DedupMineralInventoryView"], "dedup_site_id")
+        prev_ms = {r["site_id"]: r for r in prev["MineralSite"]}
+        prev_ms_invs = {r["site"]: r for r in prev["MineralInventoryView"]}
+
+        dms = {r["id"]: r for r in current["DedupMineralSite"]}
+        dms_invs = group_by_key(current["DedupMineralInventoryView"], "dedup_site_id")
+        ms = {r["site_id"]: r for r in current["MineralSite"]}
+        ms_invs = {r["site"]: r for r in current["MineralInventoryView"]}
+
+        upsert_dms = [
+            id
+            for id, r in dms.items()
+            if prev_dms.get(id) != r or prev_dms_invs.get(id) != dms_invs.get(id)
+        ]
+        upsert_ms = [
+            id
+            for id, r in ms.items()
+            if prev_ms.get(id) != r or prev_ms_invs.get(id) != ms_invs[id]
+        ]
+        return {
+            "delete": {
+                "DedupMineralSite": sorted(prev_dms.keys() - dms.keys()),
+                "MineralSite": sorted(prev_ms.keys() - ms.keys()),
             },
-            kgrel_outdir / ("dedup_sites.json" + COMPRESSION),
-        )
+            "upsert": {
+                "DedupMineralSite": [dms[id] for id in upsert_dms],
+                "DedupMineralInventoryView": [
+                    inv for id in upsert_dms for inv in dms_invs.get(id, [])
+                ],
+                "MineralSite": [ms[id] for id in upsert_ms],
+                "MineralInventoryView": [ms_invs[id] for id in upsert_ms],
+            },
+        }
 
 
 class MergeFn:
@@ -409,11 +473,6 @@ class MergeFn:
     def invoke(
         self, infiles: list[InputFile], sameas_file: InputFile, outfile: Path
     ) -> Path:
-        rid2sites = defaultdict(list)
-        for infile in sorted(infiles, key=lambda x: x.path):
-            for r in serde.json.deser(infile.path):
-                rid2sites[slugify(r["record_id"])].append(r)
-
         dedup_map = {
             r["site_id"]: r["dedup_id"] for r in serde.json.deser(sameas_file.path)
         }
@@ -422,13 +481,13 @@ class MergeFn:
         # merge the data
         lst_msi: list[MineralSiteAndInventory] = []
         for infile in sorted(infiles, key=lambda x: x.path):
-            for raw_site in serde.json.deser(infile.path):
-                norm_site = MineralSiteAndInventory.from_raw_site(
-                    raw_site,
-                    commodity_form_conversion=self.entity_service.get_commodity_form_conversion(),
-                    crs_names=self.entity_service.get_crs_name(),
-                    source_score=self.entity_service.get_data_source_score(),
-                )
+            norm_sites = MineralSiteAndInventory.from_raw_sites(
+                serde.json.deser(infile.path),
+                commodity_form_conversion=self.entity_service.get_commodity_form_conversion(),
+                crs_names=self.entity_service.get_crs_name(),
+                source_score=self.entity_service.get_data_source_score(),
+            )
+            for norm_site in norm_sites:
                 norm_site.ms.dedup_site_id = dedup_map[norm_site.ms.site_id]
                 lst_msi.append(norm_site)
 
@@ -451,6 +510,10 @@ class MergeFn:
 class ExportTTLFn:
     instances = {}
 
+    VERSION = "v102"
+    SITE_MARKER = "# site "
+    DOCUMENT_TYPE = " rdf:type mo:Document"
+
     def __init__(self, workdir: Path):
         self.workdir = workdir
 
@@ -465,22 +528,102 @@ class ExportTTLFn:
         return cls.get_instance(workdir).invoke(**kwargs)
 
     @cache(
-        backend=FileSqliteBackend.factory(filename="export-v101.sqlite"),
+        backend=FileSqliteBackend.factory(filename="export-v102.sqlite"),
         cache_ser_args={
             "infile": lambda x: x.get_ident(),
         },
     )
     def invoke(self, infile: InputFile, outfile: Path) -> Path:
-        output = []
+        # **ALGO**
+        # the triples of each site are written in a block that starts with a marker containing
+        # the content hash of the site. Sites whose content has not changed since the previous
+        # export reuse their triples instead of being serialized again (their random subjects
+        # would be different otherwise), and the difference between the previous
+        # and the current export is saved as a changeset so that the loaders can apply it
+        # without reloading the whole file.
+        prev_blocks = self.read_site_blocks(outfile)
+        prev_key = get_file_key(outfile) if prev_blocks is not None else None
+        if prev_blocks is None:
+            prev_blocks = {}
+
+        blocks: dict[InternalID, tuple[str, list[str]]] = {}
         for d in serde.json.deser(infile.path)["MineralSiteAndInventory"]:
-            msi = MineralSiteAndInventory.from_dict(d)
-            output.extend(msi.ms.to_kg().to_triples())
+            site_id = d["ms"]["site_id"]
+            site_hash = get_content_hash({"version": self.VERSION, "ms": d["ms"]})
+            if site_id in prev_blocks and prev_blocks[site_id][0] == site_hash:
+                blocks[site_id] = prev_blocks[site_id]
+            else:
+                msi = MineralSiteAndInventory.from_dict(d)
+                blocks[site_id] = (
+                    site_hash,
+                    [" ".join(triple) for triple in msi.ms.to_kg().to_triples()],
+                )
 
         outfile.parent.mkdir(parents=True, exist_ok=True)
         with open(outfile, "w") as f:
             f.write(MINMOD_KG.prefix_part)
             f.write("\n")
-            for triple in output:
-                f.write(f" ".join(triple))
-                f.write(". \n")
+            for site_id, (site_hash, triples) in blocks.items():
+                f.write(f"{self.SITE_MARKER}{site_id} {site_hash}\n")
+                for triple in triples:
+                    f.write(triple)
+                    f.write(". \n")
+
+        # only the triples of the new, changed, or removed sites can be in the changeset
+        unchanged_triples = set()
+        new_triples = set()
+        for site_id, (site_hash, triples) in blocks.items():
+            if prev_blocks.get(site_id, ("",))[0] == site_hash:
+                unchanged_triples.update(triples)
+            else:
+                new_triples.update(triples)
+        old_triples = {
+            triple
+            for site_id, (site_hash, triples) in prev_blocks.items()
+            if site_id not in blocks or blocks[site_id][0] != site_hash
+            for triple in triples
+        }
+        # documents are shared between sites (and files), so their triples are never deleted
+        documents = {
+            triple.split(" ", 1)[0]
+            for triple in old_triples
+            if triple.endswith(self.DOCUMENT_TYPE)
+        }
+        write_changeset(
+            outfile,
+            prev_key,
+            {
+                "delete": sorted(
+                    triple
+                    for triple in old_triples.difference(new_triples, unchanged_triples)
+                    if triple.split(" ", 1)[0] not in documents
+                ),
+                "insert": sorted(
+                    new_triples.difference(old_triples, unchanged_triples)
+                ),
+            },
+        )
         return outfile
+
+    def read_site_blocks(
+        self, file: Path
+    ) -> Optional[dict[InternalID, tuple[str, list[str]]]]:
+        """Read the triples of each site from a previous export. Return None if the file
+        does not exist or is not exported by this version."""
+        if not file.exists():
+            return None
+
+        blocks: dict[InternalID, tuple[str, list[str]]] = {}
+        triples = None
+        with open(file, "r") as f:
+            for line in f:
+                if line.startswith(self.SITE_MARKER):
+                    site_id, site_hash = line[len(self.SITE_MARKER) :].split()
+                    triples = []
+                    blocks[site_id] = (site_hash, triples)
+                elif line.endswith(". \n"):
+                    if triples is None:
+                        # triples that do not belong to any site
+                        return None
+                    triples.append(line[:-3])
+        return blocks
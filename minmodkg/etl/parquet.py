@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import importlib.util
+import shutil
+from pathlib import Path
+from typing import Sequence
+
+from minmodkg.models.kgrel.dedup_mineral_site import DedupMineralSiteAndInventory
+from minmodkg.models.kgrel.mineral_site import MineralSiteAndInventory
+from minmodkg.typing import InternalID
+
+# name of the datasets, each dataset is a directory of parquet files partitioned by commodity
+# (hive-style: <dataset>/commodity=<commodity id>/part-0.parquet)
+PARQUET_DATASETS = [
+    "dedup_mineral_site",
+    "mineral_site",
+    "dedup_mineral_inventory",
+]
+PARQUET_PARTITION_KEY = "commodity"
+
+
+def has_pyarrow() -> bool:
+    """Whether pyarrow, which is needed to export the parquet datasets, is installed"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def get_parquet_file(outdir: Path, dataset: str, commodity: InternalID) -> Path:
+    return outdir / dataset / f"{PARQUET_PARTITION_KEY}={commodity}" / "part-0.parquet"
+
+
+def export_parquet(
+    outdir: Path,
+    dedup_sites: Sequence[DedupMineralSiteAndInventory],
+    sites: Sequence[MineralSiteAndInventory],
+):
+    """Export the dedup sites, the summaries of the sites, and the dedup inventories as
+    parquet datasets partitioned by commodity. A (dedup) site is in the partition of every
+    commodity it has inventories of, sites without inventories are not exported."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    dedup_site_rows: dict[InternalID, list[dict]] = {}
+    dedup_inv_rows: dict[InternalID, list[dict]] = {}
+    for dedup_site in dedup_sites:
+        dms = dedup_site.dms
+        row = {
+            "id": dms.id,
+            "name": dms.name.value if dms.name is not None else None,
+            "type": dms.type.value if dms.type is not None else None,
+            "rank": dms.rank.value if dms.rank is not None else None,
+            "top1_deposit_type": dms.top1_deposit_type,
+            "lat": dms.coordinates.value.lat if dms.coordinates is not None else None,
+            "lon": dms.coordinates.value.lon if dms.coordinates is not None else None,
+            "country": dms.country.value,
+            "state_or_province": dms.state_or_province.value,
+            "discovered_year": (
+                dms.discovered_year.value if dms.discovered_year is not None else None
+            ),
+            "sites": [site.site_id for site in dms.ranked_sites],
+            "modified_at": dms.modified_at,
+        }
+        for commodity in sorted({inv.commodity for inv in dedup_site.invs}):
+            dedup_site_rows.setdefault(commodity, []).append(row)
+        for inv in dedup_site.invs:
+            dedup_inv_rows.setdefault(inv.commodity, []).append(
+                {
+                    "dedup_site_id": inv.dedup_site_id,
+                    "site_id": inv.site_id,
+                    "contained_metal": inv.contained_metal,
+                    "tonnage": inv.tonnage,
+                    "grade": inv.grade,
+                    "date": inv.date,
+                }
+            )
+
+    site_rows: dict[InternalID, list[dict]] = {}
+    for msi in sites:
+        ms = msi.ms
+        row = {
+            "site_id": ms.site_id,
+            "dedup_site_id": ms.dedup_site_id,
+            "source_id": ms.source_id,
+            "record_id": ms.record_id,
+            "name": ms.name,
+            "type": ms.type,
+            "rank": ms.rank,
+            "lat": ms.location_view.lat,
+            "lon": ms.location_view.lon,
+            "country": ms.location_view.country,
+            "state_or_province": ms.location_view.state_or_province,
+            "modified_at": ms.modified_at,
+        }
+        for commodity in sorted({inv.commodity for inv in msi.invs}):
+            site_rows.setdefault(commodity, []).append(row)
+
+    # define the schemas explicitly so that all partitions have the same columns even when
+    # a column is entirely null in a partition
+    str_list = pa.list_(pa.string())
+    schemas = {
+        "dedup_mineral_site": pa.schema(
+            [
+                ("id", pa.string()),
+                ("name", pa.string()),
+                ("type", pa.string()),
+                ("rank", pa.string()),
+                ("top1_deposit_type", pa.string()),
+                ("lat", pa.float64()),
+                ("lon", pa.float64()),
+                ("country", str_list),
+                ("state_or_province", str_list),
+                ("discovered_year", pa.int64()),
+                ("sites", str_list),
+                ("modified_at", pa.int64()),
+            ]
+        ),
+        "mineral_site": pa.schema(
+            [
+                ("site_id", pa.string()),
+                ("dedup_site_id", pa.string()),
+                ("source_id", pa.string()),
+                ("record_id", pa.string()),
+                ("name", pa.string()),
+                ("type", pa.string()),
+                ("rank", pa.string()),
+                ("lat", pa.float64()),
+                ("lon", pa.float64()),
+                ("country", str_list),
+                ("state_or_province", str_list),
+                ("modified_at", pa.int64()),
+            ]
+        ),
+        "dedup_mineral_inventory": pa.schema(
+            [
+                ("dedup_site_id", pa.string()),
+                ("site_id", pa.string()),
+                ("contained_metal", pa.float64()),
+                ("tonnage", pa.float64()),
+                ("grade", pa.float64()),
+                ("date", pa.string()),
+            ]
+        ),
+    }
+
+    for dataset, partitions in [
+        ("dedup_mineral_site", dedup_site_rows),
+        ("mineral_site", site_rows),
+        ("dedup_mineral_inventory", dedup_inv_rows),
+    ]:
+        # the dataset is rewritten entirely so that partitions of removed commodities are gone
+        shutil.rmtree(outdir / dataset, ignore_errors=True)
+        for commodity, rows in partitions.items():
+            outfile = get_parquet_file(outdir, dataset, commodity)
+            outfile.parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(
+                pa.Table.from_pylist(rows, schema=schemas[dataset]),
+                outfile,
+                compression="zstd",
+            )
@@ -2,10 +2,13 @@ from __future__ import annotations
 
 import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, Mapping, NotRequired, Sequence, TypeVar
 
 import serde.json
 from minmodkg.config import MINMOD_KGREL_DB
+from minmodkg.etl.changeset import ChangesetDataLoaderService
 from minmodkg.models.kgrel.base import Base
 from minmodkg.models.kgrel.data_source import DataSource
 from minmodkg.models.kgrel.dedup_mineral_site import DedupMineralSite
@@ -17,24 +20,58 @@ from minmodkg.models.kgrel.entities.crs import CRS
 from minmodkg.models.kgrel.entities.deposit_type import DepositType
 from minmodkg.models.kgrel.entities.state_or_province import StateOrProvince
 from minmodkg.models.kgrel.entities.unit import Unit
+from minmodkg.models.kgrel.event import DataVersion
 from minmodkg.models.kgrel.mineral_site import MineralSite
+from minmodkg.models.kgrel.views.dedup_mineral_site_search import (
+    DedupMineralSiteSearch,
+)
 from minmodkg.models.kgrel.views.mineral_inventory_view import (
     DedupMineralInventoryView,
     MineralInventoryView,
 )
-from sqlalchemy import Engine, create_engine, insert
+from sqlalchemy import Engine, Index, create_engine, delete, insert, select, text
 from sqlalchemy.orm import Session
 from tqdm import tqdm
 
 from statickg.models.file_and_path import InputFile
 from statickg.services.data_loader import (
-    DataLoaderService,
+    DataLoaderServiceConstructArgs,
     DataLoaderServiceInvokeArgs,
     DBInfo,
 )
+from statickg.services.interface import BaseService
+
+T = TypeVar("T")
+
 
+class PostgresLoaderServiceConstructArgs(DataLoaderServiceConstructArgs):
+    # number of connections used to load the partitions of the input at the same time
+    max_workers: NotRequired[int]
+    # number of records of a table loaded by a connection in one transaction
+    partition_size: NotRequired[int]
 
-class PostgresLoaderService(DataLoaderService):
+
+class PostgresLoaderService(ChangesetDataLoaderService):
+    # tables that are bulk loaded, their secondary indexes are dropped during the bulk load
+    # of an empty database and rebuilt afterward
+    bulk_tables = [
+        DedupMineralSite,
+        MineralSite,
+        MineralInventoryView,
+        DedupMineralInventoryView,
+        DedupMineralSiteSearch,
+    ]
+
+    def __init__(
+        self,
+        name: str,
+        workdir: Path,
+        args: PostgresLoaderServiceConstructArgs,
+        services: Mapping[str, BaseService],
+    ):
+        super().__init__(name, workdir, args, services)
+        self.max_workers = args.get("max_workers", 8)
+        self.partition_size = args.get("partition_size", 20000)
 
     def get_db_service_id(self, db_store_dir: Path) -> str:
         return f"kgrel-{db_store_dir.name}"
@@ -76,12 +113,107 @@ class PostgresLoaderService(DataLoaderService):
         engine = self.get_engine(dbinfo)
 
         tables = defaultdict(list)
-        for file in tqdm(files, desc="Loading files"):
-            for table, records in serde.json.deser(file.path).items():
-                tables[table].extend(records)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for file_tables in tqdm(
+                executor.map(lambda file: serde.json.deser(file.path), files),
+                total=len(files),
+                desc="Loading files",
+            ):
+                for table, records in file_tables.items():
+                    tables[table].extend(records)
 
         self.restore(engine, tables)
 
+    def apply_changeset(self, dbinfo: DBInfo, changesets: list[dict]):
+        """Delete the removed sites and upsert the changed sites of the changesets"""
+        engine = self.get_engine(dbinfo)
+        with Session(engine) as session:
+            for changeset in changesets:
+                self.apply_kgrel_changeset(session, changeset)
+            # the data changed without going through the API, so its version must be bumped
+            DataVersion.bump(session)
+            session.commit()
+
+    def apply_kgrel_changeset(self, session: Session, changeset: dict):
+        deleted = changeset["delete"]
+        upserted = changeset["upsert"]
+        dedup_ids = deleted["DedupMineralSite"] + [
+            r["id"] for r in upserted["DedupMineralSite"]
+        ]
+        site_ids = deleted["MineralSite"] + [
+            r["site_id"] for r in upserted["MineralSite"]
+        ]
+
+        # the inventories of the changed (dedup) sites are replaced entirely
+        session.execute(
+            delete(DedupMineralInventoryView).where(
+                DedupMineralInventoryView.dedup_site_id.in_(dedup_ids)
+            )
+        )
+        session.execute(
+            delete(MineralInventoryView).where(
+                MineralInventoryView.site_id.in_(
+                    select(MineralSite.id).where(MineralSite.site_id.in_(site_ids))
+                )
+            )
+        )
+        session.execute(
+            delete(DedupMineralSiteSearch).where(
+                DedupMineralSiteSearch.dedup_site_id.in_(dedup_ids)
+            )
+        )
+        session.execute(
+            delete(MineralSite).where(MineralSite.site_id.in_(deleted["MineralSite"]))
+        )
+        session.execute(
+            delete(DedupMineralSite).where(
+                DedupMineralSite.id.in_(deleted["DedupMineralSite"])
+            )
+        )
+
+        # dedup sites are updated in place as the sites refer to them
+        for r in upserted["DedupMineralSite"]:
+            session.merge(DedupMineralSite.from_dict(r))
+        session.flush()
+
+        site2id = self.get_site_db_ids(session, site_ids)
+        for r in upserted["MineralSite"]:
+            site = MineralSite.from_dict(r)
+            if site.site_id in site2id:
+                site.id = site2id[site.site_id]
+            session.merge(site)
+        session.flush()
+
+        site2id = self.get_site_db_ids(session, site_ids)
+        invs = []
+        for r in upserted["MineralInventoryView"]:
+            for inv in r["invs"]:
+                inv["site_id"] = site2id[r["site"]]
+                invs.append(inv)
+        if len(invs) > 0:
+            session.execute(insert(MineralInventoryView), invs)
+        session.bulk_save_objects(
+            [
+                DedupMineralInventoryView.from_dict(r)
+                for r in upserted["DedupMineralInventoryView"]
+            ]
+        )
+        session.execute(
+            DedupMineralSiteSearch.insert_from_dedup_sites(
+                [r["id"] for r in upserted["DedupMineralSite"]]
+            )
+        )
+
+    def get_site_db_ids(self, session: Session, site_ids: list[str]) -> dict[str, int]:
+        return {
+            site_id: id
+            for site_id, id in session.execute(
+                select(MineralSite.site_id, MineralSite.id).where(
+                    MineralSite.site_id.in_(site_ids)
+                )
+            )
+        }
+
     def get_engine(self, dbinfo: DBInfo):
         endpoint = dbinfo.endpoint
         assert endpoint is not None
@@ -94,12 +226,27 @@ class PostgresLoaderService(DataLoaderService):
             + str(endpoint.port)
             + "/minmod"
         )
-        engine = create_engine(connection_url)
+        engine = create_engine(
+            connection_url, pool_size=self.max_workers, max_overflow=0
+        )
         Base.metadata.create_all(engine)
         return engine
 
     def restore(self, engine: Engine, tables: dict[str, list], batch_size: int = 1024):
+        # **ALGO**
+        # when the database is loaded from scratch, the bulk tables are split into partitions
+        # that are saved concurrently, each through its own connection and transaction, so the
+        # load is not atomic: if it fails, the bulk tables are truncated to be empty again. A
+        # table is only saved after the tables it refers to are fully saved. Otherwise, the
+        # records are saved in a single transaction as they must not conflict with the
+        # existing ones. The entities are saved last, with the data version.
         with Session(engine) as session:
+            is_empty = all(
+                session.execute(select(cls.__table__).limit(1)).first() is None
+                for cls in self.bulk_tables
+            )
+
+        def save_entities(session: Session):
             for cls in [
                 Unit,
                 Commodity,
@@ -120,57 +267,171 @@ class PostgresLoaderService(DataLoaderService):
                         batch0 = records[i : i + batch_size]
                         batch0 = [cls.from_dict(r) for r in batch0]
                         session.bulk_save_objects(batch0)
+            # after the sites are saved, so the versions cached during the load are outdated
+            DataVersion.bump(session)
 
-            table = "DedupMineralSite"
-            if table in tables:
-                records = tables[table]
-                for i in tqdm(
-                    list(range(0, len(records), batch_size)), desc=f"Saving {table}"
-                ):
-                    batch1 = records[i : i + batch_size]
-                    batch1 = [DedupMineralSite.from_dict(r) for r in batch1]
-                    # can't use the newer API because I haven't figured out how to make SqlAlchemy
-                    # automatically handle the custom types (TypeDecorator) yet.
-                    session.bulk_save_objects(batch1)
+        def save_dedup_sites(session: Session, records: list[dict]):
+            for i in range(0, len(records), batch_size):
+                batch1 = [
+                    DedupMineralSite.from_dict(r) for r in records[i : i + batch_size]
+                ]
+                # can't use the newer API because I haven't figured out how to make SqlAlchemy
+                # automatically handle the custom types (TypeDecorator) yet.
+                session.bulk_save_objects(batch1)
 
-            table = "MineralSite"
+        def save_sites(session: Session, records: list[dict]) -> dict[str, int]:
             site2id = {}
-            if table in tables:
-                records = tables[table]
-                for i in tqdm(
-                    list(range(0, len(records), batch_size)), desc=f"Saving {table}"
-                ):
-                    batch2 = records[i : i + batch_size]
-                    batch2 = [MineralSite.from_dict(r) for r in batch2]
-                    session.bulk_save_objects(batch2, return_defaults=True)
-                    for r in batch2:
-                        site2id[r.site_id] = r.id
-
-            table = "MineralInventoryView"
-            if table in tables:
-                records = tables[table]
-                for i in tqdm(
-                    list(range(0, len(records), batch_size)), desc=f"Saving {table}"
-                ):
-                    batch3 = []
-                    for r in records[i : i + batch_size]:
-                        sid = site2id[r["site"]]
-                        for inv in r["invs"]:
-                            inv["site_id"] = sid
-                            batch3.append(inv)
-                    if len(batch3) > 0:
-                        session.execute(insert(MineralInventoryView), batch3)
-
-            table = "DedupMineralInventoryView"
-            if table in tables:
-                records = tables[table]
-                for i in tqdm(
-                    list(range(0, len(records), batch_size)), desc=f"Saving {table}"
+            for i in range(0, len(records), batch_size):
+                batch2 = [MineralSite.from_dict(r) for r in records[i : i + batch_size]]
+                session.bulk_save_objects(batch2, return_defaults=True)
+                for r in batch2:
+                    site2id[r.site_id] = r.id
+            return site2id
+
+        def save_inventories(session: Session, records: list[dict]):
+            for i in range(0, len(records), batch_size):
+                batch3 = []
+                for r in records[i : i + batch_size]:
+                    sid = site2id[r["site"]]
+                    for inv in r["invs"]:
+                        inv["site_id"] = sid
+                        batch3.append(inv)
+                if len(batch3) > 0:
+                    session.execute(insert(MineralInventoryView), batch3)
+
+        def save_dedup_inventories(session: Session, records: list[dict]):
+            for i in range(0, len(records), batch_size):
+                batch1 = [
+                    DedupMineralInventoryView.from_dict(r)
+                    for r in records[i : i + batch_size]
+                ]
+                session.bulk_save_objects(batch1)
+
+        site2id: dict[str, int] = {}
+        if not is_empty:
+            with Session(engine) as session:
+                save_dedup_sites(session, tables.get("DedupMineralSite", []))
+                site2id = save_sites(session, tables.get("MineralSite", []))
+                save_inventories(session, tables.get("MineralInventoryView", []))
+                save_dedup_inventories(
+                    session, tables.get("DedupMineralInventoryView", [])
+                )
+                # populate the search table from the saved dedup sites & their inventories
+                session.execute(
+                    DedupMineralSiteSearch.insert_from_dedup_sites(
+                        [r["id"] for r in tables.get("DedupMineralSite", [])]
+                    )
+                )
+                save_entities(session)
+                session.commit()
+            self.analyze(engine)
+            return
+
+        # maintaining the secondary indexes during the bulk load is slower than building
+        # them once at the end
+        indexes = self.get_secondary_indexes()
+        with engine.begin() as conn:
+            for index in indexes:
+                index.drop(conn, checkfirst=True)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                self.save_partitions(
+                    executor,
+                    engine,
+                    "DedupMineralSite",
+                    tables.get("DedupMineralSite", []),
+                    save_dedup_sites,
+                )
+                for part_site2id in self.save_partitions(
+                    executor,
+                    engine,
+                    "MineralSite",
+                    tables.get("MineralSite", []),
+                    save_sites,
                 ):
-                    batch1 = records[i : i + batch_size]
-                    batch1 = [DedupMineralInventoryView.from_dict(r) for r in batch1]
-                    # can't use the newer API because I haven't figured out how to make SqlAlchemy
-                    # automatically handle the custom types (TypeDecorator) yet.
-                    session.bulk_save_objects(batch1)
+                    site2id.update(part_site2id)
+                self.save_partitions(
+                    executor,
+                    engine,
+                    "MineralInventoryView",
+                    tables.get("MineralInventoryView", []),
+                    save_inventories,
+                )
+                self.save_partitions(
+                    executor,
+                    engine,
+                    "DedupMineralInventoryView",
+                    tables.get("DedupMineralInventoryView", []),
+                    save_dedup_inventories,
+                )
 
-            session.commit()
+            with Session(engine) as session:
+                # populate the search table from the dedup sites & their inventories
+                session.execute(DedupMineralSiteSearch.insert_from_dedup_sites())
+                save_entities(session)
+                session.commit()
+        except BaseException:
+            # the partitions that have been saved are committed, remove them so that the
+            # database is empty again and the load can be rerun
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "TRUNCATE "
+                        + ", ".join(cls.__table__.name for cls in self.bulk_tables)
+                    )
+                )
+            raise
+        finally:
+            with engine.begin() as conn:
+                for index in tqdm(indexes, desc="Rebuilding indexes"):
+                    index.create(conn, checkfirst=True)
+        self.analyze(engine)
+
+    def analyze(self, engine: Engine):
+        """Refresh the planner statistics of the bulk tables after they are loaded"""
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "ANALYZE "
+                    + ", ".join(cls.__table__.name for cls in self.bulk_tables)
+                )
+            )
+
+    def save_partitions(
+        self,
+        executor: ThreadPoolExecutor,
+        engine: Engine,
+        table: str,
+        records: Sequence[dict],
+        save: Callable[[Session, list[dict]], T],
+    ) -> list[T]:
+        """Save the records in partitions of `partition_size` records concurrently, each
+        partition is saved in its own transaction. Return the output of each partition.
+        """
+
+        def save_partition(partition: list[dict]) -> T:
+            with Session(engine) as session:
+                output = save(session, partition)
+                session.commit()
+            return output
+
+        futures = [
+            executor.submit(save_partition, list(records[i : i + self.partition_size]))
+            for i in range(0, len(records), self.partition_size)
+        ]
+        return [
+            future.result()
+            for future in tqdm(
+                as_completed(futures), total=len(futures), desc=f"Saving {table}"
+            )
+        ]
+
+    def get_secondary_indexes(self) -> list[Index]:
+        """Get the non-unique indexes of the bulk loaded tables"""
+        return [
+            index
+            for cls in self.bulk_tables
+            for index in sorted(cls.__table__.indexes, key=lambda index: index.name)
+            if not index.unique
+        ]
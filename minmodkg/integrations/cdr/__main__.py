@@ -8,9 +8,23 @@ from typing import Annotated, Optional
 import typer
 from loguru import logger
 from minmodkg.integrations.cdr.cdr import sync_dedup_mineral_sites, sync_deposit_types
+from minmodkg.misc.metrics import Counter, Gauge, Histogram, start_metrics_server
 
 app = typer.Typer(pretty_exceptions_short=True, pretty_exceptions_enable=False)
 
+CDR_SYNC_RUNS = Counter(
+    "minmod_cdr_sync_runs_total", "Number of CDR sync runs by status", ["status"]
+)
+CDR_SYNC_DURATION = Histogram(
+    "minmod_cdr_sync_duration_seconds",
+    "Duration of the successful CDR sync runs",
+    buckets=(60, 300, 600, 1800, 3600, 7200, 14400, 28800, 86400),
+)
+CDR_LAST_SUCCESS = Gauge(
+    "minmod_cdr_sync_last_success_timestamp_seconds",
+    "Unix time of the last successful CDR sync run",
+)
+
 
 def sync_cdr(current_run_dir: Path, prev_run_dir: Optional[Path]):
     sync_deposit_types()
@@ -23,10 +37,14 @@ def main(
     run_dir: Path = Path("/var/tmp/cdr"),
     run_on_start: Annotated[bool, typer.Option("--run-on-start")] = False,
     verbose: Annotated[bool, typer.Option("--verbose")] = False,
+    metrics_port: int = 0,
 ):
-    """Synchronize data to CDR."""
+    """Synchronize data to CDR. The metrics are served at
+    http://localhost:<metrics_port>/metrics (disabled if 0)."""
     assert interval > 60, "Interval must be greater than 1 minute"
     run_dir.mkdir(exist_ok=True, parents=True)
+    if metrics_port > 0:
+        start_metrics_server(metrics_port)
 
     if run_on_start:
         last_run = int(time.time() / interval) - 1
@@ -46,7 +64,11 @@ def main(
                     prev_run_dir = None
 
                 # run the syncs
+                start = time.time()
                 sync_cdr(current_run_dir, prev_run_dir)
+                CDR_SYNC_DURATION.observe(time.time() - start)
+                CDR_SYNC_RUNS.labels("success").inc()
+                CDR_LAST_SUCCESS.set(time.time())
 
                 # this run is done, we can remove the previous run
                 last_run = current_run
@@ -56,6 +78,7 @@ def main(
         except Exception as e:
             # exception occurred, we will wait for X second before trying again
             logger.exception(e)
+            CDR_SYNC_RUNS.labels("failure").inc()
             logger.info("Wait for some time before trying again")
 
         # sleep for a minute before checking again
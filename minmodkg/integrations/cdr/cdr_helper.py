@@ -11,6 +11,7 @@ import httpx
 import timer
 from joblib import Parallel, delayed
 from loguru import logger
+from minmodkg.misc.metrics import Counter, Histogram
 from minmodkg.models.kg.base import MINMOD_NS
 from tqdm import tqdm
 
@@ -27,6 +28,23 @@ CDR_API = os.environ.get("CDR_API", "https://api.cdr.land/v1")
 
 cdr_headers = {"Authorization": f"Bearer {AUTH_TOKEN}"}
 
+# the requests made by the parallel jobs run in other processes, so they are not counted
+# in the request metrics, but their records are counted once they are done
+CDR_RECORDS = Counter(
+    "minmod_cdr_records_total",
+    "Number of records uploaded to or deleted from CDR by endpoint",
+    ["endpoint", "operation"],
+)
+CDR_REQUEST_DURATION = Histogram(
+    "minmod_cdr_request_duration_seconds",
+    "Duration of the requests (including retries) sent by the CDR sync",
+)
+CDR_REQUEST_FAILURES = Counter(
+    "minmod_cdr_request_failures_total",
+    "Number of failed attempts of the requests sent by the CDR sync by status code",
+    ["status"],
+)
+
 
 @dataclass
 class Endpoint:
@@ -154,6 +172,7 @@ class CDRHelper:
             f"Upload {len(collection)} records to endpoint {endpoint.collection}",
             print_fn=logger.info,
         ):
+            n_records = CDR_RECORDS.labels(endpoint.collection, "upload")
             if endpoint.bulk_upload is not None:
                 retry_request(
                     lambda: httpx.post(
@@ -163,12 +182,13 @@ class CDRHelper:
                         timeout=None,
                     )
                 )
+                n_records.inc(len(collection))
             else:
                 it = get_parallel(
                     n_jobs=CDRHelper.N_PARALLEL_JOBS, return_as="generator_unordered"
                 )(delayed(CDRHelper.create)(endpoint, item) for item in collection)
                 for _ in tqdm(it, total=len(collection), desc="uploading records"):
-                    pass
+                    n_records.inc()
 
     @staticmethod
     def delete_collection(endpoint: Endpoint, collection: list[dict]):
@@ -176,6 +196,7 @@ class CDRHelper:
             f"Delete {len(collection)} records in endpoint {endpoint.collection}",
             print_fn=logger.info,
         ):
+            n_records = CDR_RECORDS.labels(endpoint.collection, "delete")
             it = get_parallel(
                 n_jobs=CDRHelper.N_PARALLEL_JOBS, return_as="generator_unordered"
             )(
@@ -183,7 +204,7 @@ class CDRHelper:
                 for item in collection
             )
             for _ in tqdm(it, total=len(collection), desc="delete records"):
-                pass
+                n_records.inc()
 
     @staticmethod
     def truncate(endpoint: Endpoint):
@@ -288,12 +309,14 @@ def retry_request(
     interval: float = 1,  # wait for 1 second before retry
     retry: int = 5,
 ) -> httpx.Response:
-    for i in range(retry):
-        r = req()
-        if r.status_code in okay_status_code:
-            return r
-        print(f"F({r.status_code}).", end="", flush=True)
-        time.sleep(interval)
+    with CDR_REQUEST_DURATION.time():
+        for i in range(retry):
+            r = req()
+            if r.status_code in okay_status_code:
+                return r
+            CDR_REQUEST_FAILURES.labels(str(r.status_code)).inc()
+            print(f"F({r.status_code}).", end="", flush=True)
+            time.sleep(interval)
     raise Exception(msg + f" {r.status_code} {r.text}")
 
 
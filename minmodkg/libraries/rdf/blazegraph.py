@@ -21,7 +21,7 @@ class BlazeGraph(TripleStore):
         self.query_endpoint = query_endpoint
         self.update_endpoint = update_endpoint
 
-    def _sparql_query(self, query: SPARQLMainQuery):
+    def _send_sparql_query(self, query: SPARQLMainQuery):
         if query.lower().lstrip().startswith("construct"):
             format = "text/turtle"
         else:
@@ -43,7 +43,20 @@ class BlazeGraph(TripleStore):
             )
         return response
 
-    def _sparql_update(self, query: SPARQLMainQuery):
+    def _sparql_query_request(
+        self, query: SPARQLMainQuery, accept: str
+    ) -> httpx.Request:
+        return httpx.Request(
+            "POST",
+            url=self.query_endpoint,
+            data={"query": self.prefix_part + query},
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+                "Accept": accept,
+            },
+        )
+
+    def _send_sparql_update(self, query: SPARQLMainQuery):
         response = httpx.post(
             url=self.update_endpoint,
             data={"update": self.prefix_part + query},
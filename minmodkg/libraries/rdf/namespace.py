@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from functools import cached_property
-from typing import Iterable
+from typing import Iterable, Optional
 
 from minmodkg.misc.exceptions import UnreachableError
+from minmodkg.misc.prefix_index import LongestPrefixIndex
 from minmodkg.typing import IRI, InternalID, RelIRI
 from rdflib import OWL, RDF, RDFS, SKOS, XSD, Graph, URIRef
 from rdflib.namespace import NamespaceManager
@@ -101,6 +102,23 @@ class Namespace:
     def get_by_alias(self, alias: str) -> SingleNS:
         return self.namespaces[alias]
 
+    def compact(self, uri: IRI | URIRef) -> Optional[RelIRI]:
+        """Compact an absolute URI into a relative URI using the longest namespace that it
+        starts with. Return None if it does not belong to any namespace."""
+        namespace = self.prefix_index.get(uri)
+        if namespace is None:
+            return None
+        return self.reluri_prefixes[namespace] + uri[len(namespace) :]
+
+    @cached_property
+    def prefix_index(self) -> LongestPrefixIndex:
+        return LongestPrefixIndex.create([ns.namespace for ns in self.iter()])
+
+    @cached_property
+    def reluri_prefixes(self) -> dict[str, str]:
+        """Mapping from the namespaces to the prefixes (`alias:`) of their relative URIs"""
+        return {ns.namespace: ns.alias + ":" for ns in self.iter()}
+
     @cached_property
     def rdflib_namespace_manager(self) -> NamespaceManager:
         nsmanager = NamespaceManager(Graph(), bind_namespaces="none")
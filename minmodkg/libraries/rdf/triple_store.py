@@ -1,21 +1,51 @@
 from __future__ import annotations
 
+import asyncio
 import concurrent.futures
-from contextlib import contextmanager
+import re
+from contextlib import ExitStack, asynccontextmanager, contextmanager
 from datetime import datetime
 from math import ceil
 from time import time
-from typing import Literal, Optional, Sequence
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    ContextManager,
+    Literal,
+    Optional,
+    Sequence,
+)
 from uuid import uuid4
 
 import httpx
 from minmodkg.libraries.rdf.namespace import Namespace
 from minmodkg.misc.exceptions import DBError, TransactionError
 from minmodkg.misc.utils import group_by_key
-from minmodkg.typing import IRI, SPARQLMainQuery, Triples
+from minmodkg.typing import IRI, SPARQLMainQuery, Triple, Triples
 from rdflib import Graph, URIRef
 from tqdm import tqdm
 
+XSD_STRING_TYPES = {
+    "http://www.opengis.net/ont/geosparql#wktLiteral",
+    "http://www.w3.org/2001/XMLSchema#string",
+}
+XSD_INT_TYPES = {
+    "http://www.w3.org/2001/XMLSchema#integer",
+    "http://www.w3.org/2001/XMLSchema#int",
+}
+XSD_FLOAT_TYPES = {
+    "http://www.w3.org/2001/XMLSchema#decimal",
+    "http://www.w3.org/2001/XMLSchema#double",
+    "http://www.w3.org/2001/XMLSchema#float",
+}
+XSD_DATE = "http://www.w3.org/2001/XMLSchema#date"
+XSD_BOOLEAN = "http://www.w3.org/2001/XMLSchema#boolean"
+
+# called with the operation ("query" or "update") and the query of each SPARQL request,
+# the returned context manager is entered until the request is done
+SPARQLObserver = Callable[[Literal["query", "update"], str], ContextManager]
+
 
 class TripleStore:
     """Responsible for namespace & querying endpoint"""
@@ -28,6 +58,32 @@ class TripleStore:
             "\n".join(f"PREFIX {x.alias}: <{x.namespace}>" for x in self.ns.iter())
             + "\n\n"
         )
+        # async client, bound to the event loop that created it
+        self._async_client: Optional[
+            tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]
+        ] = None
+        self.async_client_timeout: Optional[float] = None
+        self.async_client_max_connections: int = 100
+        self.async_client_pool_timeout: Optional[float] = 10
+        self.observers: list[SPARQLObserver] = []
+
+    def configure_async_client(
+        self,
+        timeout: Optional[float] = None,
+        max_connections: int = 100,
+        pool_timeout: Optional[float] = 10,
+    ):
+        """Set the timeout (seconds, None to wait forever) and the maximum number of
+        concurrent connections of the async client. Queries that cannot get a connection
+        within `pool_timeout` seconds fail with httpx.PoolTimeout."""
+        self.async_client_timeout = timeout
+        self.async_client_max_connections = max_connections
+        self.async_client_pool_timeout = pool_timeout
+        self._async_client = None
+
+    def add_observer(self, observer: SPARQLObserver):
+        """Observe the SPARQL requests sent to the triple store (e.g., to time them)"""
+        self.observers.append(observer)
 
     def transaction(self, objects: Sequence[IRI | URIRef], timeout_sec: float = 300):
         return Transaction(self, objects, timeout_sec)
@@ -36,6 +92,13 @@ class TripleStore:
         resp = self._sparql_query("ASK WHERE { <%s> ?p ?o }" % uri)
         return resp.json()["boolean"]
 
+    async def ahas(self, uri: IRI | URIRef) -> bool:
+        async with self._asparql_query_stream(
+            "ASK WHERE { <%s> ?p ?o }" % uri, "application/sparql-results+json"
+        ) as response:
+            await response.aread()
+            return response.json()["boolean"]
+
     def count_all(self):
         return self.query("SELECT (COUNT(*) as ?count) WHERE { ?s ?p ?o }")[0]["count"]
 
@@ -133,6 +196,63 @@ class TripleStore:
         g.namespace_manager = self.ns.rdflib_namespace_manager
         return g
 
+    async def aquery(self, query: str, keys: Optional[list[str]] = None) -> list[dict]:
+        """Async version of `query`. Prefer `aquery_iter` for large results."""
+        return [row async for row in self.aquery_iter(query, keys)]
+
+    async def aquery_iter(
+        self, query: str, keys: Optional[list[str]] = None
+    ) -> AsyncIterator[dict]:
+        """Execute a SELECT query and yield the rows as soon as they are received. The results
+        are streamed in the SPARQL TSV format so memory usage does not grow with the number of
+        rows. Literals are converted to python objects based on their datatype like `query`,
+        and unbound variables are None.
+        """
+        async with self._asparql_query_stream(
+            query, "text/tab-separated-values"
+        ) as response:
+            lines = response.aiter_lines()
+            header = await anext(lines, None)
+            if header is None:
+                return
+            columns = [col.strip()[1:] for col in header.rstrip("\r\n").split("\t")]
+            extra_keys = [key for key in keys or [] if key not in columns]
+
+            async for line in lines:
+                line = line.rstrip("\r\n")
+                if line == "":
+                    continue
+                row = {
+                    col: parse_tsv_term(term)
+                    for col, term in zip(columns, line.split("\t"))
+                }
+                for key in extra_keys:
+                    row[key] = None
+                yield row
+
+    async def aconstruct(self, query: str) -> AsyncIterator[Triple]:
+        """Execute a CONSTRUCT query and yield the triples as soon as they are received. The
+        triples are in N3 format (so they can be passed to `insert` or `delete`) and are parsed
+        from a streamed N-Triples response instead of building an rdflib Graph.
+        """
+        async with self._asparql_query_stream(
+            query, "application/n-triples"
+        ) as response:
+            async for line in response.aiter_lines():
+                triple = parse_ntriples_line(line)
+                if triple is not None:
+                    yield triple
+
+    async def aconstruct_graph(self, query: str) -> Graph:
+        """Async version of `construct`"""
+        async with self._asparql_query_stream(query, "text/turtle") as response:
+            await response.aread()
+            data = response.text
+        g = Graph()
+        g.parse(data=data, format="turtle")
+        g.namespace_manager = self.ns.rdflib_namespace_manager
+        return g
+
     def clear(self):
         return self._sparql_update("CLEAR DEFAULT")
 
@@ -234,13 +354,159 @@ class TripleStore:
 
         return self._sparql_update("".join(parts))
 
+    @contextmanager
+    def _observe(self, operation: Literal["query", "update"], query: SPARQLMainQuery):
+        if len(self.observers) == 0:
+            yield
+            return
+        with ExitStack() as stack:
+            for observer in self.observers:
+                stack.enter_context(observer(operation, query))
+            yield
+
     def _sparql_query(self, query: SPARQLMainQuery):
+        with self._observe("query", query):
+            return self._send_sparql_query(query)
+
+    def _send_sparql_query(self, query: SPARQLMainQuery):
+        raise NotImplementedError()
+
+    def _sparql_query_request(
+        self, query: SPARQLMainQuery, accept: str
+    ) -> httpx.Request:
+        """Create the HTTP request to execute the query, accepting the given content type"""
         raise NotImplementedError()
 
+    @asynccontextmanager
+    async def _asparql_query_stream(self, query: SPARQLMainQuery, accept: str):
+        # the response is streamed, so the observers also see the time to consume it
+        with self._observe("query", query):
+            async with self._asend_sparql_query_stream(query, accept) as response:
+                yield response
+
+    @asynccontextmanager
+    async def _asend_sparql_query_stream(self, query: SPARQLMainQuery, accept: str):
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client[0] is not loop:
+            self._async_client = (
+                loop,
+                httpx.AsyncClient(
+                    timeout=httpx.Timeout(
+                        self.async_client_timeout, pool=self.async_client_pool_timeout
+                    ),
+                    limits=httpx.Limits(
+                        max_connections=self.async_client_max_connections
+                    ),
+                ),
+            )
+        client = self._async_client[1]
+
+        response = await client.send(
+            self._sparql_query_request(query, accept), stream=True
+        )
+        try:
+            if response.status_code != 200:
+                await response.aread()
+                raise DBError(
+                    f"Failed to execute SPARQL query. Status code: {response.status_code}. Response: {response.text}",
+                    response,
+                )
+            yield response
+        finally:
+            await response.aclose()
+
     def _sparql_update(self, query: SPARQLMainQuery):
+        with self._observe("update", query):
+            return self._send_sparql_update(query)
+
+    def _send_sparql_update(self, query: SPARQLMainQuery):
         raise NotImplementedError()
 
 
+def parse_tsv_term(term: str) -> Any:
+    """Parse an RDF term of a SPARQL TSV result into a python object. IRIs and blank nodes
+    are returned as strings, literals are converted based on their datatype."""
+    if term == "":
+        return None
+    if term[0] == "<":
+        return term[1:-1]
+    if term.startswith("_:"):
+        return term[2:]
+    if term[0] == '"':
+        end = term.rindex('"')
+        value = unescape_literal(term[1:end])
+        suffix = term[end + 1 :]
+        if suffix.startswith("^^<"):
+            return convert_literal(value, suffix[3:-1])
+        # plain or language-tagged string
+        return value
+    # abbreviated numbers & booleans
+    if term == "true" or term == "false":
+        return term == "true"
+    if _INTEGER_RE.match(term):
+        return int(term)
+    return float(term)
+
+
+def convert_literal(value: str, datatype: str) -> Any:
+    """Convert a lexical value of a literal to a python object, same as `TripleStore.query`"""
+    if datatype in XSD_STRING_TYPES:
+        return value
+    if datatype in XSD_INT_TYPES:
+        try:
+            return int(value)
+        except ValueError:
+            # we think it's an integer but it's not, so we do not attempt to parse it
+            return value
+    if datatype in XSD_FLOAT_TYPES:
+        return float(value)
+    if datatype == XSD_DATE:
+        try:
+            return datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            return datetime.strptime(value, "%Y-%m")
+    if datatype == XSD_BOOLEAN:
+        return value == "true"
+    raise NotImplementedError(datatype)
+
+
+def unescape_literal(value: str) -> str:
+    if "\\" not in value:
+        return value
+    return _ESCAPE_RE.sub(_unescape_match, value)
+
+
+def parse_ntriples_line(line: str) -> Optional[Triple]:
+    """Parse a line of a N-Triples document into a triple in N3 format"""
+    m = _NTRIPLE_RE.match(line)
+    if m is None:
+        return None
+    return m.group(1), m.group(2), m.group(3)
+
+
+def _unescape_match(m: re.Match) -> str:
+    esc = m.group(0)
+    if esc[1] in "uU":
+        return chr(int(esc[2:], 16))
+    return _ESCAPE_CHARS[esc[1]]
+
+
+_INTEGER_RE = re.compile(r"^[+-]?\d+$")
+_ESCAPE_RE = re.compile(r"\\(?:u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)")
+_ESCAPE_CHARS = {
+    "t": "\t",
+    "b": "\b",
+    "n": "\n",
+    "r": "\r",
+    "f": "\f",
+    '"': '"',
+    "'": "'",
+    "\\": "\\",
+}
+# subject & predicate cannot contain spaces in N-Triples
+_NTRIPLE_RE = re.compile(r"^\s*([^\s#]\S*)\s+(\S+)\s+(.+?)\s*\.\s*$")
+
+
 class Transaction:
     """Steps to perform a transaction:
 
@@ -18,7 +18,7 @@ class VirtuosoDB(TripleStore):
         self.query_endpoint = query_endpoint
         self.update_endpoint = update_endpoint
 
-    def _sparql_query(self, query: SPARQLMainQuery):
+    def _send_sparql_query(self, query: SPARQLMainQuery):
         if query.lower().find("construct") != -1:
             return self._sparql(
                 query,
@@ -28,9 +28,20 @@ class VirtuosoDB(TripleStore):
             )
         return self._sparql(query, self.query_endpoint, "application/sparql-query")
 
-    def _sparql_update(self, query: SPARQLMainQuery):
+    def _send_sparql_update(self, query: SPARQLMainQuery):
         return self._sparql(query, self.update_endpoint, "application/sparql-update")
 
+    def _sparql_query_request(
+        self, query: SPARQLMainQuery, accept: str
+    ) -> httpx.Request:
+        return httpx.Request(
+            "POST",
+            url=self.query_endpoint,
+            params={"default-graph-uri": "https://minmod.isi.edu"},
+            headers={"Content-Type": "application/sparql-query", "Accept": accept},
+            content=self.prefix_part + query,
+        )
+
     def _sparql(
         self,
         query: SPARQLMainQuery,
@@ -0,0 +1,183 @@
+"""Compression of the HTTP responses negotiated from the `Accept-Encoding` header.
+
+Unlike `starlette.middleware.gzip.GZipMiddleware`, it supports zstd (preferred by the
+clients that accept it as it is faster and compresses JSON better) and it only compresses
+textual content, so already-compressed files (e.g., parquet) are sent as they are.
+Streaming responses are compressed chunk by chunk as they are sent.
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import Optional, Protocol
+
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+
+# encodings in the order of preference when the client accepts them equally
+ENCODINGS = ("zstd", "gzip")
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/ld+json",
+    "application/n-triples",
+    "application/sparql-results+json",
+    "application/javascript",
+    "application/xml",
+}
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+def select_encoding(accept_encoding: str) -> Optional[str]:
+    """Select the preferred encoding that the client accepts, None if it accepts none"""
+    qvalues: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if name == "":
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[name] = q
+
+    best = None
+    best_q = 0.0
+    for encoding in ENCODINGS:
+        q = qvalues.get(encoding, qvalues.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    if content_type is None:
+        return False
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith("+json")
+        or media_type.endswith("+xml")
+    )
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing the textual responses of at least `minimum_size` bytes
+    with the best encoding the client accepts. The size of a streaming response is unknown
+    when it starts, so it is always compressed unless it has a small content length."""
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        zstd_level: int = 3,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        await self.app(scope, receive, CompressionResponder(self, encoding, send).send)
+
+    def get_compressor(self, encoding: str) -> Compressor:
+        if encoding == "zstd":
+            return zstandard.ZstdCompressor(level=self.zstd_level).compressobj()
+        assert encoding == "gzip"
+        # wbits = 16 + 15 writes the gzip header and trailer
+        return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+
+
+class CompressionResponder:
+    """Compress the response of a single request"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        # the start message is delayed until the first body message so that we know
+        # whether the response is large enough to be compressed
+        self.start_message: Optional[dict] = None
+        self.compressor: Optional[Compressor] = None
+
+    async def send(self, message: dict):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] == "http.response.body" and self.start_message is not None:
+            await self.send_first_body(message)
+            return
+        if self.start_message is not None:
+            # the response does not have a body message (e.g., it is sent as a file)
+            await self._send(self.start_message)
+            self.start_message = None
+        if message["type"] != "http.response.body" or self.compressor is None:
+            await self._send(message)
+            return
+
+        body = self.compressor.compress(message.get("body", b""))
+        more_body = message.get("more_body", False)
+        if not more_body:
+            body += self.compressor.flush()
+        await self._send(
+            {"type": "http.response.body", "body": body, "more_body": more_body}
+        )
+
+    async def send_first_body(self, message: dict):
+        assert self.start_message is not None
+        start_message, self.start_message = self.start_message, None
+        headers = MutableHeaders(raw=list(start_message.get("headers", [])))
+        start_message = {**start_message, "headers": headers.raw}
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        compressible = (
+            start_message["status"] not in (204, 304)
+            and "content-encoding" not in headers
+            and is_compressible(headers.get("content-type"))
+        )
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                content_length = headers.get("content-length")
+                compressible = (
+                    content_length is None
+                    or int(content_length) >= self.middleware.minimum_size
+                )
+            else:
+                compressible = len(body) >= self.middleware.minimum_size
+
+        if not compressible:
+            await self._send(start_message)
+            await self._send(message)
+            return
+
+        self.compressor = self.middleware.get_compressor(self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        body = self.compressor.compress(body)
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            body += self.compressor.flush()
+            headers["Content-Length"] = str(len(body))
+
+        await self._send(start_message)
+        await self._send(
+            {"type": "http.response.body", "body": body, "more_body": more_body}
+        )
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from typing import Optional
+import math
+from collections import defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Sequence
 
-import pandas as pd
-import shapely.ops
-from pyproj import Transformer
-from shapely.geometry import GeometryCollection
-from shapely.wkt import dumps, loads
+# pandas, shapely, and pyproj are slow to import, so they are imported on first use
+if TYPE_CHECKING:
+    from pyproj import Transformer
 
 
 def merge_wkt(series):
+    import pandas as pd
+    from shapely.geometry import GeometryCollection
+    from shapely.wkt import dumps, loads
+
     geometries = []
     for wkt in series:
         if pd.notna(wkt) and isinstance(wkt, str):
@@ -65,32 +70,140 @@ def merge_wkts(
 
 
 def reproject_wkt(wkt: str, from_crs: str, to_crs: str) -> str:
-    assert from_crs.startswith("EPSG:"), from_crs
-    assert to_crs.startswith("EPSG:"), to_crs
+    import shapely.ops
+    from shapely.wkt import dumps, loads
 
     if from_crs == to_crs:
         return wkt
 
-    transformer = Transformer.from_crs(
+    transformer = get_transformer(from_crs, to_crs)
+    return dumps(shapely.ops.transform(transformer.transform, loads(wkt)))
+
+
+def reproject_geometry(geometry, from_crs: str, to_crs: str):
+    import shapely.ops
+
+    if from_crs == to_crs:
+        return geometry
+
+    transformer = get_transformer(from_crs, to_crs)
+    return shapely.ops.transform(transformer.transform, geometry)
+
+
+@lru_cache(maxsize=None)
+def get_transformer(from_crs: str, to_crs: str) -> Transformer:
+    """Get a (cached) transformer between two CRSs (EPSG:XXXX). Creating a transformer is
+    expensive, so they must be reused."""
+    from pyproj import Transformer
+
+    assert from_crs.startswith("EPSG:"), from_crs
+    assert to_crs.startswith("EPSG:"), to_crs
+    return Transformer.from_crs(
         int(from_crs[len("EPSG:") :]), int(to_crs[len("EPSG:") :])
     )
 
-    return dumps(shapely.ops.transform(transformer.transform, loads(wkt)))
 
+def reproject_wkt_centroids(
+    wkts: Sequence[str], crss: Sequence[str], to_crs: str = "EPSG:4326"
+) -> list[Optional[tuple[float, float]]]:
+    """Compute the centroids of a list of WKTs (the i-th WKT is in the CRS crss[i]) and
+    reproject them to `to_crs`. Parsing and centroids are computed in a vectorized way, and
+    the centroids of each source CRS are transformed in one call.
+
+    Returns:
+        the (x, y) of each centroid or None if the WKT is invalid or empty
+    """
+    import numpy as np
+    import shapely
+
+    geometries = shapely.from_wkt(np.asarray(wkts, dtype=object), on_invalid="ignore")
+    geometries[shapely.is_empty(geometries)] = None
+    centroids = shapely.centroid(geometries)
+    xs = shapely.get_x(centroids)
+    ys = shapely.get_y(centroids)
+    valid = ~(np.isnan(xs) | np.isnan(ys))
+
+    crs2idx = defaultdict(list)
+    for i, crs in enumerate(crss):
+        if valid[i] and crs != to_crs:
+            crs2idx[crs].append(i)
+    for crs, idx in crs2idx.items():
+        xs[idx], ys[idx] = get_transformer(crs, to_crs).transform(xs[idx], ys[idx])
+
+    return [
+        (float(xs[i]), float(ys[i])) if valid[i] else None for i in range(len(wkts))
+    ]
 
-_transformation = {}
 
+# size (in degrees) of the cells of the grid that we use to index coordinates (EPSG:4326)
+GEO_CELL_SIZE = 1
+GEO_N_COLS = 360 // GEO_CELL_SIZE
+GEO_N_ROWS = 180 // GEO_CELL_SIZE
 
-def reproject_geometry(geometry, from_crs: str, to_crs: str):
-    global _transformation
-    if from_crs == to_crs:
-        return geometry
+# mean radius of the earth in km
+EARTH_RADIUS_KM = 6371.0088
 
-    if (from_crs, to_crs) not in _transformation:
-        assert from_crs.startswith("EPSG:"), from_crs
-        assert to_crs.startswith("EPSG:"), to_crs
-        _transformation[from_crs, to_crs] = Transformer.from_crs(
-            int(from_crs[len("EPSG:") :]), int(to_crs[len("EPSG:") :])
+
+def geo_cell(lat: float, lon: float) -> int:
+    """Get the id of the grid cell containing the coordinate (EPSG:4326). Cells are numbered
+    row by row from the south-west corner, so cells of a row have consecutive ids."""
+    row = min(max(math.floor((lat + 90) / GEO_CELL_SIZE), 0), GEO_N_ROWS - 1)
+    col = min(max(math.floor((lon + 180) / GEO_CELL_SIZE), 0), GEO_N_COLS - 1)
+    return row * GEO_N_COLS + col
+
+
+def geo_cell_ranges(
+    min_lon: float, min_lat: float, max_lon: float, max_lat: float
+) -> list[tuple[int, int]]:
+    """Get the (inclusive) ranges of ids of the grid cells covering a bounding box. A box
+    crossing the antimeridian has min_lon > max_lon."""
+    if min_lon > max_lon:
+        # the east part of a row is adjacent to the west part of the next row
+        ranges = sorted(
+            geo_cell_ranges(min_lon, min_lat, 180, max_lat)
+            + geo_cell_ranges(-180, min_lat, max_lon, max_lat)
         )
+        merged_ranges = [ranges[0]]
+        for start, end in ranges[1:]:
+            if start == merged_ranges[-1][1] + 1:
+                merged_ranges[-1] = (merged_ranges[-1][0], end)
+            else:
+                merged_ranges.append((start, end))
+        return merged_ranges
+
+    start = geo_cell(min_lat, min_lon)
+    end = geo_cell(max_lat, max_lon)
+    start_row, start_col = divmod(start, GEO_N_COLS)
+    end_row, end_col = divmod(end, GEO_N_COLS)
+
+    if start_col == 0 and end_col == GEO_N_COLS - 1:
+        # the box covers the whole rows, so it is a single range
+        return [(start, end)]
+    return [
+        (row * GEO_N_COLS + start_col, row * GEO_N_COLS + end_col)
+        for row in range(start_row, end_row + 1)
+    ]
 
-    return shapely.ops.transform(_transformation[from_crs, to_crs].transform, geometry)
+
+def radius_to_bbox(
+    lat: float, lon: float, radius_km: float
+) -> tuple[float, float, float, float]:
+    """Get the bounding box (min_lon, min_lat, max_lon, max_lat) containing all points within
+    `radius_km` of the coordinate."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        # the circle contains a pole
+        return -180, max(min_lat, -90), 180, min(max_lat, 90)
+
+    dlon = math.degrees(
+        math.asin(
+            min(math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat)), 1)
+        )
+    )
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lon, min_lat, max_lon, max_lat
@@ -0,0 +1,388 @@
+"""Counters, gauges and histograms exposed in the Prometheus text format.
+
+The metrics of a process are kept in memory in `REGISTRY`. The API serves them at
+`{API_PREFIX}/metrics`, and the long-running workers serve them with `start_metrics_server`,
+so scraping does not need any other service (e.g., a push gateway). Note that each process
+has its own metrics, so when the API runs multiple worker processes, each scrape only sees
+the metrics of the worker that handles it.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Literal, Optional, Sequence
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# default buckets (in seconds) of the latency histograms
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+        # functions updating the metrics that are read on demand (e.g., pool sizes)
+        self.collectors: list[Callable[[], None]] = []
+        self.lock = threading.Lock()
+
+    def register(self, metric: Metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        with self.lock:
+            self.collectors.append(collector)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format"""
+        with self.lock:
+            collectors = list(self.collectors)
+            metrics = list(self.metrics.values())
+        for collector in collectors:
+            collector()
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    type: str
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: dict[tuple[str, ...], MetricValue] = {}
+        self.lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values: str, **kwvalues: str):
+        if kwvalues:
+            values = tuple(kwvalues[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, got {values}"
+            )
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self.new_value())
+        return child
+
+    def new_value(self) -> MetricValue:
+        raise NotImplementedError()
+
+    def render(self) -> list[str]:
+        lines = []
+        for key, child in list(self.children.items()):
+            labels = list(zip(self.labelnames, key))
+            for suffix, extra_labels, value in child.samples():
+                lines.append(
+                    f"{self.name}{suffix}{format_labels(labels + extra_labels)} {format_value(value)}"
+                )
+        return lines
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"Metric {self.name} requires labels {self.labelnames}")
+        return self.labels()
+
+
+class MetricValue:
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def samples(self) -> list[tuple[str, list[tuple[str, str]], float]]:
+        raise NotImplementedError()
+
+
+class CounterValue(MetricValue):
+    def __init__(self):
+        super().__init__()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        return [("", [], self.value)]
+
+
+class GaugeValue(MetricValue):
+    def __init__(self):
+        super().__init__()
+        self.value = 0.0
+
+    def set(self, value: float):
+        with self.lock:
+            self.value = value
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def samples(self):
+        return [("", [], self.value)]
+
+
+class HistogramValue(MetricValue):
+    def __init__(self, buckets: tuple[float, ...]):
+        super().__init__()
+        self.buckets = buckets
+        # the last count is of the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self):
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+        output = []
+        cumulative = 0
+        for le, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            output.append(("_bucket", [("le", format_value(le))], cumulative))
+        output.append(("_sum", [], total))
+        output.append(("_count", [], cumulative))
+        return output
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def new_value(self):
+        return CounterValue()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def new_value(self):
+        return GaugeValue()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def new_value(self):
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+def format_labels(labels: list[tuple[str, str]]) -> str:
+    if len(labels) == 0:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                name,
+                value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+            )
+            for name, value in labels
+        )
+        + "}"
+    )
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    return repr(float(value))
+
+
+def escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def start_metrics_server(
+    port: int, addr: str = "0.0.0.0", registry: Registry = REGISTRY
+) -> ThreadingHTTPServer:
+    """Serve the metrics at http://<addr>:<port>/metrics in a background thread"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            content = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            # do not log every scrape
+            pass
+
+    server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    ).start()
+    return server
+
+
+# metrics of the API and the database & triple store clients
+SPARQL_DURATION = Histogram(
+    "minmod_sparql_request_duration_seconds",
+    "Duration of the requests sent to the triple store",
+    ["operation"],
+)
+HTTP_REQUESTS = Counter(
+    "minmod_http_requests_total",
+    "Number of HTTP requests by route and status",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "minmod_http_request_duration_seconds",
+    "Duration of the HTTP requests by route (until the response is sent)",
+    ["method", "route"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "minmod_http_requests_in_progress",
+    "Number of HTTP requests being handled",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "minmod_db_pool_connections",
+    "Number of connections in the pool of each database engine by state",
+    ["engine", "state"],
+)
+
+
+def observe_sparql(operation: Literal["query", "update"], query: str):
+    """Record the duration of a SPARQL request, see `TripleStore.add_observer`"""
+    return SPARQL_DURATION.labels(operation).time()
+
+
+def collect_db_pools():
+    """Read the state of the connection pools of the database engines"""
+    from minmodkg.models.kgrel.base import get_engines
+    from sqlalchemy.pool import QueuePool
+
+    for name, engine in get_engines().items():
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        DB_POOL_CONNECTIONS.labels(name, "size").set(pool.size())
+        DB_POOL_CONNECTIONS.labels(name, "checked_out").set(pool.checkedout())
+        DB_POOL_CONNECTIONS.labels(name, "overflow").set(max(pool.overflow(), 0))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the number and latency of the requests by route. The route
+    template (e.g., `/mineral-sites/{site_id}`) is used instead of the path so that the number
+    of series stays bounded."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            # the router stores the matched route in the scope
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            HTTP_REQUEST_DURATION.labels(scope["method"], route_path).observe(
+                time.perf_counter() - start
+            )
+            HTTP_REQUESTS.labels(scope["method"], route_path, str(status_code)).inc()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from collections import defaultdict
+from functools import cached_property
 from typing import Generic, Optional, Union
 
 from minmodkg.misc.utils import V
@@ -56,20 +57,30 @@ class LongestPrefixIndex(Generic[V]):
 
     def get(self, s: str) -> Optional[str]:
         """Get prefix of a string. Return None if it is not found"""
-        key = s[self.start : self.end]
-        if key in self.index:
-            prefix = self.index[key]
-            if isinstance(prefix, LongestPrefixIndex):
-                return prefix.get(s)
-            return prefix if s.startswith(prefix) else None
-
-        if "" in self.index:
-            prefix = self.index[""]
-            assert isinstance(prefix, str)
-            return prefix if s.startswith(prefix) else None
-
+        for length, prefixes in self.buckets:
+            prefix = s[:length]
+            if prefix in prefixes:
+                return prefix
         return None
 
+    @cached_property
+    def buckets(self) -> list[tuple[int, frozenset[str]]]:
+        """The prefixes of the index grouped by their lengths, longest first. Finding the
+        longest prefix of a string takes one slice and one set lookup per distinct length,
+        which is faster than walking the nested index as we only have a few lengths."""
+        by_length = defaultdict(set)
+        stack: list[LongestPrefixIndex] = [self]
+        while len(stack) > 0:
+            for value in stack.pop().index.values():
+                if isinstance(value, LongestPrefixIndex):
+                    stack.append(value)
+                else:
+                    by_length[len(value)].add(value)
+        return [
+            (length, frozenset(prefixes))
+            for length, prefixes in sorted(by_length.items(), reverse=True)
+        ]
+
     def __str__(self):
         """Readable version of the index"""
         stack: list[tuple[int, str, Union[str, LongestPrefixIndex]]] = list(
@@ -0,0 +1,153 @@
+"""Opt-in per-request timings.
+
+The timings of a request are accumulated by stage (e.g., `db` for SQL queries, `sparql` for
+SPARQL queries) in a context variable, so they are visible to the handlers running in the
+thread pool as well. `ServerTimingMiddleware` reports them in the `Server-Timing` header and
+logs the slow requests with their queries.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Literal, Optional
+
+from loguru import logger
+
+# maximum length of a query in the slow request logs
+MAX_QUERY_LENGTH = 1000
+
+
+@dataclass
+class Stage:
+    duration: float = 0.0
+    count: int = 0
+
+
+@dataclass
+class RequestTimings:
+    stages: dict[str, Stage] = field(default_factory=dict)
+    # (stage, duration, query) of each query
+    queries: list[tuple[str, float, str]] = field(default_factory=list)
+
+    def record(self, stage: str, duration: float, query: Optional[str] = None):
+        if stage not in self.stages:
+            self.stages[stage] = Stage()
+        self.stages[stage].duration += duration
+        self.stages[stage].count += 1
+        if query is not None:
+            self.queries.append((stage, duration, query[:MAX_QUERY_LENGTH]))
+
+    def to_header(self, total: float) -> str:
+        parts = [
+            f'{name};dur={stage.duration * 1000:.1f};desc="{stage.count}"'
+            for name, stage in self.stages.items()
+        ]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def record(stage: str, duration: float, query: Optional[str] = None):
+    """Record the duration (in seconds) of a stage of the current request, if any"""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.record(stage, duration, query)
+
+
+@contextmanager
+def timed(stage: str, query: Optional[str] = None):
+    """Time the enclosed block as a stage of the current request"""
+    if _request_timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, query)
+
+
+_is_sqlalchemy_instrumented = False
+
+
+def instrument_sqlalchemy():
+    """Time the SQL queries of all engines (including the async engines)"""
+    global _is_sqlalchemy_instrumented
+    if _is_sqlalchemy_instrumented:
+        return
+    _is_sqlalchemy_instrumented = True
+
+    from sqlalchemy import Engine, event
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record("db", time.perf_counter() - conn.info["query_start"].pop(), statement)
+
+
+def observe_sparql(operation: Literal["query", "update"], query: str):
+    """Time a SPARQL request of the current request, see `TripleStore.add_observer`"""
+    return timed("sparql", query)
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware reporting the timings of each request in the `Server-Timing` header.
+    The header is added when the response starts, so for streaming responses, it only
+    covers the work done before the first chunk is sent."""
+
+    def __init__(self, app, slow_request_seconds: Optional[float] = None):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start":
+                header = timings.to_header(time.perf_counter() - start)
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", header.encode()),
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _request_timings.reset(token)
+            total = time.perf_counter() - start
+            if (
+                self.slow_request_seconds is not None
+                and total >= self.slow_request_seconds
+            ):
+                logger.warning(
+                    "Slow request {} {} took {:.3f}s: {}\n{}",
+                    scope["method"],
+                    scope["path"],
+                    total,
+                    timings.to_header(total),
+                    "\n".join(
+                        f"[{stage} {duration * 1000:.1f}ms] {query}"
+                        for stage, duration, query in timings.queries
+                    ),
+                )
@@ -4,7 +4,7 @@ import time
 from datetime import datetime
 from hashlib import sha256
 from pathlib import Path
-from typing import Any, Callable, Iterable, Optional, Sequence, TypeVar
+from typing import Any, Awaitable, Callable, Iterable, Optional, Sequence, TypeVar
 from urllib.parse import urlparse
 
 from drepr.writers.turtle_writer import MyLiteral
@@ -240,6 +240,7 @@ class makedict:
 
 class CacheResponse:
     def __init__(self):
+        # key => (expired at (seconds since epoch), response)
         self.key2value: dict[str, tuple[float, Any]] = {}
 
     def __call__(
@@ -250,12 +251,31 @@ class CacheResponse:
         compute_response: Callable[[], V],
     ) -> V:
         now = time.time()
-        if key not in self.key2value or self.key2value[key][0] < expired:
+        if not self.is_fresh(key, now):
             self.key2value[key] = (now + expired, compute_response())
-        response.headers["Cache-Control"] = (
-            f"max-age={int(self.key2value[key][0] - now)}"
-        )
-        return self.key2value[key][1]
+        return self.get(key, now, response)
+
+    async def acall(
+        self,
+        key: str,
+        expired: int,
+        response: Response,
+        compute_response: Callable[[], Awaitable[V]],
+    ) -> V:
+        """Same as `__call__` but the response is computed asynchronously"""
+        now = time.time()
+        if not self.is_fresh(key, now):
+            self.key2value[key] = (now + expired, await compute_response())
+        return self.get(key, now, response)
+
+    def is_fresh(self, key: str, now: float) -> bool:
+        """Whether the response of the key is cached and has not expired"""
+        return key in self.key2value and self.key2value[key][0] > now
+
+    def get(self, key: str, now: float, response: Response):
+        expired_at, value = self.key2value[key]
+        response.headers["Cache-Control"] = f"max-age={int(expired_at - now)}"
+        return value
 
 
 def is_valid_url(url: str) -> bool:
@@ -265,3 +285,32 @@ def is_valid_url(url: str) -> bool:
     is_valid_scheme = len(result.scheme) > 0
     is_valid_netloc = len(result.netloc) > 0
     return is_valid_netloc and is_valid_scheme
+
+
+class LazyProxy:
+    """A proxy to an object that is created on first use, e.g., clients that are expensive
+    to create or that we do not want to create at import time."""
+
+    __slots__ = ("_factory", "_obj")
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_obj", None)
+
+    def _get_object(self):
+        obj = object.__getattribute__(self, "_obj")
+        if obj is None:
+            obj = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_obj", obj)
+        return obj
+
+    @property
+    def __class__(self):  # type: ignore
+        # so that isinstance works with the proxied object
+        return self._get_object().__class__
+
+    def __getattr__(self, name: str):
+        return getattr(self._get_object(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._get_object(), name, value)
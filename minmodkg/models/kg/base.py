@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 from rdflib import RDF
-from statickg.helper import import_attr
 
-from minmodkg.config import MINMOD_KG_CLSARGS, MINMOD_KG_CLSPATH, MINMOD_NS_CFG
+from minmodkg.config import (
+    MINMOD_KG_ASYNC_CLIENT,
+    MINMOD_KG_CLSARGS,
+    MINMOD_KG_CLSPATH,
+    MINMOD_NS_CFG,
+    MINMOD_SERVER_TIMING,
+)
 from minmodkg.libraries.rdf.namespace import Namespace, NoRelSingleNS, SingleNS
 from minmodkg.libraries.rdf.rdf_model import RDFModel
 from minmodkg.libraries.rdf.triple_store import TripleStore
+from minmodkg.misc import metrics
+from minmodkg.misc.utils import LazyProxy
 
 NS_RDF = Namespace.rdf
 NS_RDFS = Namespace.rdfs
@@ -16,6 +25,23 @@ MINMOD_NS = Namespace(MINMOD_NS_CFG)
 NS_MR = MINMOD_NS.mr
 NS_MO = MINMOD_NS.mo
 NS_MD = MINMOD_NS.md
-MINMOD_KG: TripleStore = import_attr(MINMOD_KG_CLSPATH)(MINMOD_NS, **MINMOD_KG_CLSARGS)
+
+
+@lru_cache(maxsize=None)
+def get_minmod_kg() -> TripleStore:
+    from statickg.helper import import_attr
+
+    kg: TripleStore = import_attr(MINMOD_KG_CLSPATH)(MINMOD_NS, **MINMOD_KG_CLSARGS)
+    kg.configure_async_client(**MINMOD_KG_ASYNC_CLIENT)
+    kg.add_observer(metrics.observe_sparql)
+    if MINMOD_SERVER_TIMING is not None:
+        from minmodkg.misc import timing
+
+        kg.add_observer(timing.observe_sparql)
+    return kg
+
+
+# the triple store client is created on first use
+MINMOD_KG: TripleStore = LazyProxy(get_minmod_kg)  # type: ignore
 
 RDFModel.namespace = MINMOD_NS
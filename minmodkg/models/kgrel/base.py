@@ -1,8 +1,17 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional, TypeVar
 
-from minmodkg.config import MINMOD_DEBUG, MINMOD_KGREL_DB
+import orjson
+from minmodkg.config import (
+    MINMOD_DEBUG,
+    MINMOD_KGREL_ASYNC_DB,
+    MINMOD_KGREL_DB,
+    MINMOD_KGREL_POOL,
+    MINMOD_KGREL_REPLICA_DB,
+)
 from minmodkg.models.kg.candidate_entity import CandidateEntity
 from minmodkg.models.kg.geology_info import GeologyInfo
 from minmodkg.models.kg.mineral_inventory import MineralInventory
@@ -10,6 +19,8 @@ from minmodkg.models.kg.reference import Reference
 from minmodkg.models.kgrel.custom_types import (
     DataclassType,
     DedupMineralSiteDepositType,
+    JSONDataclassType,
+    JSONListDataclassType,
     ListDataclassType,
     Location,
     LocationView,
@@ -23,14 +34,15 @@ from minmodkg.models.kgrel.custom_types.ref_value import (
     RefGeologyInfo,
     RefListStr,
 )
-from sqlalchemy import create_engine, update
+from sqlalchemy import Engine, create_engine, make_url, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Session
 
 
 class Base(DeclarativeBase):
     type_annotation_map = {
         CandidateEntity: DataclassType(CandidateEntity),
-        Location: DataclassType(Location),
+        Location: JSONDataclassType(Location),
         LocationView: DataclassType(LocationView),
         RefValue: DataclassType(RefValue),
         RefValue[str]: DataclassType(RefValue[str]),
@@ -45,8 +57,8 @@ class Base(DeclarativeBase):
             DedupMineralSiteDepositType
         ),
         list[CandidateEntity]: ListDataclassType(CandidateEntity),
-        list[MineralInventory]: ListDataclassType(MineralInventory),
-        list[Reference]: ListDataclassType(Reference),
+        list[MineralInventory]: JSONListDataclassType(MineralInventory),
+        list[Reference]: JSONListDataclassType(Reference),
         list[RefDepositType]: ListDataclassType(RefDepositType),
         GeologyInfo: DataclassType(GeologyInfo),
     }
@@ -73,9 +85,103 @@ class Base(DeclarativeBase):
 dbconn = MINMOD_KGREL_DB
 if dbconn.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
+    pool_args = {}
 else:
     connect_args = {}
-engine = create_engine(dbconn, connect_args=connect_args, echo=MINMOD_DEBUG)
+    pool_args = dict(MINMOD_KGREL_POOL, pool_pre_ping=True)
+engine = create_engine(
+    dbconn,
+    connect_args=connect_args,
+    echo=MINMOD_DEBUG,
+    json_serializer=lambda obj: orjson.dumps(obj).decode(),
+    json_deserializer=orjson.loads,
+    **pool_args,
+)
+# optional read replica, used by the read-only queries of the services
+replica_dbconn = MINMOD_KGREL_REPLICA_DB
+replica_engine: Optional[Engine] = (
+    create_engine(
+        replica_dbconn,
+        echo=MINMOD_DEBUG,
+        json_serializer=lambda obj: orjson.dumps(obj).decode(),
+        json_deserializer=orjson.loads,
+        isolation_level="READ COMMITTED",
+        **pool_args,
+    )
+    if replica_dbconn is not None
+    else None
+)
+# async engines, bound to the event loop that created them as their connections are
+_async_engines: dict[str, tuple[asyncio.AbstractEventLoop, AsyncEngine]] = {}
+
+
+def get_async_dbconn(dbconn: str) -> str:
+    """Get the connection string of the async driver (asyncpg) of a database"""
+    url = make_url(dbconn)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+def get_async_engine() -> AsyncEngine:
+    return _get_async_engine(MINMOD_KGREL_ASYNC_DB or get_async_dbconn(dbconn))
+
+
+def get_async_replica_engine() -> Optional[AsyncEngine]:
+    if replica_dbconn is None:
+        return None
+    return _get_async_engine(
+        get_async_dbconn(replica_dbconn), isolation_level="READ COMMITTED"
+    )
+
+
+def _get_async_engine(async_dbconn: str, **kwargs) -> AsyncEngine:
+    loop = asyncio.get_running_loop()
+    if (
+        async_dbconn not in _async_engines
+        or _async_engines[async_dbconn][0] is not loop
+    ):
+        _async_engines[async_dbconn] = (
+            loop,
+            create_async_engine(
+                async_dbconn,
+                echo=MINMOD_DEBUG,
+                json_serializer=lambda obj: orjson.dumps(obj).decode(),
+                json_deserializer=orjson.loads,
+                **pool_args,
+                **kwargs,
+            ),
+        )
+    return _async_engines[async_dbconn][1]
+
+
+def get_engines() -> dict[str, Engine]:
+    """Get the engines created so far by their names (the async engines are represented by
+    their sync engines, which share their pools)"""
+    engines = {"primary": engine}
+    if replica_engine is not None:
+        engines["replica"] = replica_engine
+    for async_dbconn, (_, async_engine) in list(_async_engines.items()):
+        name = "async-replica" if async_dbconn == _async_replica_dbconn() else "async"
+        engines[name] = async_engine.sync_engine
+    return engines
+
+
+def _async_replica_dbconn() -> Optional[str]:
+    return get_async_dbconn(replica_dbconn) if replica_dbconn is not None else None
+
+
+E = TypeVar("E", Engine, AsyncEngine)
+
+
+def read_committed(engine: E) -> E:
+    """Get a view of the engine (sharing its pool) whose transactions run at READ COMMITTED,
+    which is enough for read-only queries that do not need a consistent snapshot"""
+    if engine.dialect.name == "postgresql":
+        return engine.execution_options(isolation_level="READ COMMITTED")
+    return engine
 
 
 def create_db_and_tables():
@@ -86,3 +192,9 @@ def create_db_and_tables():
 def get_rel_session():
     with Session(engine) as session:
         yield session
+
+
+@asynccontextmanager
+async def get_async_rel_session():
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
@@ -15,7 +15,8 @@ from minmodkg.models.kgrel.custom_types.ref_value import (
     RefValue,
 )
 from minmodkg.models.kgrel.custom_types.site_and_score import SiteAndScore, SiteScore
-from sqlalchemy import LargeBinary, TypeDecorator
+from sqlalchemy import JSON, LargeBinary, TypeDecorator
+from sqlalchemy.dialects.postgresql import JSONB
 
 
 class DataclassType(TypeDecorator):
@@ -62,9 +63,54 @@ class ListDataclassType(TypeDecorator):
         return [self.cls.from_dict(x) for x in result]
 
 
+class JSONDataclassType(TypeDecorator):
+    """SqlAlchemy Type decorator to store dataclasses as JSONB (JSON for other dialects)
+    so that the database can index and project into them."""
+
+    impl = JSON
+    cache_ok = True
+
+    def __init__(self, cls):
+        super().__init__()
+        self.cls = cls
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(JSON())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return value.to_dict()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.cls.from_dict(value)
+
+
+class JSONListDataclassType(JSONDataclassType):
+    """SqlAlchemy Type decorator to store list of dataclasses as JSONB (JSON for other dialects)"""
+
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return [x.to_dict() for x in value]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return [self.cls.from_dict(x) for x in value]
+
+
 __all__ = [
     "DataclassType",
     "ListDataclassType",
+    "JSONDataclassType",
+    "JSONListDataclassType",
     "Location",
     "LocationView",
     "GeoCoordinate",
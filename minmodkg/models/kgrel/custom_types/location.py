@@ -1,10 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Annotated, Optional
+from typing import Annotated, Optional, Sequence
 
-import shapely.wkt
-from minmodkg.misc.geo import reproject_geometry
+from minmodkg.misc.geo import reproject_wkt_centroids
 from minmodkg.misc.utils import extend_unique, makedict
 from minmodkg.models.kg.base import NS_MR
 from minmodkg.models.kg.candidate_entity import CandidateEntity
@@ -43,6 +42,15 @@ class Location:
             coordinates=d.get("coordinates"),
         )
 
+    @classmethod
+    def from_location_info(cls, location_info: LocationInfo) -> Location:
+        return cls(
+            country=location_info.country,
+            state_or_province=location_info.state_or_province,
+            crs=location_info.crs,
+            coordinates=location_info.location,
+        )
+
     def to_kg(self) -> LocationInfo:
         return LocationInfo(
             country=self.country,
@@ -114,37 +122,49 @@ class LocationView(GeoCoordinate):
 
     @staticmethod
     def from_location(location: Location, crss: dict[str, str]) -> LocationView:
-        view = LocationView()
-        if location.coordinates is not None:
+        return LocationView.from_locations([location], crss)[0]
+
+    @staticmethod
+    def from_locations(
+        locations: Sequence[Location], crss: dict[str, str]
+    ) -> list[LocationView]:
+        """Create the views of multiple locations at once: their centroids are computed and
+        reprojected to EPSG:4326 in batch, which is much faster than doing it one by one.
+        """
+        views = [LocationView() for _ in locations]
+
+        wkt_idx = []
+        wkts = []
+        wkt_crss = []
+        for i, location in enumerate(locations):
+            # TODO: fix this nan
+            if location.coordinates is None or "nan" in location.coordinates.lower():
+                continue
             if location.crs is None or location.crs.normalized_uri is None:
                 crs = "EPSG:4326"
             else:
                 crs = crss[location.crs.normalized_uri]
-
-            # TODO: fix this nan
-            if "nan" in location.coordinates.lower():
-                centroid = None
-            else:
-                try:
-                    assert crs.startswith("EPSG:")
-                    geometry = shapely.wkt.loads(location.coordinates)
-                    centroid = shapely.centroid(geometry)
-                    centroid = reproject_geometry(centroid, crs, "EPSG:4326")
-                except shapely.errors.GEOSException:
-                    centroid = None
-
-            if centroid is not None:
-                view.lat = centroid.y
-                view.lon = centroid.x
-
-        view.country = [
-            NS_MR.id(ent.normalized_uri)
-            for ent in location.country
-            if ent.normalized_uri is not None
-        ]
-        view.state_or_province = [
-            NS_MR.id(ent.normalized_uri)
-            for ent in location.state_or_province
-            if ent.normalized_uri is not None
-        ]
-        return view
+            assert crs.startswith("EPSG:")
+            wkt_idx.append(i)
+            wkts.append(location.coordinates)
+            wkt_crss.append(crs)
+
+        if len(wkts) > 0:
+            for i, centroid in zip(
+                wkt_idx, reproject_wkt_centroids(wkts, wkt_crss, "EPSG:4326")
+            ):
+                if centroid is not None:
+                    views[i].lon, views[i].lat = centroid
+
+        for view, location in zip(views, locations):
+            view.country = [
+                NS_MR.id(ent.normalized_uri)
+                for ent in location.country
+                if ent.normalized_uri is not None
+            ]
+            view.state_or_province = [
+                NS_MR.id(ent.normalized_uri)
+                for ent in location.state_or_province
+                if ent.normalized_uri is not None
+            ]
+        return views
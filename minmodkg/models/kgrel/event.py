@@ -1,13 +1,22 @@
 from __future__ import annotations
 
 import time
-from typing import Literal
+from typing import Literal, Optional
 
+import orjson
+import xxhash
 from minmodkg.models.kgrel.base import Base
 from minmodkg.models.kgrel.mineral_site import MineralSiteAndInventory
 from minmodkg.typing import InternalID
-from sqlalchemy import JSON, BigInteger
-from sqlalchemy.orm import Mapped, MappedAsDataclass, mapped_column
+from sqlalchemy import JSON, BigInteger, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Mapped, MappedAsDataclass, Session, mapped_column
+
+
+# version of the event payloads: 1 stores the full site, 2 stores only the site id
+EVENT_VERSION = 2
+# key of the advisory lock that serializes the allocation of event ids
+EVENT_ID_LOCK_KEY = 0x6D696E6D6F64
 
 
 class EventLog(MappedAsDataclass, Base):
@@ -16,10 +25,21 @@ class EventLog(MappedAsDataclass, Base):
     id: Mapped[int] = mapped_column(primary_key=True, init=False)
     type: Mapped[Literal["site:add", "site:update", "same-as:update"]] = mapped_column()
     data: Mapped[dict] = mapped_column(JSON)
+    # legacy flags -- the progress of the listeners is now tracked by `EventCheckpoint`,
+    # they are only used to initialize the checkpoints of an existing database
     kg_synced: Mapped[bool] = mapped_column(default=False, index=True)
     backup_synced: Mapped[bool] = mapped_column(default=False, index=True)
     timestamp: Mapped[int] = mapped_column(BigInteger, default_factory=time.time_ns)
 
+    @classmethod
+    def lock_ids(cls, session: Session):
+        """Lock the allocation of event ids until the transaction ends. Transactions that take
+        the lock before logging their events allocate the ids in the order they commit, so
+        once an event is visible, every event with a smaller id is either visible or has been
+        rolled back."""
+        if session.get_bind().dialect.name == "postgresql":
+            session.execute(select(func.pg_advisory_xact_lock(EVENT_ID_LOCK_KEY)))
+
     @classmethod
     def from_site_add(
         cls, site: MineralSiteAndInventory, same_site_ids: list[InternalID]
@@ -34,13 +54,18 @@ class EventLog(MappedAsDataclass, Base):
 
     @classmethod
     def from_site_update(cls, site: MineralSiteAndInventory) -> EventLog:
+        """Create an event for updating a site. To keep the event compact, it only stores the
+        id of the site, consumers read the latest version of the site from the database.
+        """
         return EventLog(
             type="site:update",
-            data={
-                "site": site.to_dict(),
-            },
+            data={"version": EVENT_VERSION, "site_id": site.ms.site_id},
         )
 
+    def is_compact(self) -> bool:
+        """Whether the event only stores the site id (version >= 2) instead of the full site"""
+        return self.data.get("version", 1) >= 2
+
     @classmethod
     def from_same_as_update(
         cls,
@@ -62,3 +87,57 @@ class EventLog(MappedAsDataclass, Base):
                 "diff_groups": diff_groups,
             },
         )
+
+
+def get_content_hash(obj: dict) -> str:
+    return xxhash.xxh3_64_hexdigest(orjson.dumps(obj, option=orjson.OPT_SORT_KEYS))
+
+
+class EventCheckpoint(MappedAsDataclass, Base):
+    """The high-water mark of a listener: every event with id <= `last_event_id` has been
+    handled by the listener. `last_event_id` is None when the listener has not seen any event.
+    """
+
+    __tablename__ = "event_checkpoint"
+
+    listener: Mapped[str] = mapped_column(primary_key=True)
+    last_event_id: Mapped[Optional[int]] = mapped_column(BigInteger)
+    modified_at: Mapped[int] = mapped_column(BigInteger, default_factory=time.time_ns)
+
+
+class DataVersion(MappedAsDataclass, Base):
+    """A counter increased after every transaction that logs events, so the version of the data
+    (the snapshot id) can be read without scanning the event log, which is also truncated
+    once the events are handled. There is a single row (id = 1), created by the first bump.
+    `created_at` is only set when the row is created, so it tells a reset of the database
+    (the version starts again from 1) apart from a version going backward."""
+
+    __tablename__ = "data_version"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger)
+    created_at: Mapped[int] = mapped_column(BigInteger, default_factory=time.time_ns)
+    modified_at: Mapped[int] = mapped_column(BigInteger, default_factory=time.time_ns)
+
+    ROW_ID = 1
+
+    @classmethod
+    def bump(cls, session: Session) -> tuple[int, int]:
+        """Increase the data version in the transaction of the session and return the
+        creation time of the row and the new version. The row stays locked until the
+        transaction ends, so call it right before committing to not serialize the writers
+        for longer than needed. The transaction must be READ COMMITTED, otherwise concurrent
+        bumps fail with a serialization error."""
+        now = time.time_ns()
+        query = insert(cls).values(
+            id=cls.ROW_ID, version=1, created_at=now, modified_at=now
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[cls.id],
+            set_={
+                "version": cls.version + 1,
+                "modified_at": query.excluded.modified_at,
+            },
+        ).returning(cls.created_at, cls.version)
+        created_at, version = session.execute(query).one()
+        return created_at, version
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from minmodkg.models.kgrel.mineral_site import MineralSite
+from minmodkg.models.kgrel.views.dedup_mineral_site_search import (
+    DedupMineralSiteSearch,
+)
+from sqlalchemy import Engine, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+
+# columns of mineral_site that used to be stored as orjson blobs (BYTEA)
+JSONB_COLUMNS = ["location", "inventories", "reference"]
+# GIN indexes on the JSONB columns that were created by earlier versions but are not
+# used by any query
+UNUSED_INDEXES = ["ix_mineral_site_inventories", "ix_mineral_site_reference"]
+
+
+def migrate_blob_to_jsonb(engine: Engine):
+    """Convert the orjson blobs (BYTEA) of the mineral site table to JSONB and drop the
+    unused indexes on them. Columns that are already JSONB are left untouched, so it is
+    safe to run this function multiple times."""
+    if engine.dialect.name != "postgresql":
+        return
+
+    columns = {
+        col["name"]: col["type"]
+        for col in inspect(engine).get_columns(MineralSite.__tablename__)
+    }
+    with engine.begin() as conn:
+        for name in JSONB_COLUMNS:
+            if name not in columns or isinstance(columns[name], JSONB):
+                continue
+            conn.execute(
+                text(
+                    f"ALTER TABLE {MineralSite.__tablename__} ALTER COLUMN {name} "
+                    f"TYPE JSONB USING convert_from({name}, 'UTF8')::jsonb"
+                )
+            )
+
+        for index in UNUSED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+
+def rebuild_dedup_mineral_site_search(engine: Engine):
+    """(Re)create the dedup mineral site search table and populate it from the dedup
+    mineral sites and their inventories. The table only contains derived data, so it is
+    dropped to pick up any change of its schema."""
+    with engine.begin() as conn:
+        DedupMineralSiteSearch.__table__.drop(conn, checkfirst=True)
+        DedupMineralSiteSearch.__table__.create(conn)
+        conn.execute(DedupMineralSiteSearch.insert_from_dedup_sites())
@@ -57,8 +57,11 @@ class MineralSiteAndInventory:
         crs_names: dict[str, str],
         source_score: dict[IRI, float | None],
         dedup_site_id: Optional[str] = None,
+        location_view: Optional[LocationView] = None,
     ) -> MineralSiteAndInventory:
-        ms = MineralSite.from_raw_site(raw_site, crs_names, source_score)
+        ms = MineralSite.from_raw_site(
+            raw_site, crs_names, source_score, location_view=location_view
+        )
         if dedup_site_id is not None:
             ms.dedup_site_id = dedup_site_id
 
@@ -151,6 +154,48 @@ class MineralSiteAndInventory:
 
         return cls(ms, inv_views)
 
+    @classmethod
+    def from_raw_sites(
+        cls,
+        raw_sites: Iterable[dict | KGMineralSite],
+        commodity_form_conversion: dict[str, float],
+        crs_names: dict[str, str],
+        source_score: dict[IRI, float | None],
+    ) -> list[MineralSiteAndInventory]:
+        """Same as `from_raw_site` but the location views of all sites are computed in batch"""
+        sites = [
+            (
+                KGMineralSite.from_dict(raw_site)
+                if isinstance(raw_site, dict)
+                else raw_site
+            )
+            for raw_site in raw_sites
+        ]
+        location_views = iter(
+            LocationView.from_locations(
+                [
+                    Location.from_location_info(site.location_info)
+                    for site in sites
+                    if site.location_info is not None
+                ],
+                crs_names,
+            )
+        )
+        return [
+            cls.from_raw_site(
+                site,
+                commodity_form_conversion,
+                crs_names,
+                source_score,
+                location_view=(
+                    next(location_views)
+                    if site.location_info is not None
+                    else LocationView()
+                ),
+            )
+            for site in sites
+        ]
+
 
 class MineralSite(MappedAsDataclass, Base):
     __tablename__ = "mineral_site"
@@ -200,6 +245,7 @@ class MineralSite(MappedAsDataclass, Base):
         raw_site: dict | KGMineralSite,
         crs_names: dict[str, str],
         source_score: dict[IRI, float | None],
+        location_view: Optional[LocationView] = None,
     ) -> MineralSite:
         site = (
             KGMineralSite.from_dict(raw_site)
@@ -207,16 +253,12 @@ class MineralSite(MappedAsDataclass, Base):
             else raw_site
         )
         location = None
-        location_view = LocationView()
-
         if site.location_info is not None:
-            location = Location(
-                country=site.location_info.country,
-                state_or_province=site.location_info.state_or_province,
-                crs=site.location_info.crs,
-                coordinates=site.location_info.location,
-            )
-            location_view = LocationView.from_location(location, crs_names)
+            location = Location.from_location_info(site.location_info)
+            if location_view is None:
+                location_view = LocationView.from_location(location, crs_names)
+        if location_view is None:
+            location_view = LocationView()
 
         out_site = MineralSite(
             site_id=site.id,
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+from minmodkg.misc.geo import (
+    EARTH_RADIUS_KM,
+    GEO_CELL_SIZE,
+    GEO_N_COLS,
+    GEO_N_ROWS,
+    geo_cell_ranges,
+    radius_to_bbox,
+)
+from minmodkg.models.kgrel.base import Base
+from minmodkg.models.kgrel.dedup_mineral_site import DedupMineralSite
+from minmodkg.models.kgrel.views.mineral_inventory_view import DedupMineralInventoryView
+from minmodkg.typing import InternalID
+from sqlalchemy import (
+    VARCHAR,
+    ColumnElement,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    and_,
+    cast,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.orm import Mapped, MappedAsDataclass, mapped_column
+
+
+class DedupMineralSiteSearch(MappedAsDataclass, Base):
+    """Denormalized table for searching dedup mineral sites. Each row is a pair of
+    a dedup mineral site and one of its commodities, holding the columns that we
+    filter and sort on so that listing dedup sites does not need any join or aggregation.
+
+    The coordinates of the dedup site are also indexed by the id of the grid cell containing
+    them (see `minmodkg.misc.geo.geo_cell`) so that we can find sites within an area using
+    a B-tree index without requiring PostGIS.
+
+    Rows are derived from `DedupMineralSite` and `DedupMineralInventoryView` and must be
+    refreshed whenever the dedup site or its inventories change (see `insert_from_dedup_sites`).
+    """
+
+    __tablename__ = "dedup_mineral_site_search"
+    __table_args__ = (
+        Index("ix_dedup_mineral_site_search_commodity", "commodity", "dedup_site_id"),
+        Index(
+            "ix_dedup_mineral_site_search_country",
+            "country",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_dedup_mineral_site_search_state_or_province",
+            "state_or_province",
+            postgresql_using="gin",
+        ),
+    )
+
+    dedup_site_id: Mapped[InternalID] = mapped_column(
+        ForeignKey("dedup_mineral_site.id", ondelete="CASCADE"), primary_key=True
+    )
+    commodity: Mapped[InternalID] = mapped_column(String(30), primary_key=True)
+    top1_deposit_type: Mapped[Optional[InternalID]] = mapped_column(index=True)
+    country: Mapped[list[InternalID]] = mapped_column(ARRAY(VARCHAR(7)))
+    state_or_province: Mapped[list[InternalID]] = mapped_column(ARRAY(VARCHAR(7)))
+    rank: Mapped[Optional[str]] = mapped_column(index=True)
+    contained_metal: Mapped[Optional[float]]
+    tonnage: Mapped[Optional[float]]
+    grade: Mapped[Optional[float]]
+    lat: Mapped[Optional[float]]
+    lon: Mapped[Optional[float]]
+    geo_cell: Mapped[Optional[int]] = mapped_column(index=True)
+
+    @staticmethod
+    def insert_from_dedup_sites(
+        dedup_site_ids: Optional[Sequence[InternalID]] = None,
+    ):
+        """Create an INSERT ... SELECT statement that populates the search rows of the given
+        dedup sites (all dedup sites if `dedup_site_ids` is None) from the dedup tables.
+        """
+        dms = DedupMineralSite.__table__.c
+        # coordinates are stored as orjson blobs: {"value": {"lat": .., "lon": ..}, ...}
+        coordinates = cast(func.convert_from(dms.coordinates, literal("UTF8")), JSONB)
+        lat = cast(coordinates["value"]["lat"].astext, Float)
+        lon = cast(coordinates["value"]["lon"].astext, Float)
+        geo_cell = cast(
+            func.least(
+                func.greatest(func.floor((lat + 90) / GEO_CELL_SIZE), 0),
+                GEO_N_ROWS - 1,
+            )
+            * GEO_N_COLS
+            + func.least(
+                func.greatest(func.floor((lon + 180) / GEO_CELL_SIZE), 0),
+                GEO_N_COLS - 1,
+            ),
+            Integer,
+        )
+        query = select(
+            DedupMineralInventoryView.dedup_site_id,
+            DedupMineralInventoryView.commodity,
+            dms.top1_deposit_type,
+            dms.country_val,
+            dms.state_or_province_val,
+            dms.rank_val,
+            DedupMineralInventoryView.contained_metal,
+            DedupMineralInventoryView.tonnage,
+            DedupMineralInventoryView.grade,
+            lat,
+            lon,
+            geo_cell,
+        ).join(
+            DedupMineralSite.__table__,
+            dms.id == DedupMineralInventoryView.dedup_site_id,
+        )
+        if dedup_site_ids is not None:
+            query = query.where(
+                DedupMineralInventoryView.dedup_site_id.in_(dedup_site_ids)
+            )
+
+        return insert(DedupMineralSiteSearch).from_select(
+            [
+                "dedup_site_id",
+                "commodity",
+                "top1_deposit_type",
+                "country",
+                "state_or_province",
+                "rank",
+                "contained_metal",
+                "tonnage",
+                "grade",
+                "lat",
+                "lon",
+                "geo_cell",
+            ],
+            query,
+        )
+
+    @staticmethod
+    def within_bbox(
+        min_lon: float, min_lat: float, max_lon: float, max_lat: float
+    ) -> ColumnElement[bool]:
+        """Condition selecting rows whose coordinates are within the bounding box. A box
+        crossing the antimeridian has min_lon > max_lon."""
+        S = DedupMineralSiteSearch
+        if min_lon <= max_lon:
+            lon_cond = S.lon.between(min_lon, max_lon)
+        else:
+            lon_cond = or_(S.lon >= min_lon, S.lon <= max_lon)
+        return and_(
+            or_(
+                *(
+                    S.geo_cell.between(start, end)
+                    for start, end in geo_cell_ranges(
+                        min_lon, min_lat, max_lon, max_lat
+                    )
+                )
+            ),
+            S.lat.between(min_lat, max_lat),
+            lon_cond,
+        )
+
+    @staticmethod
+    def within_radius(lat: float, lon: float, radius_km: float) -> ColumnElement[bool]:
+        """Condition selecting rows whose coordinates are within `radius_km` of the given
+        coordinate (great-circle distance)."""
+        S = DedupMineralSiteSearch
+        dlat = func.radians(S.lat - lat)
+        dlon = func.radians(S.lon - lon)
+        haversine = func.power(func.sin(dlat / 2), 2) + func.cos(
+            func.radians(lat)
+        ) * func.cos(func.radians(S.lat)) * func.power(func.sin(dlon / 2), 2)
+        return and_(
+            DedupMineralSiteSearch.within_bbox(*radius_to_bbox(lat, lon, radius_km)),
+            2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(haversine, 1)))
+            <= radius_km,
+        )
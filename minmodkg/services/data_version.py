@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+from minmodkg.models.kgrel.base import engine, get_async_engine, read_committed
+from minmodkg.models.kgrel.event import DataVersion
+from sqlalchemy import Engine, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+
+# how long (in seconds) a version read from the database is reused before it is revalidated
+DATA_VERSION_TTL = 1.0
+
+
+class DataVersionCache:
+    """In-process cache of the data version (`DataVersion`).
+
+    The version is re-read (a primary key lookup) at most once every `ttl` seconds, and the
+    writes of this process update it as soon as they commit, so a process always sees its own
+    writes. The version never goes backward, even when a read races with a write, unless the
+    database has been reset, which is detected by the creation time of the version's row.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DATA_VERSION_TTL,
+        _engine: Optional[Engine] = None,
+        _async_engine: Optional[AsyncEngine] = None,
+    ):
+        self.ttl = ttl
+        self.engine = read_committed(_engine or engine)
+        self._async_engine = _async_engine
+        self.version: Optional[int] = None
+        # creation time of the row of the version, None if there is no row yet
+        self.created_at: Optional[int] = None
+        self.expired_at = 0.0
+
+    def get(self) -> int:
+        if self.version is None or time.monotonic() >= self.expired_at:
+            with Session(self.engine) as session:
+                row = session.execute(self.query()).one_or_none()
+            self.observe(*(row or (None, 0)))
+        assert self.version is not None
+        return self.version
+
+    async def aget(self) -> int:
+        if self.version is None or time.monotonic() >= self.expired_at:
+            async_engine = read_committed(self._async_engine or get_async_engine())
+            async with AsyncSession(async_engine) as session:
+                row = (await session.execute(self.query())).one_or_none()
+            self.observe(*(row or (None, 0)))
+        assert self.version is not None
+        return self.version
+
+    def observe(self, created_at: Optional[int], version: int):
+        """Record a version read from or committed to the database"""
+        if (
+            self.version is None
+            or created_at != self.created_at
+            or version > self.version
+        ):
+            self.created_at = created_at
+            self.version = version
+        self.expired_at = time.monotonic() + self.ttl
+
+    def query(self):
+        return select(DataVersion.created_at, DataVersion.version).where(
+            DataVersion.id == DataVersion.ROW_ID
+        )
+
+
+DATA_VERSION = DataVersionCache()
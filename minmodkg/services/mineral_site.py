@@ -3,20 +3,30 @@ from __future__ import annotations
 import time
 from collections import defaultdict
 from functools import cmp_to_key
-from typing import NamedTuple, Optional, Sequence, Tuple, TypedDict
+from typing import Iterable, NamedTuple, Optional, Sequence, Tuple, TypedDict
 
 from minmodkg.misc.utils import group_by, makedict
-from minmodkg.models.kgrel.base import engine
+from minmodkg.models.kgrel.base import (
+    engine,
+    get_async_engine,
+    get_async_replica_engine,
+    read_committed,
+    replica_engine,
+)
 from minmodkg.models.kgrel.dedup_mineral_site import (
     DedupMineralSite,
     DedupMineralSiteAndInventory,
 )
-from minmodkg.models.kgrel.event import EventLog
+from minmodkg.models.kgrel.event import DataVersion, EventLog
 from minmodkg.models.kgrel.mineral_site import MineralSite, MineralSiteAndInventory
+from minmodkg.models.kgrel.views.dedup_mineral_site_search import (
+    DedupMineralSiteSearch,
+)
 from minmodkg.models.kgrel.views.mineral_inventory_view import (
     DedupMineralInventoryView,
     MineralInventoryView,
 )
+from minmodkg.services.data_version import DATA_VERSION, DataVersionCache
 from minmodkg.typing import InternalID
 from sqlalchemy import (
     Engine,
@@ -26,9 +36,11 @@ from sqlalchemy import (
     distinct,
     func,
     insert,
+    or_,
     select,
     update,
 )
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.orm import Session
 
 RawMineralInventoryView = dict
@@ -50,6 +62,28 @@ class SiteSameAsInfo(NamedTuple):
     dedup_site_id: str
 
 
+class SiteVersion(NamedTuple):
+    """Version of a site as it is returned by the API: `modified_at` is bumped when the site
+    is updated, but linking sites only changes its dedup site"""
+
+    modified_at: int
+    dedup_site_id: InternalID
+
+
+class DedupSiteVersion(NamedTuple):
+    """Version of a dedup site: `modified_at` is the latest version of its sites, so the
+    sites are needed to tell apart the dedup sites whose sites are unlinked"""
+
+    modified_at: int
+    site_ids: tuple[InternalID, ...]
+
+    @staticmethod
+    def from_dedup_site(dms: DedupMineralSite) -> DedupSiteVersion:
+        return DedupSiteVersion(
+            dms.modified_at, tuple(site.site_id for site in dms.ranked_sites)
+        )
+
+
 class ExpiredSnapshotIdError(Exception):
     pass
 
@@ -58,57 +92,167 @@ class UnsupportOperationError(Exception):
     pass
 
 
+class SiteNotFoundError(Exception):
+    pass
+
+
 class ArgumentError(Exception):
     pass
 
 
 class MineralSiteService:
 
-    def __init__(self, _engine: Optional[Engine] = None):
+    def __init__(
+        self,
+        _engine: Optional[Engine] = None,
+        _async_engine: Optional[AsyncEngine] = None,
+        _replica_engine: Optional[Engine] = None,
+        _async_replica_engine: Optional[AsyncEngine] = None,
+        read_from_replica: bool = True,
+    ):
+        """
+        Args:
+            read_from_replica: whether the read-only methods (find_*) query the replica
+                database (if there is one). Disable it when the reads must see the latest
+                writes, e.g., when syncing the events.
+        """
         self.engine = _engine or engine
+        self._async_engine = _async_engine
+        self.read_from_replica = read_from_replica
+        if not read_from_replica:
+            _replica_engine = None
+        elif _replica_engine is None and _engine is None:
+            # use the configured replica unless the primary is overridden (e.g., in tests)
+            _replica_engine = replica_engine
+        self.replica_engine = read_committed(_replica_engine or self.engine)
+        self._async_replica_engine = (
+            _async_replica_engine if read_from_replica else None
+        )
+        # the cached data version is of the configured database
+        self.data_version: Optional[DataVersionCache] = (
+            DATA_VERSION if _engine is None else None
+        )
+
+    @property
+    def async_engine(self) -> AsyncEngine:
+        """Engine of the async methods (prefixed with `a`), which are used by the async
+        API handlers so that they do not hold a worker thread while waiting for the database.
+        """
+        return self._async_engine or get_async_engine()
+
+    @property
+    def async_replica_engine(self) -> AsyncEngine:
+        engine = self._async_replica_engine
+        if engine is None and self._async_engine is None and self.read_from_replica:
+            engine = get_async_replica_engine()
+        return read_committed(engine or self.async_engine)
+
+    def read_session(self) -> Session:
+        """Session of the read-only queries: they run on the replica (if there is one) at
+        READ COMMITTED so they do not compete with the writes on the primary."""
+        return Session(self.replica_engine, expire_on_commit=False)
+
+    def aread_session(self) -> AsyncSession:
+        """Async version of `read_session`"""
+        return AsyncSession(self.async_replica_engine, expire_on_commit=False)
 
     def get_site_db_id(self, site_id: InternalID) -> Optional[int]:
+        # this is checked before writing the site, so it must read from the primary
         q = select(MineralSite.id).where(MineralSite.site_id == site_id)
         with Session(self.engine) as session:
             return session.execute(q).scalar_one_or_none()
 
+    async def aget_site_db_id(self, site_id: InternalID) -> Optional[int]:
+        # same as `get_site_db_id`, clients check it before writing, so use the primary
+        q = select(MineralSite.id).where(MineralSite.site_id == site_id)
+        async with AsyncSession(read_committed(self.async_engine)) as session:
+            return (await session.execute(q)).scalar_one_or_none()
+
     def find_by_id(self, site_id: InternalID) -> Optional[MineralSiteAndInventory]:
         query = self._select_mineral_site().where(MineralSite.site_id == site_id)
-        with Session(self.engine, expire_on_commit=False) as session:
+        with self.read_session() as session:
             lst = self._read_mineral_sites(session, query)
             if len(lst) == 0:
                 return None
             return lst[0]
 
+    async def afind_by_id(
+        self, site_id: InternalID
+    ) -> Optional[MineralSiteAndInventory]:
+        query = self._select_mineral_site().where(MineralSite.site_id == site_id)
+        async with self.aread_session() as session:
+            lst = self._norm_mineral_sites((await session.execute(query)).all())
+            if len(lst) == 0:
+                return None
+            return lst[0]
+
     def find_dedup_by_id(
         self, dedup_site_id: InternalID
     ) -> Optional[DedupMineralSiteAndInventory]:
-        query = (
-            select(DedupMineralSite, self.dedup_inv_agg)
-            .join(
-                DedupMineralInventoryView,
-                DedupMineralInventoryView.dedup_site_id == DedupMineralSite.id,
-                isouter=True,
-            )
-            .group_by(DedupMineralSite.id)
-            .where(DedupMineralSite.id == dedup_site_id)
+        query = self._select_dedup_mineral_site().where(
+            DedupMineralSite.id == dedup_site_id
         )
-
-        with Session(self.engine, expire_on_commit=False) as session:
+        with self.read_session() as session:
             row = session.execute(query).one_or_none()
             if row is None:
                 return None
             return self._norm_dedup_mineral_site(row)
 
+    async def afind_dedup_by_id(
+        self, dedup_site_id: InternalID
+    ) -> Optional[DedupMineralSiteAndInventory]:
+        query = self._select_dedup_mineral_site().where(
+            DedupMineralSite.id == dedup_site_id
+        )
+        async with self.aread_session() as session:
+            row = (await session.execute(query)).one_or_none()
+            if row is None:
+                return None
+            return self._norm_dedup_mineral_site(row)
+
     def find_by_ids(
         self, ids: list[InternalID]
     ) -> dict[InternalID, MineralSiteAndInventory]:
         query = self._select_mineral_site().where(MineralSite.site_id.in_(ids))
-        with Session(self.engine, expire_on_commit=False) as session:
+        with self.read_session() as session:
             return {
                 msi.ms.site_id: msi for msi in self._read_mineral_sites(session, query)
             }
 
+    async def afind_by_ids(
+        self, ids: list[InternalID]
+    ) -> dict[InternalID, MineralSiteAndInventory]:
+        query = self._select_mineral_site().where(MineralSite.site_id.in_(ids))
+        async with self.aread_session() as session:
+            rows = (await session.execute(query)).all()
+            return {msi.ms.site_id: msi for msi in self._norm_mineral_sites(rows)}
+
+    async def aget_site_versions(
+        self, ids: Sequence[InternalID]
+    ) -> dict[InternalID, SiteVersion]:
+        """Get the versions of the sites without reading the sites"""
+        query = select(
+            MineralSite.site_id, MineralSite.modified_at, MineralSite.dedup_site_id
+        ).where(MineralSite.site_id.in_(ids))
+        async with self.aread_session() as session:
+            return {
+                site_id: SiteVersion(modified_at, dedup_site_id)
+                for site_id, modified_at, dedup_site_id in await session.execute(query)
+            }
+
+    async def aget_dedup_site_version(
+        self, dedup_site_id: InternalID
+    ) -> Optional[DedupSiteVersion]:
+        """Get the version of a dedup site without reading the dedup site"""
+        query = select(
+            DedupMineralSite.modified_at, DedupMineralSite.ranked_sites
+        ).where(DedupMineralSite.id == dedup_site_id)
+        async with self.aread_session() as session:
+            row = (await session.execute(query)).one_or_none()
+            if row is None:
+                return None
+            return DedupSiteVersion(row[0], tuple(site.site_id for site in row[1]))
+
     def upsert(self, lst_site_and_inv: list[MineralSiteAndInventory]):
         with Session(self.engine, expire_on_commit=False) as session:
             session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
@@ -118,13 +262,15 @@ class MineralSiteService:
             dedup_sites = self.fn__update_dedup_mineral_sites_info(
                 session, created_msis + updated_msis
             )
+            self.fn__refresh_dedup_search(session, list(dedup_sites.keys()))
+            events = []
             if len(created_msis) > 0:
                 self.fn__create_mineral_sites(session, created_msis)
-                self.fn__save_add_events(session, created_msis, dedup_sites)
+                events.extend(self.fn__get_add_events(created_msis, dedup_sites))
             if len(updated_msis) > 0:
                 self.fn__update_mineral_sites(session, updated_msis)
-                self.fn__save_update_events(session, updated_msis)
-            session.commit()
+                events.extend(EventLog.from_site_update(msi) for msi in updated_msis)
+            self.fn__commit_events(session, events)
 
     def create(self, site_and_inv: MineralSiteAndInventory):
         """Create a mineral site."""
@@ -237,34 +383,73 @@ class MineralSiteService:
                     )
                 )
                 session.add_all(dedup_site.invs)
+            self.fn__refresh_dedup_search(session, [dedup_site.dms.id])
 
             # **ALGO**
             # insert the new site and its inventories into the database
             session.add_all(site_and_inv.invs)
-            session.add(
-                EventLog.from_site_add(
-                    site_and_inv, [ms.ms.site_id for ms in existing_sites]
-                )
-            )
 
             # step 3: commit data
-            session.commit()
+            self.fn__commit_events(
+                session,
+                [
+                    EventLog.from_site_add(
+                        site_and_inv, [ms.ms.site_id for ms in existing_sites]
+                    )
+                ],
+            )
 
     def update(
         self,
         site_and_inv: MineralSiteAndInventory,
         site_snapshot_id: Optional[int] = None,
     ):
+        """Update a mineral site (identified by its site_id) and its dedup site.
+
+        Raise ExpiredSnapshotIdError if `site_snapshot_id` is given and the site has been
+        modified since then, and SiteNotFoundError if the site does not exist.
+        """
         with Session(self.engine, expire_on_commit=False) as session:
-            session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            # step -1: lock the site and the other sites of its dedup site, the locks are
+            # held until commit so no one can change the dedup site while we are
+            # recomputing it. The sites are read in a separate statement after the locks
+            # are granted: a statement only sees the rows committed before it starts (READ
+            # COMMITTED), so a statement that waits for the locks would read the versions of
+            # the sites from before the concurrent updates that it waited for.
+            dedup_site_filter = or_(
+                MineralSite.site_id == site_and_inv.ms.site_id,
+                MineralSite.dedup_site_id
+                == select(MineralSite.dedup_site_id)
+                .where(MineralSite.site_id == site_and_inv.ms.site_id)
+                .scalar_subquery(),
+            )
+            locked_site_ids = set()
+            while True:
+                locked_site_ids.update(
+                    session.execute(
+                        select(MineralSite.id)
+                        .where(dedup_site_filter)
+                        # lock the rows in the same order to avoid deadlocks
+                        .order_by(MineralSite.id)
+                        .with_for_update()
+                    ).scalars()
+                )
+                dedup_sites = self._read_mineral_sites(
+                    session, self._select_mineral_site().where(dedup_site_filter)
+                )
+                if all(msi.ms.id in locked_site_ids for msi in dedup_sites):
+                    break
+                # sites were linked to the dedup site while we were waiting for the locks
 
-            # step -1: pull up the data and check to make sure that they don't change
-            # the dedup site information and if the site snapshot id matches
-            prev_dms_id, prev_snapshot_id = session.execute(
-                select(MineralSite.dedup_site_id, MineralSite.modified_at).where(
-                    MineralSite.id == site_and_inv.ms.id
+            for prev_site_and_inv in dedup_sites:
+                if prev_site_and_inv.ms.site_id == site_and_inv.ms.site_id:
+                    break
+            else:
+                raise SiteNotFoundError(
+                    f"The site {site_and_inv.ms.site_id} doesn't exist"
                 )
-            ).one()
+
+            prev_dms_id = prev_site_and_inv.ms.dedup_site_id
             if (
                 site_and_inv.ms.has_dedup_site()
                 and prev_dms_id != site_and_inv.ms.dedup_site_id
@@ -272,40 +457,44 @@ class MineralSiteService:
                 raise UnsupportOperationError(
                     f"This service does not support updating dedup site id (`{prev_dms_id}` vs `{site_and_inv.ms.dedup_site_id}`), use `update_same_as` instead."
                 )
+            site_and_inv.set_id(prev_site_and_inv.ms.id)
             site_and_inv.ms.dedup_site_id = prev_dms_id
-            if site_snapshot_id is not None and prev_snapshot_id != site_snapshot_id:
+            update_event = EventLog.from_site_update(site_and_inv)
+
+            # step 0: write the site only if it has not changed since the snapshot
+            # (compare-and-swap), this is the first write so nothing needs to be undone
+            if (
+                session.execute(
+                    site_and_inv.ms.get_update_query().where(
+                        MineralSite.modified_at
+                        == (
+                            site_snapshot_id
+                            if site_snapshot_id is not None
+                            else prev_site_and_inv.ms.modified_at
+                        )
+                    )
+                ).rowcount
+                == 0
+            ):
                 raise ExpiredSnapshotIdError(
-                    f"The new snapshot of the site is {prev_snapshot_id}"
+                    f"The new snapshot of the site is {prev_site_and_inv.ms.modified_at}"
                 )
 
-            self._read_mineral_sites(
-                session,
-                self._select_mineral_site().where(MineralSite.id == site_and_inv.ms.id),
-            )
-
-            # step 0: we clean up the mineral inventory views of the site
+            # step 1: we clean up the mineral inventory views of the site
             session.execute(
                 delete(MineralInventoryView).where(
                     MineralInventoryView.site_id == site_and_inv.ms.id
                 )
             )
 
-            # step 1: retrieve related information that can be used to construct a dedup site
-            query = self._select_mineral_site().where(
-                MineralSite.dedup_site_id == site_and_inv.ms.dedup_site_id
-            )
-
-            all_sites = [
-                msi
-                for msi in self._read_mineral_sites(session, query)
-                if msi.ms.id != site_and_inv.ms.id
-            ]
+            # step 2: construct the dedup site from the sites we have locked
+            all_sites = [msi for msi in dedup_sites if msi.ms.id != site_and_inv.ms.id]
             all_sites.append(site_and_inv)
             dms = DedupMineralSite.from_sites(
                 all_sites, dedup_site_id=site_and_inv.ms.dedup_site_id
             )
 
-            # step 2: write data
+            # step 3: write data
             # write the dedup mineral site first
             session.execute(dms.dms.get_update_query())
             # delete existing inventories and add them back...
@@ -316,9 +505,9 @@ class MineralSiteService:
                 )
             )
             session.add_all(dms.invs)
+            self.fn__refresh_dedup_search(session, [dms.dms.id])
 
-            # write the mineral site and its inventories
-            session.execute(site_and_inv.ms.get_update_query())
+            # write the inventories of the mineral site
             update_invs = []
             for inv in site_and_inv.invs:
                 if inv.id is not None:
@@ -327,10 +516,9 @@ class MineralSiteService:
                     session.add(inv)
             if len(update_invs) > 0:
                 session.execute(update(MineralInventoryView), update_invs)
-            session.add(EventLog.from_site_update(site_and_inv))
 
-            # step 3: commit data
-            session.commit()
+            # step 4: commit data
+            self.fn__commit_events(session, [update_event])
 
     def update_same_as(
         self, user_uri: str, groups: list[list[InternalID]]
@@ -446,8 +634,10 @@ class MineralSiteService:
                     DedupMineralSite.id.in_(set(affected_dedup_ids).difference(output))
                 )
             )
-            session.add(EventLog.from_same_as_update(user_uri, groups, diff_groups))
-            session.commit()
+            self.fn__refresh_dedup_search(session, output)
+            self.fn__commit_events(
+                session, [EventLog.from_same_as_update(user_uri, groups, diff_groups)]
+            )
         return output
 
     def find_dedup_mineral_sites(
@@ -459,109 +649,209 @@ class MineralSiteService:
         state_or_province: Optional[InternalID] = None,
         has_grade_tonnage: Optional[bool] = None,
         dedup_site_ids: Optional[Sequence[InternalID]] = None,
+        bbox: Optional[tuple[float, float, float, float]] = None,
+        within_radius: Optional[tuple[float, float, float]] = None,
         limit: int = 0,
         offset: int = 0,
         return_count: bool = False,
     ) -> FindDedupMineralSiteResult:
-        query = (
-            select(
-                DedupMineralSite,
-                self.dedup_inv_agg,
-            )
-            .join(
-                DedupMineralInventoryView,
-                DedupMineralInventoryView.dedup_site_id == DedupMineralSite.id,
-                isouter=commodity is not None,
-            )
-            .group_by(DedupMineralSite.id)
+        """Find dedup mineral sites.
+
+        Args:
+            bbox: (min_lon, min_lat, max_lon, max_lat) -- only sites within the box
+            within_radius: (lat, lon, radius_km) -- only sites within the radius
+        """
+        query, count_query, inv_filters = self._select_dedup_mineral_site_ids(
+            commodity=commodity,
+            deposit_type=deposit_type,
+            country=country,
+            state_or_province=state_or_province,
+            has_grade_tonnage=has_grade_tonnage,
+            dedup_site_ids=dedup_site_ids,
+            bbox=bbox,
+            within_radius=within_radius,
+            limit=limit,
+            offset=offset,
+            return_count=return_count,
         )
+        with self.read_session() as session:
+            ids = list(session.execute(query).scalars())
+            lst_dms = session.execute(
+                select(DedupMineralSite).where(DedupMineralSite.id.in_(ids))
+            ).scalars()
+            invs = session.execute(
+                select(DedupMineralInventoryView).where(
+                    DedupMineralInventoryView.dedup_site_id.in_(ids), *inv_filters
+                )
+            ).scalars()
+            total = (
+                session.execute(count_query).scalar_one()
+                if count_query is not None
+                else 0
+            )
+            return self._norm_find_dedup_mineral_sites(ids, lst_dms, invs, total)
 
-        count_query = None
-        if return_count:
-            count_query = select(func.count(distinct(DedupMineralSite.id))).select_from(
-                DedupMineralSite
+    async def afind_dedup_mineral_sites(
+        self,
+        *,
+        commodity: Optional[InternalID],
+        deposit_type: Optional[InternalID] = None,
+        country: Optional[InternalID] = None,
+        state_or_province: Optional[InternalID] = None,
+        has_grade_tonnage: Optional[bool] = None,
+        dedup_site_ids: Optional[Sequence[InternalID]] = None,
+        bbox: Optional[tuple[float, float, float, float]] = None,
+        within_radius: Optional[tuple[float, float, float]] = None,
+        limit: int = 0,
+        offset: int = 0,
+        return_count: bool = False,
+    ) -> FindDedupMineralSiteResult:
+        """Async version of `find_dedup_mineral_sites`"""
+        query, count_query, inv_filters = self._select_dedup_mineral_site_ids(
+            commodity=commodity,
+            deposit_type=deposit_type,
+            country=country,
+            state_or_province=state_or_province,
+            has_grade_tonnage=has_grade_tonnage,
+            dedup_site_ids=dedup_site_ids,
+            bbox=bbox,
+            within_radius=within_radius,
+            limit=limit,
+            offset=offset,
+            return_count=return_count,
+        )
+        async with self.aread_session() as session:
+            ids = list((await session.execute(query)).scalars())
+            lst_dms = (
+                await session.execute(
+                    select(DedupMineralSite).where(DedupMineralSite.id.in_(ids))
+                )
+            ).scalars()
+            invs = (
+                await session.execute(
+                    select(DedupMineralInventoryView).where(
+                        DedupMineralInventoryView.dedup_site_id.in_(ids), *inv_filters
+                    )
+                )
+            ).scalars()
+            total = (
+                (await session.execute(count_query)).scalar_one()
+                if count_query is not None
+                else 0
             )
+            return self._norm_find_dedup_mineral_sites(ids, lst_dms, invs, total)
 
+    def _select_dedup_mineral_site_ids(
+        self,
+        *,
+        commodity: Optional[InternalID],
+        deposit_type: Optional[InternalID] = None,
+        country: Optional[InternalID] = None,
+        state_or_province: Optional[InternalID] = None,
+        has_grade_tonnage: Optional[bool] = None,
+        dedup_site_ids: Optional[Sequence[InternalID]] = None,
+        bbox: Optional[tuple[float, float, float, float]] = None,
+        within_radius: Optional[tuple[float, float, float]] = None,
+        limit: int = 0,
+        offset: int = 0,
+        return_count: bool = False,
+    ) -> tuple[Select[tuple[InternalID]], Optional[Select[tuple[int]]], list]:
+        """Get the query of the ids of the matched dedup sites, the query counting them, and
+        the filters of their inventories."""
+        # **ALGO**
+        # find the matched dedup sites from the flat search table, then fetch the dedup sites
+        # and their inventories by primary/foreign keys -- no join or aggregation is needed.
+        # each row of the search table is a (dedup site, commodity) pair, so we only need to
+        # deduplicate the ids when we do not filter by commodity.
+        search_filters = []
+        inv_filters = []
         if commodity is not None:
-            query = query.where(DedupMineralInventoryView.commodity == commodity)
-            if count_query is not None:
-                count_query = count_query.join(
-                    DedupMineralInventoryView,
-                    DedupMineralInventoryView.dedup_site_id == DedupMineralSite.id,
-                    isouter=True,
-                ).where(DedupMineralInventoryView.commodity == commodity)
-
+            search_filters.append(DedupMineralSiteSearch.commodity == commodity)
+            inv_filters.append(DedupMineralInventoryView.commodity == commodity)
         if deposit_type is not None:
-            query = query.where(DedupMineralSite.top1_deposit_type == deposit_type)
-            if count_query is not None:
-                count_query = count_query.where(
-                    DedupMineralSite.top1_deposit_type == deposit_type
-                )
-
-        if country is not None:
-            # TODO: this a temporary solution to retrieve the inner element of the composite property
-            # it seems that the good way is to redefine the Comparator
-            query = query.where(
-                DedupMineralSite.country._comparable_elements[0].any(country)
+            search_filters.append(
+                DedupMineralSiteSearch.top1_deposit_type == deposit_type
             )
-            if count_query is not None:
-                count_query = count_query.where(
-                    DedupMineralSite.country._comparable_elements[0].any(country)
-                )
-
+        if country is not None:
+            search_filters.append(DedupMineralSiteSearch.country.contains([country]))
         if state_or_province is not None:
-            query = query.where(
-                DedupMineralSite.state_or_province._comparable_elements[0].any(
-                    state_or_province
-                )
+            search_filters.append(
+                DedupMineralSiteSearch.state_or_province.contains([state_or_province])
             )
-            if count_query is not None:
-                count_query = count_query.where(
-                    DedupMineralSite.state_or_province._comparable_elements[0].any(
-                        state_or_province
-                    )
-                )
-
         if has_grade_tonnage is not None:
             if has_grade_tonnage:
-                query = query.where(
+                search_filters.append(
+                    DedupMineralSiteSearch.contained_metal.isnot(None)
+                )
+                inv_filters.append(
                     DedupMineralInventoryView.contained_metal.isnot(None)
                 )
-                if count_query is not None:
-                    count_query = count_query.where(
-                        DedupMineralInventoryView.contained_metal.isnot(None)
-                    )
             else:
-                query = query.where(DedupMineralInventoryView.contained_metal.is_(None))
-                if count_query is not None:
-                    count_query = count_query.where(
-                        DedupMineralInventoryView.contained_metal.is_(None)
-                    )
-
+                search_filters.append(DedupMineralSiteSearch.contained_metal.is_(None))
+                inv_filters.append(DedupMineralInventoryView.contained_metal.is_(None))
         if dedup_site_ids is not None:
-            query = query.where(DedupMineralSite.id.in_(dedup_site_ids))
+            search_filters.append(
+                DedupMineralSiteSearch.dedup_site_id.in_(dedup_site_ids)
+            )
+        if bbox is not None:
+            search_filters.append(DedupMineralSiteSearch.within_bbox(*bbox))
+        if within_radius is not None:
+            search_filters.append(DedupMineralSiteSearch.within_radius(*within_radius))
 
+        query = (
+            select(DedupMineralSiteSearch.dedup_site_id)
+            .where(*search_filters)
+            .order_by(DedupMineralSiteSearch.dedup_site_id)
+        )
+        if commodity is None:
+            query = query.distinct()
         if limit > 0:
             query = query.limit(limit)
         if offset > 0:
             query = query.offset(offset)
 
-        with Session(self.engine, expire_on_commit=False) as session:
-            lst_dms_and_invs: list[DedupMineralSiteAndInventory] = [
-                self._norm_dedup_mineral_site(row) for row in session.execute(query)
-            ]
-            total = (
-                session.execute(count_query).scalar_one()
-                if count_query is not None
-                else 0
+        count_query = None
+        if return_count:
+            count_query = select(
+                func.count(DedupMineralSiteSearch.dedup_site_id)
+                if commodity is not None
+                else func.count(distinct(DedupMineralSiteSearch.dedup_site_id))
+            ).where(*search_filters)
+
+        return query, count_query, inv_filters
+
+    def _norm_find_dedup_mineral_sites(
+        self,
+        ids: list[InternalID],
+        lst_dms: Iterable[DedupMineralSite],
+        invs: Iterable[DedupMineralInventoryView],
+        total: int,
+    ) -> FindDedupMineralSiteResult:
+        id2dms: dict[InternalID, DedupMineralSite] = {dms.id: dms for dms in lst_dms}
+        id2invs: dict[InternalID, list[DedupMineralInventoryView]] = defaultdict(list)
+        for inv in invs:
+            id2invs[inv.dedup_site_id].append(inv)
+        return {
+            "items": {
+                id: DedupMineralSiteAndInventory(dms=id2dms[id], invs=id2invs[id])
+                for id in ids
+                if id in id2dms
+            },
+            "total": total,
+        }
+
+    def _select_dedup_mineral_site(
+        self,
+    ) -> Select[Tuple[DedupMineralSite, list[RawDedupMineralInventoryView]]]:
+        return (
+            select(DedupMineralSite, self.dedup_inv_agg)
+            .join(
+                DedupMineralInventoryView,
+                DedupMineralInventoryView.dedup_site_id == DedupMineralSite.id,
+                isouter=True,
             )
-            return {
-                "items": {
-                    dms_and_invs.dms.id: dms_and_invs
-                    for dms_and_invs in lst_dms_and_invs
-                },
-                "total": total,
-            }
+            .group_by(DedupMineralSite.id)
+        )
 
     def _select_mineral_site(
         self,
@@ -583,9 +873,14 @@ class MineralSiteService:
         self,
         session: Session,
         query: Select[Tuple[MineralSite, list[RawMineralInventoryView]]],
+    ) -> list[MineralSiteAndInventory]:
+        return self._norm_mineral_sites(session.execute(query).all())
+
+    def _norm_mineral_sites(
+        self, rows: Sequence[Row[tuple[MineralSite, list[RawMineralInventoryView]]]]
     ) -> list[MineralSiteAndInventory]:
         out = []
-        for row in session.execute(query).all():
+        for row in rows:
             msi = MineralSiteAndInventory(
                 ms=row[0],
                 invs=[
@@ -655,6 +950,22 @@ class MineralSiteService:
             ),
         )
 
+    def fn__refresh_dedup_search(
+        self, session: Session, dedup_site_ids: Sequence[InternalID]
+    ):
+        """Recompute the search rows of the given dedup sites from the dedup sites and their
+        inventories in the current transaction. Must be called after the dedup sites are written.
+        """
+        if len(dedup_site_ids) == 0:
+            return
+        session.flush()
+        session.execute(
+            delete(DedupMineralSiteSearch).where(
+                DedupMineralSiteSearch.dedup_site_id.in_(dedup_site_ids)
+            )
+        )
+        session.execute(DedupMineralSiteSearch.insert_from_dedup_sites(dedup_site_ids))
+
     def fn__update_dedup_mineral_sites_info(
         self, session: Session, lst_msi: list[MineralSiteAndInventory]
     ):
@@ -842,43 +1153,42 @@ class MineralSiteService:
 
         return created_msis, updated_msis
 
-    def fn__save_add_events(
-        self,
-        session: Session,
-        lst_msi: list[MineralSiteAndInventory],
-        dedup_sites: dict[str, DedupMineralSite],
-    ):
-        """Log events for adding mineral sites from the database."""
-        session.execute(
-            insert(EventLog),
-            [
-                EventLog.from_site_add(
-                    msi,
-                    [
-                        rms_score.site_id
-                        for rms_score in dedup_sites[msi.ms.dedup_site_id].ranked_sites
-                        if rms_score.site_id != msi.ms.site_id
-                    ],
-                ).get_update_args()
-                for msi in lst_msi
-            ],
-        )
+    def fn__commit_events(self, session: Session, events: list[EventLog]):
+        """Log the events and commit the transaction, then increase the data version.
 
-    def fn__save_update_events(
+        The events are inserted last, under the lock of the event ids (`EventLog.lock_ids`),
+        so the listeners never skip an event that is committed late. The other changes are
+        flushed before taking the lock so that it is only held while committing. The version
+        is bumped in its own READ COMMITTED transaction: in a REPEATABLE READ transaction, the
+        bump fails with a serialization error whenever another write bumps it first.
+        """
+        session.flush()
+        EventLog.lock_ids(session)
+        session.add_all(events)
+        session.commit()
+        with Session(read_committed(self.engine)) as version_session:
+            created_at, version = DataVersion.bump(version_session)
+            version_session.commit()
+        if self.data_version is not None:
+            self.data_version.observe(created_at, version)
+
+    def fn__get_add_events(
         self,
-        session: Session,
         lst_msi: list[MineralSiteAndInventory],
-    ):
-        """Log events for updating mineral sites in the database."""
-        session.execute(
-            insert(EventLog),
-            [
-                EventLog.from_site_update(
-                    msi,
-                ).get_update_args()
-                for msi in lst_msi
-            ],
-        )
+        dedup_sites: dict[str, DedupMineralSite],
+    ) -> list[EventLog]:
+        """Create the events for adding mineral sites to the database."""
+        return [
+            EventLog.from_site_add(
+                msi,
+                [
+                    rms_score.site_id
+                    for rms_score in dedup_sites[msi.ms.dedup_site_id].ranked_sites
+                    if rms_score.site_id != msi.ms.site_id
+                ],
+            )
+            for msi in lst_msi
+        ]
 
 
 def remove_key(d: dict, remove_key: str):
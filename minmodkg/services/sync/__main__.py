@@ -2,13 +2,15 @@ from __future__ import annotations
 
 import time
 from pathlib import Path
-from typing import Annotated, Optional
+from typing import Annotated
 
 import typer
 from loguru import logger
+from minmodkg.misc.metrics import REGISTRY, collect_db_pools, start_metrics_server
 from minmodkg.services.sync.backup_listener import BackupListener
 from minmodkg.services.sync.kgsync_listener import KGSyncListener
-from minmodkg.services.sync.sync import process_pending_events
+from minmodkg.services.sync.sync import init_checkpoints
+from minmodkg.services.sync.worker import ListenerWorker
 
 app = typer.Typer(pretty_exceptions_short=True, pretty_exceptions_enable=False)
 
@@ -16,45 +18,55 @@ app = typer.Typer(pretty_exceptions_short=True, pretty_exceptions_enable=False)
 @app.command()
 def main(
     repo_dir: Path,
+    kgsync_interval: float = 1,
     backup_interval: int = 3600,
     batch_size: int = 500,
+    lag_report_interval: int = 60,
+    metrics_port: int = 0,
     verbose: Annotated[bool, typer.Option("--verbose")] = False,
 ):
-    """Synchronize data from the KGRel to KG and CDR."""
+    """Synchronize data from the KGRel to KG and CDR.
+
+    Each listener runs in its own worker: we want kg sync to be near real-time, while the
+    backup is done every `backup_interval` seconds (disabled if it is not positive).
+    The metrics are served at http://localhost:<metrics_port>/metrics (disabled if 0).
+    """
     kgsync_listener = KGSyncListener()
     backup_listener = BackupListener(repo_dir)
+    init_checkpoints([kgsync_listener, backup_listener])
+    if metrics_port > 0:
+        REGISTRY.add_collector(collect_db_pools)
+        start_metrics_server(metrics_port)
+
+    workers = [
+        ListenerWorker(kgsync_listener, kgsync_interval, batch_size, verbose=verbose)
+    ]
+    if backup_interval > 0:
+        workers.append(
+            ListenerWorker(
+                backup_listener, backup_interval, batch_size, verbose=verbose
+            )
+        )
+
+    for worker in workers:
+        worker.start()
 
-    last_backup_synced: Optional[int] = None
-
-    while True:
-        try:
-            # we want kg sync to be near real-time
-            process_pending_events(kgsync_listener, batch_size, verbose=verbose)
-        except Exception as e:
-            # exception occurred, we will wait for X second before trying again
-            logger.exception(e)
-            logger.info("Wait for 10 seconds before trying again")
-            time.sleep(10)
-
-        try:
-            if backup_interval > 0:
-                # only run the backup sync if the interval is greater than 0
-                # record the current hour
-                current_hour = int(time.time() / backup_interval)
-                if last_backup_synced is None or current_hour > last_backup_synced:
-                    process_pending_events(backup_listener, batch_size, verbose=verbose)
-                    last_backup_synced = current_hour
-        except Exception as e:
-            # exception occurred, we will wait for X second before trying again
-            logger.exception(e)
-            logger.info("Wait for 10 seconds before trying again")
-            time.sleep(10)
-
-        # wait for a second before checking again
-        time.sleep(1)
-
-        if verbose:
-            print(".", end="", flush=True)
+    try:
+        while all(worker.is_alive() for worker in workers):
+            time.sleep(lag_report_interval)
+            for worker in workers:
+                if worker.lag is not None:
+                    logger.info(
+                        "[{}] lag: {} events, {:.1f} seconds",
+                        worker.listener.name,
+                        worker.lag.n_events,
+                        worker.lag.seconds,
+                    )
+    finally:
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.join()
 
 
 if __name__ == "__main__":
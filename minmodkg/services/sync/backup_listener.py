@@ -21,6 +21,8 @@ from statickg.models.repository import GitRepository
 
 
 class BackupListener(Listener):
+    name = "backup"
+
     def __init__(self, data_repo_dir: Path):
         super().__init__()
         self.data_repo_dir = data_repo_dir
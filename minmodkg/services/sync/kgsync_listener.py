@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-from typing import Iterable
-
 from minmodkg.misc.utils import norm_literal
 from minmodkg.models.kg.base import MINMOD_KG, MINMOD_NS
 from minmodkg.models.kg.mineral_site import MineralSite
@@ -13,6 +11,8 @@ from rdflib import Graph, URIRef
 
 
 class KGSyncListener(Listener):
+    name = "kg"
+
     owl_same_as = MINMOD_NS.owl.sameAs
     rdf_type = MINMOD_NS.rdf.type
     mo_normalized_uri = MINMOD_NS.mo.normalized_uri
@@ -60,9 +60,6 @@ class KGSyncListener(Listener):
         diff_groups: dict[InternalID, list[InternalID]],
     ):
         key_ns = MineralSite.__subj__.key_ns
-        # potential_existing_links = self._get_all_same_as_links(
-        #     {id for group in groups for id in group}
-        # )
         # delete same as link to/from other sites, and then insert the new same as links
         delete_links = []
         for site, diff_sites in diff_groups.items():
@@ -81,25 +78,6 @@ class KGSyncListener(Listener):
             ],
         )
 
-    def _get_all_same_as_links(
-        self, ids: Iterable[InternalID]
-    ) -> list[tuple[InternalID, InternalID]]:
-        key_ns = MineralSite.__subj__.key_ns
-
-        # retrieve all the sameAs relations for the affected entities
-        lst = MINMOD_KG.query(
-            """
-SELECT ?s ?o
-WHERE {
-    ?s (%s|^%s) ?o .
-    VALUES ?s { %s }
-}
-"""
-            % (self.owl_same_as, self.owl_same_as, " ".join(key_ns[id] for id in ids)),
-            keys=["s", "o"],
-        )
-        return [(key_ns.abs2rel(so["s"]), key_ns.abs2rel(so["o"])) for so in lst]
-
     def _get_mineral_site_graph_by_uri(self, uri: IRI | URIRef) -> Graph:
         # Fuseki can optimize this case, but I don't know why sometimes it cannot
         return MINMOD_KG.construct(
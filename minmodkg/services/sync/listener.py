@@ -5,14 +5,29 @@ from typing import Sequence
 import typer
 from minmodkg.models.kgrel.event import EventLog
 from minmodkg.models.kgrel.mineral_site import MineralSiteAndInventory
+from minmodkg.services.mineral_site import MineralSiteService
 from minmodkg.typing import InternalID
 
 
 class Listener:
+    # unique name of the listener, used to track its progress
+    name: str
 
     def handle(self, events: Sequence[EventLog]):
         self.handle_begin(events)
 
+        # compact update events only store the site id, so we read the latest version
+        # of the updated sites from the database in one query
+        latest_sites = self.get_sites(
+            list(
+                {
+                    event.data["site_id"]
+                    for event in events
+                    if event.type == "site:update" and event.is_compact()
+                }
+            )
+        )
+
         for event in events:
             if event.type == "site:add":
                 self.handle_site_add(
@@ -22,7 +37,12 @@ class Listener:
                 )
             elif event.type == "site:update":
                 self.handle_site_update(
-                    event, MineralSiteAndInventory.from_dict(event.data["site"])
+                    event,
+                    (
+                        latest_sites[event.data["site_id"]]
+                        if event.is_compact()
+                        else MineralSiteAndInventory.from_dict(event.data["site"])
+                    ),
                 )
             elif event.type == "same-as:update":
                 self.handle_same_as_update(
@@ -39,6 +59,15 @@ class Listener:
     def handle_begin(self, events: Sequence[EventLog]):
         pass
 
+    def get_sites(
+        self, site_ids: list[InternalID]
+    ) -> dict[InternalID, MineralSiteAndInventory]:
+        """Get the latest version of the sites"""
+        if len(site_ids) == 0:
+            return {}
+        # read from the primary as the replica may not have the latest version yet
+        return MineralSiteService(read_from_replica=False).find_by_ids(site_ids)
+
     def handle_end(self, events: Sequence[EventLog]):
         pass
 
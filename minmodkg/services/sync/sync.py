@@ -1,64 +1,169 @@
 from __future__ import annotations
 
-from typing import Literal
+import time
+from dataclasses import dataclass
+from typing import Optional, Sequence
 
+from loguru import logger
 from minmodkg.models.kgrel.base import get_rel_session
-from minmodkg.models.kgrel.event import EventLog
-from minmodkg.services.sync.backup_listener import BackupListener
-from minmodkg.services.sync.kgsync_listener import KGSyncListener
+from minmodkg.models.kgrel.event import EventCheckpoint, EventLog
 from minmodkg.services.sync.listener import Listener
-from sqlalchemy import delete, select, update
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+
+@dataclass
+class ListenerLag:
+    listener: str
+    # number of events that the listener has not handled
+    n_events: int
+    # age (in seconds) of the oldest event that the listener has not handled
+    seconds: float
+
+
+# the legacy flags used to track the progress of the listeners before the checkpoints
+LEGACY_SYNCED_FLAGS = {"kg": EventLog.kg_synced, "backup": EventLog.backup_synced}
 
 
 def process_pending_events(
     listener: Listener,
     max_no_events: int = 500,
     verbose: bool = False,
-):
-    if isinstance(listener, KGSyncListener):
-        listener_field = "kg_synced"
-    else:
-        assert isinstance(listener, BackupListener)
-        listener_field = "backup_synced"
+) -> int:
+    """Handle the next events of a listener. Returns the number of handled events.
 
-    with get_rel_session() as session:
-        events = (
-            session.execute(
-                select(EventLog)
-                .where(getattr(EventLog, listener_field) == False)
-                .order_by(EventLog.id)
-                .limit(max_no_events)
-            )
-            .scalars()
-            .all()
-        )
+    Args:
+        listener: the listener
+        max_no_events: maximum number of events to handle
+        verbose: whether to print the progress
+    """
+    # **ALGO**
+    # 1. claim: in a short read-only transaction, read the checkpoint of the listener and
+    #    the events after it.
+    # 2. handle the events outside of any transaction as it involves slow I/O (SPARQL
+    #    updates, writing files, git, etc.)
+    # 3. ack: in a short transaction, advance the checkpoint (compare-and-set) and delete
+    #    the events that have been handled by all listeners.
+    last_event_id, events = claim_events(listener, max_no_events)
+    if len(events) == 0:
+        return 0
 
-        # make sure that these events are contiguously
-        assert all(events[i - 1].id == events[i].id - 1 for i in range(1, len(events)))
+    listener.handle(events)
 
-        # handle the events
-        listener.handle(events)
+    ack_events(listener, last_event_id, events[-1].id)
+    if verbose:
+        print(f"[{listener.name}] processed events: {len(events)}")
+    return len(events)
 
-        # then we are going to mark the events as synced
-        session.execute(
-            update(EventLog)
-            .where(EventLog.id.in_([e.id for e in events]))
-            .values(**{listener_field: True})
+
+def claim_events(
+    listener: Listener, max_no_events: int
+) -> tuple[Optional[int], Sequence[EventLog]]:
+    """Get the checkpoint of the listener and the events after it.
+
+    The writers allocate the event ids under a lock that is released when they commit
+    (`EventLog.lock_ids`), so the events become visible in the order of their ids. A gap
+    before a visible event is a rolled back transaction, not one that may still commit, so
+    the checkpoint can safely move past it.
+    """
+    with get_rel_session() as session:
+        last_event_id = get_checkpoint(session, listener)
+        query = select(EventLog).order_by(EventLog.id).limit(max_no_events)
+        if last_event_id is not None:
+            query = query.where(EventLog.id > last_event_id)
+        events = session.execute(query).scalars().all()
+    return last_event_id, events
+
+
+def ack_events(listener: Listener, last_event_id: Optional[int], new_event_id: int):
+    """Advance the checkpoint of the listener to `new_event_id` and delete the events that
+    have been handled by all listeners."""
+    with get_rel_session() as session:
+        res = session.execute(
+            update(EventCheckpoint)
+            .where(
+                EventCheckpoint.listener == listener.name,
+                (
+                    EventCheckpoint.last_event_id.is_(None)
+                    if last_event_id is None
+                    else EventCheckpoint.last_event_id == last_event_id
+                ),
+            )
+            .values(last_event_id=new_event_id, modified_at=time.time_ns())
         )
+        if res.rowcount != 1:  # type: ignore
+            logger.warning(
+                "[{}] checkpoint has been moved by another worker, events {}-{} may have been handled twice",
+                listener.name,
+                last_event_id,
+                new_event_id,
+            )
+            return
 
-        # then, we are going to delete the events that have been synced
+        # a listener without checkpoint (None) has not handled any event
         session.execute(
             delete(EventLog).where(
-                EventLog.id.in_([e.id for e in events]),
-                EventLog.kg_synced == True,
-                EventLog.backup_synced == True,
+                EventLog.id
+                <= select(
+                    func.min(func.coalesce(EventCheckpoint.last_event_id, -1))
+                ).scalar_subquery()
             )
         )
+        session.commit()
 
-        if verbose and len(events) > 0:
-            print(f"[{listener.__class__.__name__}] processed events: {len(events)}")
 
-        # commit the transaction
-        session.commit()
+def init_checkpoints(listeners: Sequence[Listener]):
+    """Create the checkpoints of the listeners if they do not exist. It must be called before
+    running the listeners, so that events are not deleted before all listeners handle them.
+    """
+    with get_rel_session() as session:
+        for listener in listeners:
+            get_checkpoint(session, listener)
+
+
+def get_checkpoint(session: Session, listener: Listener) -> Optional[int]:
+    """Get the checkpoint of the listener, creating it if it does not exist."""
+    checkpoint = session.get(EventCheckpoint, listener.name)
+    if checkpoint is not None:
+        return checkpoint.last_event_id
+
+    # resume from the legacy synced flag
+    last_event_id = None
+    if listener.name in LEGACY_SYNCED_FLAGS:
+        first_pending_id = session.execute(
+            select(func.min(EventLog.id)).where(
+                LEGACY_SYNCED_FLAGS[listener.name] == False
+            )
+        ).scalar_one()
+        if first_pending_id is not None:
+            last_event_id = first_pending_id - 1
+        else:
+            last_event_id = session.execute(select(func.max(EventLog.id))).scalar_one()
+
+    session.add(EventCheckpoint(listener=listener.name, last_event_id=last_event_id))
+    session.commit()
+    return last_event_id
+
+
+def get_listener_lag(listener: Listener) -> ListenerLag:
+    """Get how far the listener is behind the event log"""
+    with get_rel_session() as session:
+        last_event_id = session.execute(
+            select(EventCheckpoint.last_event_id).where(
+                EventCheckpoint.listener == listener.name
+            )
+        ).scalar_one_or_none()
+        query = select(func.count(EventLog.id), func.min(EventLog.timestamp))
+        if last_event_id is not None:
+            query = query.where(EventLog.id > last_event_id)
+        n_events, oldest_timestamp = session.execute(query).one()
 
-        return len(events)
+    return ListenerLag(
+        listener=listener.name,
+        n_events=n_events,
+        seconds=(
+            (time.time_ns() - oldest_timestamp) / 1e9
+            if oldest_timestamp is not None
+            else 0.0
+        ),
+    )
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+from loguru import logger
+from minmodkg.misc.metrics import Counter, Gauge, Histogram
+from minmodkg.services.sync.listener import Listener
+from minmodkg.services.sync.sync import (
+    ListenerLag,
+    get_listener_lag,
+    process_pending_events,
+)
+
+SYNC_EVENTS = Counter(
+    "minmod_sync_events_total",
+    "Number of events handled by each listener",
+    ["listener"],
+)
+SYNC_BATCH_DURATION = Histogram(
+    "minmod_sync_batch_duration_seconds",
+    "Duration of handling a (non-empty) batch of events by each listener",
+    ["listener"],
+)
+SYNC_ERRORS = Counter(
+    "minmod_sync_errors_total", "Number of failed runs of each listener", ["listener"]
+)
+SYNC_LAG_EVENTS = Gauge(
+    "minmod_sync_lag_events",
+    "Number of events in the event log that each listener has not handled",
+    ["listener"],
+)
+SYNC_LAG_SECONDS = Gauge(
+    "minmod_sync_lag_seconds",
+    "Age of the oldest event that each listener has not handled",
+    ["listener"],
+)
+
+
+class ListenerWorker(threading.Thread):
+    """Run a listener in its own thread so that a slow listener does not delay the others.
+    The listeners only share the event log, each of them tracks its own progress.
+
+    Every `interval` seconds, the worker drains the pending events in batches. When a batch
+    is full (the listener is behind), the size of the next batch is doubled up to
+    `max_batch_size` to catch up faster, and it is reset once the listener catches up. When
+    an error occurs, the worker backs off exponentially up to `max_error_backoff` seconds.
+    """
+
+    def __init__(
+        self,
+        listener: Listener,
+        interval: float,
+        batch_size: int = 500,
+        max_batch_size: Optional[int] = None,
+        error_backoff: float = 10,
+        max_error_backoff: float = 600,
+        verbose: bool = False,
+    ):
+        super().__init__(name=f"listener-{listener.name}", daemon=True)
+        self.listener = listener
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_batch_size = max_batch_size or batch_size * 8
+        self.error_backoff = error_backoff
+        self.max_error_backoff = max_error_backoff
+        self.verbose = verbose
+
+        self.lag: Optional[ListenerLag] = None
+        self.n_errors = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+                self.n_errors = 0
+                wait_time = self.interval
+            except Exception as e:
+                logger.exception(e)
+                SYNC_ERRORS.labels(self.listener.name).inc()
+                self.n_errors += 1
+                wait_time = min(
+                    self.error_backoff * 2 ** (self.n_errors - 1),
+                    self.max_error_backoff,
+                )
+                logger.info(
+                    "[{}] wait for {} seconds before trying again",
+                    self.listener.name,
+                    wait_time,
+                )
+            self.stop_event.wait(wait_time)
+
+    def run_once(self) -> int:
+        """Handle all pending events. Returns the number of handled events."""
+        total = 0
+        batch_size = self.batch_size
+        name = self.listener.name
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            n_events = process_pending_events(
+                self.listener, batch_size, verbose=self.verbose
+            )
+            if n_events > 0:
+                SYNC_BATCH_DURATION.labels(name).observe(time.perf_counter() - start)
+                SYNC_EVENTS.labels(name).inc(n_events)
+            total += n_events
+            if n_events < batch_size:
+                break
+            batch_size = min(batch_size * 2, self.max_batch_size)
+        self.lag = get_listener_lag(self.listener)
+        SYNC_LAG_EVENTS.labels(name).set(self.lag.n_events)
+        SYNC_LAG_SECONDS.labels(name).set(self.lag.seconds)
+        return total
+
+    def stop(self):
+        self.stop_event.set()
@@ -1,15 +1,23 @@
 from __future__ import annotations
 
 import hashlib
+import re
+from functools import lru_cache
 from uuid import uuid4
 
-from minmodkg.models.kg.base import MINMOD_KG
+from minmodkg.models.kg.base import MINMOD_NS
 from minmodkg.models.kg.reference import PageInfo
 from minmodkg.models.kgrel.user import get_username, is_valid_user_uri
 from slugify import slugify
 
-MR_NS = MINMOD_KG.ns.mr.namespace
-MO_NS = MINMOD_KG.ns.mo.namespace
+MR_NS = MINMOD_NS.mr.namespace
+MO_NS = MINMOD_NS.mo.namespace
+
+# the sources, users, and documents are shared by many sites, so their slugs are memoized;
+# the caches are bounded as the document titles are (almost) unique in a large dataset
+SLUG_CACHE_SIZE = 65536
+# text that slugify returns as it is
+SLUG_REGEX = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
 
 
 def make_site_ids(value: dict, namespace: str = MR_NS):
@@ -19,7 +27,7 @@ def make_site_ids(value: dict, namespace: str = MR_NS):
     site_uri = namespace + make_site_id(
         username, value["source_id"], value["record_id"]
     )
-    site_id = site_uri[len(namespace) :] + "__user_" + slugify(username) + "__"
+    site_id = site_uri[len(namespace) :] + "__user_" + norm_slug(username) + "__"
 
     # we create id for each reference as it is likely to be the same or re-ordered
     value["id"] = site_uri
@@ -52,6 +60,7 @@ def make_site_ids(value: dict, namespace: str = MR_NS):
             ] = f"{namespace}{site_id}__geology__associated_rock"
 
 
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
 def get_source_uri(source_id: str):
     return "https://minmod.isi.edu/resource/source__" + slugify(source_id)
 
@@ -84,40 +93,60 @@ def make_inventory_ids(inv: dict, inv_index: int, site_id: str, namespace: str =
 
 def make_reference_ids(ref: dict, site_id: str, namespace: str = MR_NS):
     ref["document"]["id"] = make_document_uri(ref["document"], site_id, namespace)
+    ref["id"] = make_reference_uri(
+        ref, get_document_slug(ref["document"]["id"], namespace), namespace
+    )
+    for i, pageinfo in enumerate(ref.get("page_info", [])):
+        pageinfo["id"] = f"{ref['id']}__pageinfo__{i}"
 
-    docid = ref["document"]["id"]
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def get_document_slug(docid: str, namespace: str = MR_NS) -> str:
     if docid.startswith(namespace):
         docid = docid[len(namespace) :]
     elif docid.startswith("https://"):
         docid = docid[8:]
     elif docid.startswith("http://"):
         docid = docid[7:]
-    docid = slugify(docid)
-
-    ref["id"] = make_reference_uri(ref, slugify(docid), namespace)
-    for i, pageinfo in enumerate(ref.get("page_info", [])):
-        pageinfo["id"] = f"{ref['id']}__pageinfo__{i}"
+    return slugify(docid)
 
 
 def make_site_id(username: str, source_id: str, record_id: str) -> str:
-    assert source_id.find("::") == -1, source_id
     assert isinstance(record_id, str) and record_id == record_id.strip(), record_id
+    # record ids are unique so they are not memoized
+    path = (
+        shorten_id(f"{get_source_slug(source_id)}__{norm_slug(record_id, False)}", 120)
+        + f"__{username}"
+    )
+    return f"site__{path}"
 
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def get_source_slug(source_id: str) -> str:
+    assert source_id.find("::") == -1, source_id
     if source_id.startswith("http://"):
-        if source_id.startswith("http://"):
-            source_id = source_id[7:]
-            if source_id.endswith("/"):
-                source_id = source_id[:-1]
+        source_id = source_id[7:]
+        if source_id.endswith("/"):
+            source_id = source_id[:-1]
     elif source_id.startswith("https://"):
         source_id = source_id[8:]
         if source_id.endswith("/"):
             source_id = source_id[:-1]
+    return slugify(source_id)
 
-    source_id = slugify(source_id)
-    record_id = slugify(record_id)
 
-    path = shorten_id(f"{source_id}__{record_id}", 120) + f"__{username}"
-    return f"site__{path}"
+def norm_slug(text: str, memoize: bool = True) -> str:
+    """Slugify a text, the text that is already a slug is returned as it is"""
+    if SLUG_REGEX.fullmatch(text) is not None:
+        return text
+    if memoize:
+        return _memoized_slugify(text)
+    return slugify(text)
+
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def _memoized_slugify(text: str) -> str:
+    return slugify(text)
 
 
 def make_site_uri_deprecated(
@@ -166,21 +195,24 @@ def make_document_uri(doc: dict, site_id: str, namespace: str = MR_NS):
     if "title" not in doc:
         raise ValueError("Document must have a URI, DOI, or at least a title")
 
-    path = site_id + "__doc__" + shorten_id(slugify(doc["title"]), 120)
+    path = site_id + "__doc__" + shorten_id(norm_slug(doc["title"]), 120)
     return f"{namespace}{path}"
 
 
 def make_reference_uri(ref: dict, doc_id: str, namespace: str = MR_NS):
     # gen pageinfo id
     if len(ref.get("page_info", [])) > 0:
-        pageinfo_id = hashlib.sha256(
-            b"|".join(
+        pageinfo_id = get_pageinfo_id(
+            "|".join(
                 (
-                    PageInfo.from_dict(page_info).to_enc_str().encode()
-                    for page_info in ref["page_info"]
+                    # same as PageInfo.to_enc_str() without creating the page info
+                    str(page_info["page"])
+                    if not page_info.get("bounding_box")
+                    else PageInfo.from_dict(page_info).to_enc_str()
                 )
+                for page_info in ref["page_info"]
             )
-        ).hexdigest()[:16]
+        )
     else:
         pageinfo_id = ""
 
@@ -199,7 +231,15 @@ def make_reference_uri(ref: dict, doc_id: str, namespace: str = MR_NS):
     if len(constraintinfo) == 1:
         return namespace + doc_id + "__ref"
     else:
-        return namespace + doc_id + "__ref__" + shorten_id(slugify(constraintinfo), 120)
+        return (
+            namespace + doc_id + "__ref__" + shorten_id(norm_slug(constraintinfo), 120)
+        )
+
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def get_pageinfo_id(enc_pageinfo: str) -> str:
+    # most references only point to a few pages, so their ids are shared
+    return hashlib.sha256(enc_pageinfo.encode()).hexdigest()[:16]
 
 
 def get_uuid4(prefix: str = "B", namespace: str = MR_NS):
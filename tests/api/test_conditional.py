@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from minmodkg.api.conditional import Validators, is_conditional
+
+
+def test_conditional_request():
+    validators = Validators.create(1_700_000_000_500_000_000, "dedup_site1")
+    app = FastAPI()
+
+    @app.get("/item")
+    def get_item(request: Request, response: Response):
+        if is_conditional(request) and validators.is_not_modified(request):
+            return validators.not_modified()
+        response.headers.update(validators.headers())
+        return {"id": "site1"}
+
+    client = TestClient(app)
+    resp = client.get("/item")
+    assert resp.status_code == 200
+    assert resp.headers["etag"] == validators.etag
+    # linking sites does not bump modified_at, so it cannot be used as a validator
+    assert "last-modified" not in resp.headers
+
+    # the version of the resource is part of the ETag
+    assert Validators.create(1_700_000_000_500_000_000, "dedup_site2") != validators
+
+    for headers, status_code in [
+        ({"If-None-Match": validators.etag}, 304),
+        ({"If-None-Match": validators.etag[2:]}, 304),
+        ({"If-None-Match": f'"other", {validators.etag}'}, 304),
+        ({"If-None-Match": "*"}, 304),
+        ({"If-None-Match": '"other"'}, 200),
+        ({"If-Modified-Since": "Tue, 14 Nov 2023 22:13:20 GMT"}, 200),
+    ]:
+        resp = client.get("/item", headers=headers)
+        assert resp.status_code == status_code, headers
+        if status_code == 304:
+            assert resp.content == b""
+            assert resp.headers["etag"] == validators.etag
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+HEAVY_MODULES = [
+    "pandas",
+    "shapely",
+    "pyproj",
+    "statickg",
+    "joblib",
+    "minmodkg.validators",
+]
+# seconds to import the app: it takes about 1.3s, importing the heavy libraries adds 1.7s
+IMPORT_TIME_BUDGET = 2.5
+CFG_FILE = Path(__file__).parent.parent / "resources" / "config.yml"
+
+
+def run_python(code: str) -> str:
+    env = dict(os.environ)
+    env.setdefault("CFG_FILE", str(CFG_FILE))
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        cwd=Path(__file__).parent.parent.parent,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.strip()
+
+
+def test_import_api_is_lazy():
+    # importing the app must not pull in the heavy libraries or connect to the triple store
+    output = run_python(
+        "import sys; import minmodkg.api.main; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    assert output == ""
+
+
+def test_import_api_time():
+    # take the best of a few runs so that a busy machine does not fail the test
+    import_time = min(
+        float(
+            run_python(
+                "import time; start = time.perf_counter(); import minmodkg.api.main; "
+                "print(time.perf_counter() - start)"
+            )
+        )
+        for _ in range(3)
+    )
+    assert (
+        import_time < IMPORT_TIME_BUDGET
+    ), f"Importing the API took {import_time:.2f}s (budget: {IMPORT_TIME_BUDGET}s)"
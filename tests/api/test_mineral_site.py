@@ -175,6 +175,33 @@ class TestMineralSite(TestMineralSiteData):
         assert resp.json() == {"detail": "The site already exists."}
         assert resp.status_code == 409
 
+    def test_conditional_get(self, auth_client, kg: TripleStore):
+        for url, params in [
+            (f"/api/v1/mineral-sites/{self.site1_id}", {}),
+            (
+                f"/api/v1/dedup-mineral-sites/{self.site1_dedup_id}",
+                {"commodity": self.site1_commodity},
+            ),
+        ]:
+            resp = check_req(lambda: auth_client.get(url, params=params))
+            etag = resp.headers["etag"]
+            resp = auth_client.get(url, params=params, headers={"If-None-Match": etag})
+            assert resp.status_code == 304
+            assert resp.headers["etag"] == etag
+            assert "last-modified" not in resp.headers
+
+        resp = check_req(
+            lambda: auth_client.post(
+                "/api/v1/mineral-sites/find_by_ids", json={"ids": [self.site1_id]}
+            )
+        )
+        resp = auth_client.post(
+            "/api/v1/mineral-sites/find_by_ids",
+            json={"ids": [self.site1_id]},
+            headers={"If-None-Match": resp.headers["etag"]},
+        )
+        assert resp.status_code == 304
+
     def test_update_site(self, auth_client, kg: TripleStore):
         sleep(1.0)  # to ensure the modified_at is different
         self.site1.name = "Frog Mine"
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import orjson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from minmodkg.api.responses import FastJSONResponse
+
+
+def test_fast_json_response():
+    content = {
+        "site1": {"name": "Eagle Mine", "grade": 1.5, "sites": [{"id": "site1"}]},
+        "site2": {"name": "Frog Mine", "grade": None, "sites": []},
+    }
+    app = FastAPI()
+
+    @app.get("/items", response_class=FastJSONResponse)
+    def get_items():
+        return FastJSONResponse(content, headers={"ETag": '"1"'})
+
+    resp = TestClient(app).get("/items")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.headers["etag"] == '"1"'
+    assert resp.content == orjson.dumps(content)
@@ -25,7 +25,7 @@ from minmodkg.models.kgrel.user import User
 from minmodkg.services.kgrel_entity import EntityService
 from minmodkg.services.mineral_site import MineralSiteService
 from rdflib import Graph
-from sqlalchemy import Engine
+from sqlalchemy import Engine, create_engine, text
 from sqlalchemy.orm import Session
 from timer import Timer
 
@@ -130,6 +130,26 @@ def kgrel_singleton(resource_dir: Path):
     subprocess.check_output("docker container rm -f test-kgrel", shell=True)
 
 
+@pytest.fixture(scope="session")
+def kgrel_replica(kgrel_singleton: Engine):
+    """A second (empty) database in the same Postgres server, standing in for a read
+    replica -- it is not replicated so tests can tell which database a query reads from.
+    """
+    with kgrel_singleton.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as conn:
+        conn.execute(text("DROP DATABASE IF EXISTS minmod_replica"))
+        conn.execute(text("CREATE DATABASE minmod_replica"))
+
+    replica = create_engine(
+        kgrel_singleton.url.set(database="minmod_replica"),
+        isolation_level="READ COMMITTED",
+    )
+    minmodkg.models.kgrel.base.Base.metadata.create_all(replica)
+    yield replica
+    replica.dispose()
+
+
 @pytest.fixture(scope="class")
 def kg(resource_dir: Path, kg_singleton: TripleStore):
     # insert basic KG info
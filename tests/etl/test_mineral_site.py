@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from copy import deepcopy
+from pathlib import Path
+
+import serde.json
+from minmodkg.etl.changeset import get_changeset_file
+from minmodkg.etl.mineral_site import ExportTTLFn
+from minmodkg.models.kgrel.mineral_site import MineralSiteAndInventory
+from rdflib import Graph
+
+from statickg.models.file_and_path import BaseType, InputFile, RelPath
+
+
+def export_ttl(workdir: Path, raw_sites: list[dict], outfile: Path) -> Graph:
+    lst_msi = MineralSiteAndInventory.from_raw_sites(
+        deepcopy(raw_sites),
+        commodity_form_conversion={},
+        crs_names=defaultdict(lambda: "EPSG:4326"),
+        source_score=defaultdict(lambda: None),
+    )
+    for msi in lst_msi:
+        msi.ms.dedup_site_id = "dedup_" + msi.ms.site_id
+    serde.json.ser(
+        {"MineralSiteAndInventory": [msi.to_dict() for msi in lst_msi]},
+        workdir / "merged.json",
+    )
+    ExportTTLFn(workdir).invoke(
+        InputFile.from_relpath(RelPath(BaseType.DATA_DIR, workdir, "merged.json")),
+        outfile,
+    )
+    g = Graph()
+    g.parse(outfile, format="turtle")
+    return g
+
+
+def test_export_ttl_changeset(resource_dir: Path, tmp_path: Path):
+    raw_sites = []
+    for file in sorted((resource_dir / "kgdata/mineral-sites/json").glob("*.json"))[:3]:
+        raw_sites.extend(serde.json.deser(file))
+
+    outfile = tmp_path / "kg/bucket.ttl"
+    prev_graph = export_ttl(tmp_path, raw_sites, outfile)
+    assert not get_changeset_file(outfile).exists()
+
+    raw_sites[0]["name"] = "Updated Name"
+    graph = export_ttl(tmp_path, raw_sites[:-1], outfile)
+
+    # applying the changeset to the previous export gives the current export
+    changeset = serde.json.deser(get_changeset_file(outfile))
+    prefix_part = outfile.read_text().split("\n\n", 1)[0] + "\n\n"
+    delete, insert = Graph(), Graph()
+    delete.parse(
+        data=prefix_part + "".join(f"{t}. \n" for t in changeset["delete"]),
+        format="turtle",
+    )
+    insert.parse(
+        data=prefix_part + "".join(f"{t}. \n" for t in changeset["insert"]),
+        format="turtle",
+    )
+    assert set((prev_graph - delete) + insert) == set(graph)
+    assert len(changeset["insert"]) < len(graph)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import serde.json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from minmodkg.api.routers import export
+from minmodkg.etl.parquet import PARQUET_DATASETS, export_parquet, get_parquet_file
+from minmodkg.models.kgrel.dedup_mineral_site import DedupMineralSite
+from minmodkg.models.kgrel.mineral_site import MineralSiteAndInventory
+
+
+@pytest.fixture
+def parquet_dir(resource_dir: Path, tmp_path: Path) -> Path:
+    raw_sites = []
+    for file in sorted((resource_dir / "kgdata/mineral-sites/json").glob("*.json"))[:3]:
+        raw_sites.extend(serde.json.deser(file))
+    lst_msi = MineralSiteAndInventory.from_raw_sites(
+        raw_sites,
+        commodity_form_conversion={},
+        crs_names=defaultdict(lambda: "EPSG:4326"),
+        source_score=defaultdict(lambda: None),
+    )
+    for msi in lst_msi:
+        msi.ms.dedup_site_id = "dedup_" + msi.ms.site_id
+    dedup_sites = [
+        DedupMineralSite.from_sites([msi], msi.ms.dedup_site_id) for msi in lst_msi
+    ]
+    export_parquet(tmp_path, dedup_sites, lst_msi)
+    return tmp_path
+
+
+def test_export_parquet(parquet_dir: Path):
+    # partitioned by commodity, sites without inventories are not exported
+    assert {
+        dataset: sorted(file.name for file in (parquet_dir / dataset).iterdir())
+        for dataset in PARQUET_DATASETS
+    } == {
+        dataset: [f"commodity=Q{i}" for i in [537, 538, 578, 579, 618]]
+        for dataset in PARQUET_DATASETS
+    }
+
+    file = get_parquet_file(parquet_dir, "mineral_site", "Q618")
+    table = pq.ParquetFile(file).read()
+    assert table.schema.names == [
+        "site_id",
+        "dedup_site_id",
+        "source_id",
+        "record_id",
+        "name",
+        "type",
+        "rank",
+        "lat",
+        "lon",
+        "country",
+        "state_or_province",
+        "modified_at",
+    ]
+    assert table.schema.field("country").type.value_type == pa.string()
+    assert table.num_rows == 1
+
+    # all partitions of a dataset have the same schema
+    for dataset in PARQUET_DATASETS:
+        schemas = {
+            pq.read_schema(file)
+            for file in (parquet_dir / dataset).glob("*/part-0.parquet")
+        }
+        assert len(schemas) == 1
+
+
+def test_get_parquet_partition(parquet_dir: Path, monkeypatch: pytest.MonkeyPatch):
+    app = FastAPI()
+    app.include_router(export.router)
+    client = TestClient(app)
+
+    # the export is not enabled
+    assert client.get("/export/parquet/mineral_site/Q578").status_code == 404
+
+    monkeypatch.setattr(export, "MINMOD_PARQUET_DIR", str(parquet_dir))
+    assert client.get("/export/parquet/mineral_site/Q5.78").status_code == 400
+    assert client.get("/export/parquet/mineral_site/Q1").status_code == 404
+    assert client.get("/export/parquet/unknown/Q578").status_code == 422
+
+    resp = client.get("/export/parquet/mineral_site/Q578")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/vnd.apache.parquet"
+    assert (
+        resp.content
+        == get_parquet_file(parquet_dir, "mineral_site", "Q578").read_bytes()
+    )
+
+    assert client.get("/export/parquet").json()["dedup_mineral_site"] == [
+        "Q537",
+        "Q538",
+        "Q578",
+        "Q579",
+        "Q618",
+    ]
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from pathlib import Path
+
+import pytest
+import serde.json
+from minmodkg.etl.postgres import PostgresLoaderService
+from minmodkg.models.kgrel.dedup_mineral_site import DedupMineralSite
+from minmodkg.models.kgrel.mineral_site import MineralSiteAndInventory
+from sqlalchemy import Engine, inspect, select
+from sqlalchemy.orm import Session
+
+
+class TestRestore:
+    def test_failed_load_is_cleaned_up(
+        self, resource_dir: Path, tmp_path: Path, kgrel: Engine
+    ):
+        raw_sites = serde.json.deser(
+            next((resource_dir / "kgdata/mineral-sites/json").glob("*.json"))
+        )
+        lst_msi = MineralSiteAndInventory.from_raw_sites(
+            raw_sites,
+            commodity_form_conversion={},
+            crs_names=defaultdict(lambda: "EPSG:4326"),
+            source_score=defaultdict(lambda: None),
+        )
+        loader = PostgresLoaderService(
+            "kgrel", tmp_path, {"dbdir": str(tmp_path / "db"), "partition_size": 1}, {}
+        )
+        tables = {
+            "DedupMineralSite": [
+                DedupMineralSite.from_sites(
+                    [msi], "dedup_" + msi.ms.site_id
+                ).dms.to_dict()
+                for msi in lst_msi
+            ],
+            # the inventories of a site that is not loaded
+            "MineralInventoryView": [{"site": "unknown", "invs": []}],
+        }
+
+        with pytest.raises(KeyError):
+            loader.restore(kgrel, tables)
+
+        # the saved partitions are removed and the indexes are rebuilt, so it can be rerun
+        with Session(kgrel) as session:
+            assert session.execute(select(DedupMineralSite).limit(1)).first() is None
+        index_names = {
+            index["name"]
+            for cls in loader.bulk_tables
+            for index in inspect(kgrel).get_indexes(cls.__table__.name)
+        }
+        assert {index.name for index in loader.get_secondary_indexes()} <= index_names
+
+        del tables["MineralInventoryView"]
+        loader.restore(kgrel, tables)
+        with Session(kgrel) as session:
+            assert len(session.execute(select(DedupMineralSite.id)).all()) == len(
+                lst_msi
+            )
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from minmodkg.libraries.rdf.namespace import Namespace
+
+NS = Namespace(
+    {
+        "mr": "https://minmod.isi.edu/resource/",
+        "mo": "https://minmod.isi.edu/ontology/",
+        "mo-derived": "https://minmod.isi.edu/ontology/derived/",
+    }
+)
+
+
+def test_compact():
+    uris = [
+        "https://minmod.isi.edu/resource/Q578",
+        "https://minmod.isi.edu/ontology/MineralSite",
+        # the longest namespace wins
+        "https://minmod.isi.edu/ontology/derived/dedup_site",
+        "http://www.w3.org/2000/01/rdf-schema#label",
+        "https://example.com/Q578",
+    ]
+    reluris = ["mr:Q578", "mo:MineralSite", "md:dedup_site", "rdfs:label", None]
+    assert [NS.compact(uri) for uri in uris] == reluris
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime
+
+import httpx
+from minmodkg.libraries.rdf.fuseki import FusekiDB
+from minmodkg.libraries.rdf.triple_store import parse_ntriples_line, parse_tsv_term
+from minmodkg.models.kg.base import MINMOD_NS
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+def test_parse_tsv_term():
+    assert parse_tsv_term("") is None
+    assert parse_tsv_term("<https://minmod.isi.edu/resource/Q578>") == (
+        "https://minmod.isi.edu/resource/Q578"
+    )
+    assert parse_tsv_term("_:b0") == "b0"
+    assert parse_tsv_term('"tab\\there \\"quoted\\""') == 'tab\there "quoted"'
+    assert parse_tsv_term('"Nickel"@en') == "Nickel"
+    assert parse_tsv_term(f'"12"^^<{XSD}integer>') == 12
+    assert parse_tsv_term(f'"1.5"^^<{XSD}decimal>') == 1.5
+    assert parse_tsv_term(f'"2020-01"^^<{XSD}date>') == datetime(2020, 1, 1)
+    assert parse_tsv_term("42") == 42
+    assert parse_tsv_term("4.2e1") == 42.0
+    assert parse_tsv_term("true") is True
+
+
+def test_parse_ntriples_line():
+    assert parse_ntriples_line('<http://a> <http://b> "a literal ."@en .') == (
+        "<http://a>",
+        "<http://b>",
+        '"a literal ."@en',
+    )
+    assert parse_ntriples_line("_:b0 <http://b> <http://c> .") == (
+        "_:b0",
+        "<http://b>",
+        "<http://c>",
+    )
+    assert parse_ntriples_line("# comment") is None
+    assert parse_ntriples_line("") is None
+
+
+def test_stream_query():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers["Accept"] == "text/tab-separated-values":
+            return httpx.Response(
+                200,
+                content=f'?s\t?count\n<http://a>\t"3"^^<{XSD}integer>\n<http://b>\t\n',
+            )
+        return httpx.Response(200, content="<http://a> <http://b> <http://c> .\n")
+
+    async def run():
+        kg = FusekiDB(MINMOD_NS, "http://localhost/query", "http://localhost/update")
+        kg._async_client = (
+            asyncio.get_running_loop(),
+            httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        rows = await kg.aquery("SELECT ?s ?count WHERE {}", keys=["s", "count", "o"])
+        triples = [t async for t in kg.aconstruct("CONSTRUCT WHERE { ?s ?p ?o }")]
+        return rows, triples
+
+    rows, triples = asyncio.run(run())
+    assert rows == [
+        {"s": "http://a", "count": 3, "o": None},
+        {"s": "http://b", "count": None, "o": None},
+    ]
+    assert triples == [("<http://a>", "<http://b>", "<http://c>")]
+
+
+def test_async_has_and_construct_graph():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers["Accept"] == "application/sparql-results+json":
+            return httpx.Response(200, json={"head": {}, "boolean": True})
+        return httpx.Response(200, content='<http://a> <http://b> "c" .\n')
+
+    async def run():
+        kg = FusekiDB(MINMOD_NS, "http://localhost/query", "http://localhost/update")
+        kg._async_client = (
+            asyncio.get_running_loop(),
+            httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        return await kg.ahas("http://a"), await kg.aconstruct_graph(
+            "CONSTRUCT WHERE { ?s ?p ?o }"
+        )
+
+    has, g = asyncio.run(run())
+    assert has
+    assert len(g) == 1
+
+
+def test_observers():
+    events = []
+
+    @contextmanager
+    def observer(operation, query):
+        events.append(("start", operation, query))
+        yield
+        events.append(("end", operation, query))
+
+    class TestDB(FusekiDB):
+        def _send_sparql_update(self, query):
+            events.append(("send", "update", query))
+
+    async def run():
+        kg._async_client = (
+            asyncio.get_running_loop(),
+            httpx.AsyncClient(
+                transport=httpx.MockTransport(
+                    lambda request: httpx.Response(200, content="?s\n<http://a>\n")
+                )
+            ),
+        )
+        return await kg.aquery("SELECT ?s WHERE {}", keys=["s"])
+
+    kg = TestDB(MINMOD_NS, "http://localhost/query", "http://localhost/update")
+    kg.add_observer(observer)
+    kg.clear()
+    assert asyncio.run(run()) == [{"s": "http://a"}]
+    assert events == [
+        ("start", "update", "CLEAR DEFAULT"),
+        ("send", "update", "CLEAR DEFAULT"),
+        ("end", "update", "CLEAR DEFAULT"),
+        ("start", "query", "SELECT ?s WHERE {}"),
+        ("end", "query", "SELECT ?s WHERE {}"),
+    ]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+from minmodkg.misc.compression import CompressionMiddleware, select_encoding
+
+ITEMS = [{"id": f"site{i}", "name": "Eagle Mine", "grade": 1.5} for i in range(200)]
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/items")
+    def get_items(n: int = len(ITEMS)):
+        return ITEMS[:n]
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(
+            (f"{item['id']},{item['name']}\n" for item in ITEMS), media_type="text/csv"
+        )
+
+    @app.get("/file")
+    def file():
+        return Response(b"PAR1" * 1000, media_type="application/vnd.apache.parquet")
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("zstd;q=0.5, gzip", "gzip"),
+        ("*", "zstd"),
+        ("*, zstd;q=0", "gzip"),
+    ],
+)
+def test_select_encoding(accept_encoding: str, encoding: str):
+    assert select_encoding(accept_encoding) == encoding
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_compress(client: TestClient, encoding: str):
+    resp = client.get("/items", headers={"Accept-Encoding": encoding})
+    assert resp.headers["content-encoding"] == encoding
+    assert resp.headers["vary"] == "Accept-Encoding"
+    assert int(resp.headers["content-length"]) < len(resp.content)
+    assert resp.json() == ITEMS
+
+    resp = client.get("/stream", headers={"Accept-Encoding": encoding})
+    assert resp.headers["content-encoding"] == encoding
+    assert "content-length" not in resp.headers
+    assert resp.text == "".join(f"{item['id']},{item['name']}\n" for item in ITEMS)
+
+
+def test_skip_compression(client: TestClient):
+    # too small
+    resp = client.get("/items", params={"n": 1}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+    assert resp.json() == ITEMS[:1]
+    # not accepted by the client
+    resp = client.get("/items", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in resp.headers
+    assert resp.json() == ITEMS
+    # already compressed
+    resp = client.get("/file", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+    assert resp.content == b"PAR1" * 1000
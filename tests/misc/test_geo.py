@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import math
+
+from minmodkg.misc.geo import (
+    EARTH_RADIUS_KM,
+    GEO_N_COLS,
+    geo_cell,
+    geo_cell_ranges,
+    radius_to_bbox,
+    reproject_geometry,
+    reproject_wkt_centroids,
+)
+from shapely import centroid
+from shapely.wkt import loads
+
+
+def in_ranges(cell: int, ranges: list[tuple[int, int]]) -> bool:
+    return any(start <= cell <= end for start, end in ranges)
+
+
+def test_geo_cell():
+    assert geo_cell(-90, -180) == 0
+    assert geo_cell(-90, 180) == GEO_N_COLS - 1
+    assert geo_cell(-89.5, -179.5) + GEO_N_COLS == geo_cell(-88.5, -179.5)
+    assert geo_cell(90, 180) == geo_cell(89.5, 179.5)
+
+
+def test_geo_cell_ranges():
+    assert geo_cell_ranges(-180, -90, 180, 90) == [(0, geo_cell(90, 180))]
+
+    ranges = geo_cell_ranges(-87.8, 46.4, -86.4, 47.3)
+    assert len(ranges) == 2
+    assert in_ranges(geo_cell(46.9, -87.1), ranges)
+    assert not in_ranges(geo_cell(46.9, -85.1), ranges)
+
+    # crossing the antimeridian
+    ranges = geo_cell_ranges(170, -2, -170, 2)
+    assert in_ranges(geo_cell(0, 175), ranges)
+    assert in_ranges(geo_cell(0, -175), ranges)
+    assert not in_ranges(geo_cell(0, 0), ranges)
+
+
+def test_radius_to_bbox():
+    lat, lon, radius = 46.9, -87.1, 50
+    min_lon, min_lat, max_lon, max_lat = radius_to_bbox(lat, lon, radius)
+    assert min_lon < lon < max_lon and min_lat < lat < max_lat
+    assert math.isclose(
+        math.radians(max_lat - lat) * EARTH_RADIUS_KM, radius, rel_tol=1e-9
+    )
+
+    min_lon, _, max_lon, max_lat = radius_to_bbox(89.9, 0, 100)
+    assert (min_lon, max_lon, max_lat) == (-180, 180, 90)
+    min_lon, _, max_lon, _ = radius_to_bbox(0, 179.9, 100)
+    assert min_lon > max_lon
+
+
+def test_reproject_wkt_centroids():
+    wkts = [
+        "POINT(-87.1 46.9)",
+        "POLYGON((500000 5000000, 500100 5000000, 500100 5000100, 500000 5000000))",
+        "invalid wkt",
+        "POINT EMPTY",
+    ]
+    crss = ["EPSG:4326", "EPSG:32616", "EPSG:4326", "EPSG:32616"]
+    res = reproject_wkt_centroids(wkts, crss)
+
+    assert res[0] == (-87.1, 46.9)
+    expected = reproject_geometry(centroid(loads(wkts[1])), crss[1], "EPSG:4326")
+    assert res[1] is not None
+    assert math.isclose(res[1][0], expected.x) and math.isclose(res[1][1], expected.y)
+    assert res[2] is None and res[3] is None
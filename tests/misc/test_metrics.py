@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from minmodkg.misc.metrics import (
+    HTTP_REQUESTS,
+    REGISTRY,
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+    start_metrics_server,
+)
+
+
+def test_render():
+    registry = Registry()
+    counter = Counter("test_total", "A counter", ["kind"], registry=registry)
+    histogram = Histogram(
+        "test_seconds", "A histogram", buckets=[0.1, 1], registry=registry
+    )
+
+    counter.labels("a").inc()
+    counter.labels(kind='b"').inc(2)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP test_total A counter",
+        "# TYPE test_total counter",
+        'test_total{kind="a"} 1.0',
+        'test_total{kind="b\\""} 2.0',
+        "# HELP test_seconds A histogram",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{le="0.1"} 1.0',
+        'test_seconds_bucket{le="1.0"} 2.0',
+        'test_seconds_bucket{le="+Inf"} 3.0',
+        "test_seconds_sum 5.55",
+        "test_seconds_count 3.0",
+    ]
+
+
+def test_middleware_uses_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/test-metrics/{id}")
+    def get_item(id: str):
+        return {"id": id}
+
+    client = TestClient(app)
+    for id in ["a", "b"]:
+        assert client.get(f"/test-metrics/{id}").status_code == 200
+    assert client.get("/test-metrics-missing").status_code == 404
+
+    assert HTTP_REQUESTS.labels("GET", "/test-metrics/{id}", "200").value == 2
+    assert HTTP_REQUESTS.labels("GET", "<unmatched>", "404").value == 1
+
+
+def test_metrics_server():
+    server = start_metrics_server(0, "127.0.0.1")
+    try:
+        resp = httpx.get(f"http://127.0.0.1:{server.server_address[1]}/metrics")
+        assert resp.status_code == 200
+        assert resp.text == REGISTRY.render()
+    finally:
+        server.shutdown()
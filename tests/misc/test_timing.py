@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from minmodkg.api.responses import FastJSONResponse
+from minmodkg.misc.timing import ServerTimingMiddleware, record, timed
+
+
+def test_server_timing_header():
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/")
+    def index():
+        record("db", 0.002, "SELECT 1")
+        record("db", 0.003, "SELECT 2")
+        with timed("sparql", "ASK {}"):
+            pass
+        return {}
+
+    resp = TestClient(app).get("/")
+    assert resp.status_code == 200
+    stages = {
+        part.split(";", 1)[0]: part.split(";", 1)[1]
+        for part in resp.headers["server-timing"].split(", ")
+    }
+    assert list(stages.keys()) == ["db", "sparql", "total"]
+    assert stages["db"] == 'dur=5.0;desc="2"'
+    assert stages["sparql"].endswith('desc="1"')
+
+
+def test_encode_timing():
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/")
+    def index():
+        with timed("convert"):
+            content = {"a": 1}
+        return FastJSONResponse(content)
+
+    resp = TestClient(app).get("/")
+    assert resp.json() == {"a": 1}
+    stages = [
+        part.split(";", 1)[0] for part in resp.headers["server-timing"].split(", ")
+    ]
+    assert stages == ["convert", "encode", "total"]
+
+
+def test_record_outside_request():
+    # no-op when there is no request being timed
+    record("db", 0.1, "SELECT 1")
+    with timed("sparql"):
+        pass
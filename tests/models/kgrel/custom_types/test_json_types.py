@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from minmodkg.models.kg.candidate_entity import CandidateEntity
+from minmodkg.models.kgrel.custom_types import (
+    JSONDataclassType,
+    JSONListDataclassType,
+    Location,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+def test_json_dataclass_type():
+    loc = Location(
+        country=[CandidateEntity(source="mrds", confidence=1.0, observed_name="US")],
+        coordinates="POINT(-87.1 46.9)",
+    )
+    type_ = JSONDataclassType(Location)
+    pg = postgresql.dialect()
+    assert isinstance(type_.load_dialect_impl(pg), JSONB)
+    assert not isinstance(type_.load_dialect_impl(sqlite.dialect()), JSONB)
+    assert type_.process_result_value(type_.process_bind_param(loc, pg), pg) == loc
+    assert type_.process_bind_param(None, pg) is None
+
+    list_type = JSONListDataclassType(Location)
+    assert list_type.process_bind_param([loc], pg) == [loc.to_dict()]
+    assert list_type.process_result_value([loc.to_dict()], pg) == [loc]
@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from minmodkg.models.kgrel.event import get_content_hash
+
+
+def test_get_content_hash():
+    assert get_content_hash({"a": 1, "b": [2]}) == get_content_hash({"b": [2], "a": 1})
+    assert get_content_hash({"a": 1}) != get_content_hash({"a": 2})
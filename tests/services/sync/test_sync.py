@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
+
+from minmodkg.api.models.public_mineral_site import InputPublicMineralSite
+from minmodkg.models.kgrel.event import EventLog
+from minmodkg.models.kgrel.user import User
+from minmodkg.services.mineral_site import MineralSiteService
+from minmodkg.services.sync.listener import Listener
+from minmodkg.services.sync.sync import claim_events, process_pending_events
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+
+class RecordListener(Listener):
+    name = "test-record"
+
+    def __init__(self):
+        self.event_ids = []
+
+    def handle(self, events: Sequence[EventLog]):
+        self.event_ids.extend(event.id for event in events)
+
+
+class TestClaimEvents:
+    def test_event_committed_late(
+        self, kgrel: Engine, user1: User, sync_site1: InputPublicMineralSite
+    ):
+        service = MineralSiteService(kgrel)
+        listener = RecordListener()
+        process_pending_events(listener)
+        listener.event_ids.clear()
+
+        with (
+            ThreadPoolExecutor(max_workers=1) as executor,
+            # closed first, so a failed assertion releases the lock the write waits for
+            Session(kgrel) as session,
+        ):
+            # a slow transaction logs an event but does not commit yet
+            EventLog.lock_ids(session)
+            event = EventLog.from_same_as_update(user1.get_uri(), [], {})
+            session.add(event)
+            session.flush()
+            event_id = event.id
+
+            # a later write waits for it before logging its events
+            future = executor.submit(
+                service.create, sync_site1.to_kgrel(user1.get_uri())
+            )
+            time.sleep(1.0)
+            assert not future.done()
+            assert claim_events(listener, 100)[1] == []
+
+            session.commit()
+            future.result()
+
+        # no event is skipped, and they are handled in the order they are committed
+        process_pending_events(listener)
+        assert len(listener.event_ids) == 2
+        assert listener.event_ids[0] == event_id
+        assert listener.event_ids[1] > event_id
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import asyncio
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from pathlib import Path
 
 import pytest
@@ -10,6 +14,7 @@ from minmodkg.api.models.public_mineral_site import (
     InputPublicMineralSite,
     OutputPublicMineralSite,
 )
+from minmodkg.etl.postgres import PostgresLoaderService
 from minmodkg.libraries.rdf import TripleStore
 from minmodkg.misc.utils import assert_not_none
 from minmodkg.models.kg.base import MINMOD_NS, NS_MR
@@ -17,11 +22,22 @@ from minmodkg.models.kg.candidate_entity import CandidateEntity
 from minmodkg.models.kg.location_info import LocationInfo
 from minmodkg.models.kg.mineral_inventory import MineralInventory
 from minmodkg.models.kg.reference import Document, Reference
+from minmodkg.models.kgrel.base import get_async_dbconn
+from minmodkg.models.kgrel.dedup_mineral_site import DedupMineralSite
+from minmodkg.models.kgrel.event import DataVersion
 from minmodkg.models.kgrel.mineral_site import MineralSite
 from minmodkg.models.kgrel.user import User
+from minmodkg.services.data_version import DataVersionCache
 from minmodkg.services.kgrel_entity import EntityService
-from minmodkg.services.mineral_site import ArgumentError, MineralSiteService
-from sqlalchemy import Engine
+from minmodkg.services.mineral_site import (
+    ArgumentError,
+    ExpiredSnapshotIdError,
+    MineralSiteService,
+    SiteNotFoundError,
+)
+from sqlalchemy import Engine, delete
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
 from tests.utils import load_mineral_sites
 
 
@@ -156,6 +172,152 @@ class TestUpsertMineralSite(TestMSData):
         )
 
 
+class TestUpdateMineralSite(TestMSData):
+
+    def test_update_mineral_site(self, user1: User, kg: TripleStore, kgrel: Engine):
+        service = MineralSiteService(kgrel)
+        with pytest.raises(SiteNotFoundError):
+            service.update(self.site1.to_kgrel(user1.get_uri()))
+
+        service.create(self.site1.to_kgrel(user1.get_uri()))
+        snapshot_id = assert_not_none(service.find_by_id(self.site1.id)).ms.modified_at
+
+        self.site1.name = "Eagle Mine (updated)"
+        service.update(
+            self.site1.to_kgrel(user1.get_uri()), site_snapshot_id=snapshot_id
+        )
+        msi = assert_not_none(service.find_by_id(self.site1.id))
+        assert msi.ms.name == "Eagle Mine (updated)"
+        assert msi.ms.modified_at != snapshot_id
+
+        # the snapshot is now outdated
+        with pytest.raises(ExpiredSnapshotIdError):
+            service.update(
+                self.site1.to_kgrel(user1.get_uri()), site_snapshot_id=snapshot_id
+            )
+
+
+class TestDataVersion(TestMSData):
+    def test_writes_bump_data_version(
+        self,
+        user1: User,
+        kg: TripleStore,
+        kgrel: Engine,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        data_version = DataVersionCache(ttl=0, _engine=kgrel)
+        service = MineralSiteService(kgrel)
+        version = data_version.get()
+
+        service.create(self.site1.to_kgrel(user1.get_uri()))
+        assert data_version.get() == version + 1
+
+        self.site1.name = "Eagle Mine (updated)"
+        service.update(self.site1.to_kgrel(user1.get_uri()))
+        assert data_version.get() == version + 2
+
+        # a cached version is not revalidated until it expires
+        data_version.ttl = 3600
+        data_version.observe(data_version.created_at, version + 2)
+        service.upsert([self.site1.to_kgrel(user1.get_uri())])
+        assert data_version.get() == version + 2
+        data_version.expired_at = 0
+        assert data_version.get() == version + 3
+
+        # the ETL loaders write to the database directly, they bump the version too
+        loader = PostgresLoaderService(
+            "kgrel", tmp_path, {"dbdir": str(tmp_path / "db")}, {}
+        )
+        monkeypatch.setattr(loader, "get_engine", lambda dbinfo: kgrel)
+        loader.apply_changeset(None, [])  # type: ignore
+        data_version.expired_at = 0
+        assert data_version.get() == version + 4
+
+        # after the database is reset, the version starts again from 1
+        created_at = data_version.created_at
+        with Session(kgrel) as session:
+            session.execute(delete(DataVersion))
+            session.commit()
+        data_version.expired_at = 0
+        assert data_version.get() == 0
+        service.upsert([self.site1.to_kgrel(user1.get_uri())])
+        data_version.expired_at = 0
+        assert data_version.get() == 1
+        assert data_version.created_at not in (None, created_at)
+
+
+class TestConcurrentUpdate(TestMSData):
+    def test_concurrent_updates_of_dedup_site(
+        self, user1: User, kg: TripleStore, kgrel: Engine
+    ):
+        service = MineralSiteService(kgrel)
+        sites = [self.site1, replace(self.site1, record_id="10014571")]
+        for site in sites:
+            service.create(site.to_kgrel(user1.get_uri()))
+        (dedup_site_id,) = service.update_same_as(
+            user1.get_uri(), [[site.id for site in sites]]
+        )
+
+        def update(site: InputPublicMineralSite, barrier: threading.Barrier):
+            barrier.wait()
+            service.update(site.to_kgrel(user1.get_uri()))
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for i in range(5):
+                # update the two sites of the dedup site at the same time
+                barrier = threading.Barrier(2)
+                futures = [
+                    executor.submit(
+                        update, replace(site, name=f"{site.name} {i}"), barrier
+                    )
+                    for site in sites
+                ]
+                # none of them fails because of the other
+                for future in futures:
+                    future.result()
+
+                # the dedup site is computed from the latest version of both sites
+                msis = service.find_by_ids([site.id for site in sites])
+                assert {msi.ms.name for msi in msis.values()} == {
+                    f"{site.name} {i}" for site in sites
+                }
+                dms = assert_not_none(service.find_dedup_by_id(dedup_site_id))
+                assert (
+                    dms.dms.to_dict()
+                    == DedupMineralSite.from_sites(
+                        list(msis.values()), dedup_site_id
+                    ).dms.to_dict()
+                )
+
+    def test_concurrent_writes(self, user1: User, kg: TripleStore, kgrel: Engine):
+        service = MineralSiteService(kgrel)
+        data_version = DataVersionCache(ttl=0, _engine=kgrel)
+        version = data_version.get()
+        sites = [replace(self.site1, record_id=f"2001457{i}") for i in range(4)]
+        barrier = threading.Barrier(len(sites) + 1)
+
+        def create(site: InputPublicMineralSite):
+            barrier.wait()
+            service.create(site.to_kgrel(user1.get_uri()))
+
+        def upsert(site: InputPublicMineralSite):
+            barrier.wait()
+            service.upsert([site.to_kgrel(user1.get_uri())])
+
+        # writes that do not touch the same sites do not fail because of each other
+        with ThreadPoolExecutor(max_workers=len(sites) + 1) as executor:
+            futures = [executor.submit(create, site) for site in sites]
+            futures.append(executor.submit(upsert, self.site1))
+            for future in futures:
+                future.result()
+
+        assert set(service.find_by_ids([site.id for site in sites])) == {
+            site.id for site in sites
+        }
+        assert data_version.get() == version + len(sites) + 1
+
+
 class TestLinkMineralSite(TestMSData):
     def test_update_same_as(self, resource_dir: Path, user1: User, kgrel: Engine):
         time.sleep(1.0)  # to ensure the modified_at is different
@@ -355,3 +517,44 @@ class TestLinkMineralSite(TestMSData):
             ("site__mrdata-usgs-gov-mrds__10280772__umn", 0.1),
             ("site__mrdata-usgs-gov-mrds__10280772__sri", 0.1),
         ]
+
+
+class TestReadReplica(TestMSData):
+    def test_read_from_replica(
+        self, user1: User, kg: TripleStore, kgrel: Engine, kgrel_replica: Engine
+    ):
+        service = MineralSiteService(kgrel, _replica_engine=kgrel_replica)
+        service.create(self.site1.to_kgrel(user1.get_uri()))
+
+        # the stand-in replica is not replicated, so the reads do not see the site
+        assert service.find_by_id(self.site1.id) is None
+        assert service.find_by_ids([self.site1.id]) == {}
+        assert service.get_site_db_id(self.site1.id) is not None
+        assert asyncio.run(self.aget_site_db_id(kgrel, kgrel_replica)) is not None
+        with service.read_session() as session:
+            assert session.connection().get_isolation_level() == "READ COMMITTED"
+
+        primary_service = MineralSiteService(
+            kgrel, _replica_engine=kgrel_replica, read_from_replica=False
+        )
+        assert primary_service.find_by_id(self.site1.id) is not None
+
+    async def aget_site_db_id(self, kgrel: Engine, kgrel_replica: Engine):
+        # the async engines must be created in the event loop that uses them
+        async_engine, async_replica_engine = [
+            create_async_engine(
+                get_async_dbconn(engine.url.render_as_string(hide_password=False))
+            )
+            for engine in [kgrel, kgrel_replica]
+        ]
+        try:
+            service = MineralSiteService(
+                kgrel,
+                _async_engine=async_engine,
+                _replica_engine=kgrel_replica,
+                _async_replica_engine=async_replica_engine,
+            )
+            return await service.aget_site_db_id(self.site1.id)
+        finally:
+            await async_engine.dispose()
+            await async_replica_engine.dispose()
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pytest
+from benchmarks.suite import (
+    BENCHMARKS,
+    BenchmarkResult,
+    find_regressions,
+    run_benchmark,
+)
+
+
+@pytest.mark.parametrize("benchmark", BENCHMARKS, ids=lambda b: b.name)
+def test_run_benchmark(benchmark):
+    result = run_benchmark(benchmark, n_items=10, repeat=1)
+    assert result.n_items == 10
+    assert result.throughput > 0
+    assert result.peak_memory > 0
+
+
+def test_find_regressions():
+    baseline = {
+        "a": {"n_items": 10, "throughput": 100.0, "peak_memory": 1000},
+        "b": {"n_items": 10, "throughput": 100.0, "peak_memory": 1000},
+    }
+    results = [
+        BenchmarkResult(name="a", n_items=10, throughput=85.0, peak_memory=1100),
+        BenchmarkResult(name="b", n_items=10, throughput=70.0, peak_memory=1300),
+        BenchmarkResult(name="c", n_items=10, throughput=1.0, peak_memory=1),
+    ]
+    assert [
+        regression.split(":")[0]
+        for regression in find_regressions(results, baseline, threshold=0.2)
+    ] == ["b", "b"]
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import asyncio
+
+from fastapi import Response
 from minmodkg.misc import LongestPrefixIndex
+from minmodkg.misc.utils import CacheResponse
 
 
 def test_longest_prefix_index():
@@ -21,3 +25,29 @@ def test_longest_prefix_index():
     assert index.get("databases::http://usgs.gov/1") == "databases::http://usgs.gov/"
     assert index.get("databases::http://mrdata") is None
     assert index.get("mining-report::") is None
+
+
+def test_cache_response(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr("minmodkg.misc.utils.time.time", lambda: now)
+    cache = CacheResponse()
+    counter = iter(range(100))
+
+    async def acompute():
+        return next(counter)
+
+    response = Response()
+    assert cache("key", 60, response, lambda: next(counter)) == 0
+    assert response.headers["Cache-Control"] == "max-age=60"
+
+    now += 30
+    response = Response()
+    assert cache("key", 60, response, lambda: next(counter)) == 0
+    assert asyncio.run(cache.acall("key", 60, response, acompute)) == 0
+    assert response.headers["Cache-Control"] == "max-age=30"
+
+    # the cached response expires
+    now += 31
+    assert cache("key", 60, Response(), lambda: next(counter)) == 1
+    now += 61
+    assert asyncio.run(cache.acall("key", 60, Response(), acompute)) == 2
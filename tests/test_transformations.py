@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import hashlib
+
+from minmodkg.models.kg.reference import PageInfo
+from minmodkg.transformations import MR_NS, make_site_ids, norm_slug
+from slugify import slugify
+
+
+def test_norm_slug():
+    for text in ["10014570", "eagle-mine", "Eagle Mine", "a--b", "-a", "usgs.gov"]:
+        assert norm_slug(text) == slugify(text)
+        assert norm_slug(text, False) == slugify(text)
+
+
+def test_make_site_ids():
+    page_info = [
+        {"page": 1},
+        {"page": 2, "bounding_box": {"x_max": 1, "x_min": 0, "y_max": 1, "y_min": 0}},
+    ]
+    sites = [
+        {
+            "source_id": "https://mrdata.usgs.gov/mrds/",
+            "record_id": record_id,
+            "created_by": "https://minmod.isi.edu/users/s/test",
+            "reference": [
+                {
+                    "document": {"title": "Technical Report"},
+                    "page_info": [dict(pi) for pi in page_info],
+                }
+            ],
+        }
+        for record_id in ["10014570", "Eagle Mine"]
+    ]
+    for site in sites:
+        make_site_ids(site)
+
+    site_id = "site__mrdata-usgs-gov-mrds__10014570__test"
+    assert sites[0]["id"] == MR_NS + site_id
+    assert sites[1]["id"] == MR_NS + "site__mrdata-usgs-gov-mrds__eagle-mine__test"
+
+    doc_uri = f"{MR_NS}{site_id}__user_test____doc__technical-report"
+    pageinfo_id = hashlib.sha256(
+        b"|".join(PageInfo.from_dict(pi).to_enc_str().encode() for pi in page_info)
+    ).hexdigest()[:16]
+    ref = sites[0]["reference"][0]
+    assert ref["document"]["id"] == doc_uri
+    assert ref["id"] == (
+        MR_NS + slugify(doc_uri[len(MR_NS) :]) + "__ref__" + slugify("_" + pageinfo_id)
+    )
+    assert [pi["id"] for pi in ref["page_info"]] == [
+        f"{ref['id']}__pageinfo__0",
+        f"{ref['id']}__pageinfo__1",
+    ]
+
+    # the ids are the same when they are generated again
+    site = {k: v for k, v in sites[0].items() if k != "id"}
+    make_site_ids(site)
+    assert site["id"] == sites[0]["id"]
+    assert site["reference"][0]["id"] == ref["id"]